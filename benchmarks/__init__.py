@@ -0,0 +1,4 @@
+"""
+Benchmarks for Retro Text Adventure
+Run each one from the repository root, e.g. `python -m benchmarks.bench_lookup`
+"""
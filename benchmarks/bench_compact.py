@@ -0,0 +1,55 @@
+"""
+Compact World Benchmark
+Measures the memory a world of 10, 1k and 100k rooms takes as nested dicts loaded
+from JSON and as a CompactWorld, and times commands on both
+"""
+import gc
+import json
+import timeit
+import tracemalloc
+
+from compact_world import CompactWorld
+from game_engine import GameEngine
+from world_generator import WorldGenerator
+from world_state import World
+
+SIZES = [10, 1000, 100000]
+COMMANDS = ["look", "go north", "look", "go south"]
+
+def world_text(size):
+    """Return a generated world of size rooms as JSON text"""
+    generator = WorldGenerator(rooms=size, branching=3, item_density=1.0, puzzle_depth=10)
+    return json.dumps(generator.generate())
+
+def traced(build):
+    """Return (result, bytes still allocated) for a call"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+def per_command(game_world):
+    """Return microseconds per command on an engine for game_world"""
+    engine = GameEngine(World(game_world))
+
+    def run():
+        for command in COMMANDS:
+            engine.process_command(command)
+    return min(timeit.repeat(run, number=2000, repeat=5)) / 2000 / len(COMMANDS) * 1e6
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'rooms':>8} {'dict':>10} {'compact':>10} {'saved':>7} {'dict us/cmd':>12} {'compact us/cmd':>15}")
+    for size in SIZES:
+        text = world_text(size)
+        game_world, dict_bytes = traced(lambda: json.loads(text))
+        compact, compact_bytes = traced(lambda: CompactWorld(json.loads(text)))
+        print(f"{size:>8} {dict_bytes / 1024:>8.0f}KB {compact_bytes / 1024:>8.0f}KB "
+              f"{1 - compact_bytes / dict_bytes:>6.0%} {per_command(game_world):>12.2f} "
+              f"{per_command(compact.game_world()):>15.2f}")
+
+if __name__ == "__main__":
+    main()
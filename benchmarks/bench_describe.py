@@ -0,0 +1,53 @@
+"""
+Room Description Benchmark
+Compares the old += description builder with the join-based builder and the cache
+"""
+import timeit
+
+from benchmarks.bench_lookup import build_world
+from game_engine import GameEngine
+
+SIZES = [0, 10, 1000]
+
+def concatenate(game_world, room_id, item_ids):
+    """Build a description the way the engine did before, with repeated +="""
+    room = game_world["rooms"][room_id]
+    description = f"\n{room['name']}\n"
+    description += f"{'-' * len(room['name'])}\n"
+    description += f"{room['description']}\n"
+    exits = []
+    for direction, target in room["exits"].items():
+        exits.append(direction)
+    if exits:
+        description += f"\nExits: {', '.join(exits)}\n"
+    else:
+        description += "\nThere are no obvious exits.\n"
+    if item_ids:
+        description += "\nYou can see:\n"
+        for item in item_ids:
+            description += f"- {game_world['items'][item]['name']}\n"
+    return description
+
+def time_call(func, repeat=5):
+    """Return the best time per call in microseconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'items':>6} {'+= (us)':>10} {'join (us)':>10} {'cached look (us)':>17} {'speedup':>8}")
+    for size in SIZES:
+        game_world = build_world(size)
+        engine = GameEngine(game_world)
+        world = engine.world
+        item_ids = world.rooms["store"]["items"]
+        assert concatenate(game_world, "store", item_ids) == engine.process_command("look")
+
+        old = time_call(lambda: concatenate(game_world, "store", item_ids))
+        joined = time_call(lambda: world.describe_room("store", item_ids))
+        cached = time_call(lambda: engine.process_command("look"))
+        print(f"{size:>6} {old:>10.2f} {joined:>10.2f} {cached:>17.2f} {old / cached:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
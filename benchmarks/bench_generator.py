@@ -0,0 +1,42 @@
+"""
+World Generator Benchmark
+Times streaming generated worlds of 10, 1k and 100k rooms to JSON and to a sqlite
+room store, and shows that peak memory stays flat as the world grows
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+from world_generator import WorldGenerator
+
+SIZES = [10, 1000, 100000]
+
+def measure(write):
+    """Return (seconds, peak bytes traced) for a call, timing a run without tracing"""
+    started = time.perf_counter()
+    write()
+    elapsed = time.perf_counter() - started
+
+    # tracemalloc slows everything down, so memory gets a run of its own
+    tracemalloc.start()
+    write()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'rooms':>8} {'json (s)':>9} {'json peak':>10} {'store (s)':>10} {'store peak':>11} {'rooms/s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            generator = WorldGenerator(rooms=size, branching=3, item_density=1.0, puzzle_depth=10)
+            json_path = os.path.join(directory, f"world_{size}.json")
+            store_path = os.path.join(directory, f"world_{size}.db")
+            json_time, json_peak = measure(lambda: generator.write_json(json_path))
+            store_time, store_peak = measure(lambda: generator.write_store(store_path))
+            print(f"{size:>8} {json_time:>9.2f} {json_peak / 1024:>8.0f}KB {store_time:>10.2f} "
+                  f"{store_peak / 1024:>9.0f}KB {size / json_time:>9.0f}")
+
+if __name__ == "__main__":
+    main()
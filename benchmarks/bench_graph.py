@@ -0,0 +1,39 @@
+"""
+World Graph Benchmark
+Times compiling the graph and answering path and reachability queries on corridors
+of 10, 1k and 100k rooms
+"""
+import time
+
+from benchmarks.bench_world_load import build_world
+from world_graph import ReachableSet, WorldGraph
+
+SIZES = [10, 1000, 100000]
+
+def timed(func):
+    """Return (result, milliseconds) for one call"""
+    started = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - started) * 1000
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'rooms':>8} {'compile':>9} {'path':>9} {'reachable':>10} {'unlock':>9}   (ms)")
+    for size in SIZES:
+        game_world = build_world(size)
+        # Lock the exit halfway along so unlocking opens up the far half
+        middle = game_world["rooms"][f"room_{size // 2}"]
+        middle["locked_exits"] = {"east": {"description": "locked", "hint": ""}}
+
+        graph, compiled = timed(lambda: WorldGraph(game_world))
+        last = f"room_{size - 1}"
+        path, path_time = timed(lambda: graph.shortest_path("room_0", last, ignore_locks=True))
+        assert len(path) == size - 1
+        reachable = ReachableSet(graph, "room_0")
+        _, reach_time = timed(lambda: ReachableSet(graph, "room_0"))
+        _, unlock_time = timed(lambda: reachable.unlock(f"room_{size // 2}", "east"))
+        assert last in reachable
+        print(f"{size:>8} {compiled:>9.2f} {path_time:>9.2f} {reach_time:>10.2f} {unlock_time:>9.2f}")
+
+if __name__ == "__main__":
+    main()
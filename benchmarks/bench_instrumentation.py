@@ -0,0 +1,66 @@
+"""
+Instrumentation Benchmark
+Times a scripted playthrough with instrumentation never installed, installed, installed
+with every method timed, and installed then removed again, to check that turning it
+off costs nothing
+"""
+import timeit
+
+from game_data import initialize_game_world
+from game_engine import GameEngine
+from instrumentation import Instrumentation
+from world_state import World
+
+ROUNDS = 5
+
+SCRIPT = ["look", "take flashlight", "n", "n", "use flashlight", "take crowbar", "s", "e",
+          "use crowbar", "take rusty key", "i", "examine key", "w", "xyzzy", "help"]
+
+def play(world):
+    """Run the script on a fresh engine"""
+    engine = GameEngine(world)
+    for command in SCRIPT:
+        engine.process_command(command)
+
+def time_play(world, repeat=5):
+    """Return the best time per command in microseconds"""
+    timer = timeit.Timer(lambda: play(world))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number / len(SCRIPT) * 1e6
+
+def measure(world):
+    """Time each setup once, returning a dict of label to microseconds per command"""
+    original = GameEngine.run_command
+    times = {"never installed": time_play(world)}
+
+    instrumentation = Instrumentation()
+    instrumentation.install()
+    times["installed"] = time_play(world)
+    instrumentation.uninstall()
+
+    instrumentation = Instrumentation()
+    instrumentation.install(methods=True)
+    times["installed, methods"] = time_play(world)
+    instrumentation.uninstall()
+
+    times["removed again"] = time_play(world)
+    assert GameEngine.run_command is original
+    return times
+
+def main():
+    """Run the benchmark and print a table"""
+    world = World(initialize_game_world())
+    # Alternate the setups over several rounds and keep each one's best, so
+    # drifting CPU speed doesn't favour whichever ran last
+    best = {}
+    for _ in range(ROUNDS):
+        for label, elapsed in measure(world).items():
+            best[label] = min(elapsed, best.get(label, elapsed))
+
+    baseline = best["never installed"]
+    print(f"{'setup':<24} {'us/command':>12} {'overhead':>10}")
+    for label, elapsed in best.items():
+        print(f"{label:<24} {elapsed:>12.2f} {(elapsed / baseline - 1) * 100:>9.1f}%")
+
+if __name__ == "__main__":
+    main()
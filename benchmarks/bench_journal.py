@@ -0,0 +1,68 @@
+"""
+Command Journal Benchmark
+Runs 10k active sessions with and without a CommandJournal, then reports how many
+bytes reach the disk per byte of commands (write amplification) and how long
+recovering every session takes
+"""
+import random
+import tempfile
+import time
+
+from command_journal import CommandJournal
+from game_data import initialize_game_world
+from game_engine import GameEngine
+from world_state import World
+
+SESSIONS = 10000
+ROUNDS = 12
+COMMANDS = ["take flashlight", "take note", "n", "look", "n", "use flashlight", "take crowbar",
+            "s", "use crowbar", "take silver coin", "i", "drop note"]
+
+def run(world, journal=None):
+    """Play every session for ROUNDS commands; return (engines, seconds, command bytes)"""
+    rnd = random.Random(3)
+    engines = {f"player-{number}": GameEngine(world) for number in range(SESSIONS)}
+    command_bytes = 0
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for session_id, engine in engines.items():
+            command = rnd.choice(COMMANDS)
+            engine.process_command(command)
+            if journal is not None:
+                journal.record(session_id, command)
+                if journal.should_compact():
+                    journal.compact(engines)
+            command_bytes += len(command)
+    if journal is not None:
+        journal.flush(sync=True)
+    return engines, time.perf_counter() - started, command_bytes
+
+def main():
+    """Run the benchmark and print the results"""
+    world = World(initialize_game_world())
+    _, plain, command_bytes = run(world)
+    commands = SESSIONS * ROUNDS
+    print(f"{SESSIONS} sessions, {commands} commands, {command_bytes / 1024:.0f}KB of command text")
+    print(f"  no journal:  {commands / plain:>9.0f} commands/s")
+
+    print(f"\n{'compact after':>14} {'commands/s':>11} {'written':>9} {'amplification':>14} {'recover (ms)':>13}")
+    for compact_after in (10 ** 9, 50000, 20000):
+        with tempfile.TemporaryDirectory() as directory:
+            journal = CommandJournal(directory, compact_after=compact_after)
+            engines, elapsed, _ = run(world, journal)
+            written = journal.bytes_written
+
+            # Recover as if the process had died here, without closing the journal
+            started = time.perf_counter()
+            recovered = CommandJournal(directory).recover(world)
+            recovery = time.perf_counter() - started
+            assert all(recovered[key].export_session() == engine.export_session()
+                       for key, engine in engines.items())
+            journal._file.close()
+
+        label = "never" if compact_after > commands else str(compact_after)
+        print(f"{label:>14} {commands / elapsed:>11.0f} {written / 1024:>7.0f}KB "
+              f"{written / command_bytes:>13.1f}x {recovery * 1000:>13.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+World Linter Benchmark
+Times linting generated worlds of 10, 1k and 100k rooms, in memory and from a
+sqlite room store, against compiling a WorldGraph, to show the single pass over
+the rooms keeps linting close to the cost of reading the world once
+"""
+import os
+import tempfile
+import time
+
+from room_store import open_room_store
+from world_generator import WorldGenerator
+from world_graph import WorldGraph
+from world_linter import lint_world
+
+SIZES = [10, 1000, 100000]
+
+def timed(func):
+    """Return (result, milliseconds) for one call"""
+    started = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - started) * 1000
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'rooms':>8} {'graph (ms)':>11} {'lint (ms)':>10} {'store lint (ms)':>16} {'findings':>9}")
+    for size in SIZES:
+        generator = WorldGenerator(size, seed=1)
+        game_world = generator.generate()
+        _, graph_time = timed(lambda: WorldGraph(game_world))
+        findings, lint_time = timed(lambda: lint_world(game_world))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "world.db")
+            generator.write_store(path)
+            store = open_room_store(path)
+            store_findings, store_time = timed(lambda: lint_world(store))
+            store["rooms"]._connection.close()
+        assert store_findings == findings
+        print(f"{size:>8} {graph_time:>11.1f} {lint_time:>10.1f} {store_time:>16.1f} {len(findings):>9}")
+
+if __name__ == "__main__":
+    main()
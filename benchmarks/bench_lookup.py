@@ -0,0 +1,47 @@
+"""
+Lookup Benchmark
+Compares scanning a room's item list against the name index at 10, 1k and 100k items
+"""
+import timeit
+
+from world_index import WorldIndex
+
+SIZES = [10, 1000, 100000]
+
+def build_world(item_count):
+    """Build a one-room world holding item_count items"""
+    items = {}
+    for number in range(item_count):
+        items[f"item_{number}"] = {"name": f"Item {number}", "description": "An item."}
+    room = {"name": "Store Room", "description": "", "exits": {}, "items": list(items)}
+    return {"starting_room": "store", "rooms": {"store": room}, "items": items}
+
+def scan_lookup(game_world, room_id, name):
+    """Find an item by name the way the engine did before the index"""
+    for item_id in game_world["rooms"][room_id]["items"]:
+        if name.lower() == game_world["items"][item_id]["name"].lower():
+            return item_id
+    return None
+
+def time_call(func, repeat=5):
+    """Return the best time per call in microseconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'items':>8} {'scan (us)':>12} {'index (us)':>12} {'speedup':>10}")
+    for size in SIZES:
+        game_world = build_world(size)
+        index = WorldIndex(game_world)
+        # Look up the last item so the scan has to walk the whole room
+        target = f"ITEM {size - 1}"
+        room_index = index.room_items("store")
+        assert room_index.find(target) == scan_lookup(game_world, "store", target)
+        scan = time_call(lambda: scan_lookup(game_world, "store", target))
+        indexed = time_call(lambda: room_index.find(target))
+        print(f"{size:>8} {scan:>12.2f} {indexed:>12.3f} {scan / indexed:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Noun Matcher Benchmark
+Times exact, single-word, prefix and misspelled lookups in the noun matcher with
+100, 10k and 50k names
+"""
+import random
+import timeit
+
+from world_index import NounMatcher
+
+SIZES = [100, 10000, 50000]
+
+def build_names(count, seed=1):
+    """Return count distinct two-word names made of random letters"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    names = set()
+    while len(names) < count:
+        first = "".join(rng.choice(letters) for _ in range(rng.randint(4, 8)))
+        second = "".join(rng.choice(letters) for _ in range(rng.randint(4, 8)))
+        names.add(f"{first.title()} {second.title()}")
+    return sorted(names)
+
+def time_call(func, repeat=5):
+    """Return the best time per call in microseconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'names':>8} {'exact':>9} {'word':>9} {'prefix':>9} {'typo':>9}   (us)")
+    for size in SIZES:
+        names = build_names(size)
+        matcher = NounMatcher()
+        for name in names:
+            matcher.add(name, name.lower())
+
+        target = names[size // 2].lower()
+        first, second = target.split()
+        typo = second[:1] + second[2:1:-1] + second[1:2] + second[3:]
+        queries = [target, second, second[:4], typo]
+        for query in queries:
+            assert target in matcher.match(query), query
+        times = [time_call(lambda: matcher.match(query)) for query in queries]
+        print(f"{size:>8} " + " ".join(f"{elapsed:>9.2f}" for elapsed in times))
+
+if __name__ == "__main__":
+    main()
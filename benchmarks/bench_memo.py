@@ -0,0 +1,61 @@
+"""
+Command Memo Benchmark
+Plays bot-like traffic, mostly look, examine, inventory and help with the odd
+move or take, through 1000 sessions with the memo of pure commands off and at
+two sizes, and reports commands/sec and hit rates
+
+look and help aren't memoized, since their output is cached already; the memo
+pays off on examine, inventory and anything that has to fall back on
+partial-name matching.
+"""
+import random
+import time
+
+from command_memo import memo_stats
+from game_data import initialize_game_world
+from game_engine import GameEngine
+from world_state import World
+
+SESSIONS = 1000
+ROUNDS = 50
+MUTATING = ["take flashlight", "take note", "drop note", "n", "s"]
+# Name -> (pure commands, share of commands that may change something)
+MIXES = {
+    "mixed": (["look", "look", "examine bed", "examine note", "i", "help", "examine fireplace",
+               "examine flashlight"], 1 / 9),
+    "polling": (["look", "examine fireplace", "examine flash", "i"], 1 / 30),
+}
+
+def traffic(seed, pure, mutating_share):
+    """Return one session's commands"""
+    rnd = random.Random(seed)
+    return [rnd.choice(MUTATING) if rnd.random() < mutating_share else rnd.choice(pure)
+            for _ in range(ROUNDS)]
+
+def run(world, scripts, memo_max_bytes):
+    """Return commands/sec playing every script with the given memo size"""
+    engines = []
+    for _ in scripts:
+        engine = GameEngine(world)
+        engine.memo_max_bytes = memo_max_bytes
+        engines.append(engine)
+    started = time.perf_counter()
+    for round_number in range(ROUNDS):
+        for engine, script in zip(engines, scripts):
+            engine.process_command(script[round_number])
+    return SESSIONS * ROUNDS / (time.perf_counter() - started)
+
+def main():
+    """Run the benchmark and print a table"""
+    world = World(initialize_game_world())
+    print(f"{'traffic':>8} {'memo':>6} {'commands/s':>11} {'hit rate':>9}")
+    for name, (pure, mutating_share) in MIXES.items():
+        scripts = [traffic(seed, pure, mutating_share) for seed in range(SESSIONS)]
+        for memo_max_bytes in (0, 2048, 32 * 1024):
+            memo_stats.reset()
+            throughput = run(world, scripts, memo_max_bytes)
+            label = f"{memo_max_bytes // 1024}KB" if memo_max_bytes else "off"
+            print(f"{name:>8} {label:>6} {throughput:>11.0f} {memo_stats.hit_rate():>8.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Output Benchmark
+Times showing an inventory of 10, 1k and 100k items through Renderer.write_output,
+which joins a command's fragments once at the sink, against writing every
+fragment to the sink separately
+"""
+import io
+import timeit
+
+from game_engine import GameEngine
+from renderer import Renderer
+
+SIZES = [10, 1000, 100000]
+
+def build_world(item_count):
+    """Return one room with item_count items"""
+    items = {f"item_{number}": {"name": f"Item {number}", "description": "An item."}
+             for number in range(item_count)}
+    room = {"name": "Store", "description": "A store.", "exits": {}, "items": list(items)}
+    return {"starting_room": "store", "rooms": {"store": room}, "items": items}
+
+def per_call(func, number):
+    """Return the best microseconds per call"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'items':>8} {'write_output (us)':>18} {'writelines (us)':>16}")
+    for size in SIZES:
+        engine = GameEngine(build_world(size))
+        engine._set_inventory(list(engine.game_world["items"]))
+        # Remembered inventories come back already joined, which would hide the difference
+        engine.memo_max_bytes = 0
+        number = max(1, 100000 // size)
+        sink = io.StringIO()
+        renderer = Renderer(sink)
+
+        def joined():
+            renderer.write_output(engine.command_output("i"))
+
+        def separately():
+            sink.writelines(engine.command_output("i"))
+            sink.write("\n")
+
+        print(f"{size:>8} {per_call(joined, number):>18.1f} {per_call(separately, number):>16.1f}")
+
+if __name__ == "__main__":
+    main()
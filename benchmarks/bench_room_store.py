@@ -0,0 +1,65 @@
+"""
+Room Store Benchmark
+Opens a 100k-room world fully in memory, from the compiled cache and from a sqlite
+room store, then walks a player through it and reports time and memory used
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_world_load import build_world
+from game_engine import GameEngine
+from room_store import open_room_store, write_room_store
+from world_loader import load_world, save_world
+
+ROOMS = 100000
+STEPS = 2000
+CACHE_BYTES = 256 * 1024
+
+def walk(game_world):
+    """Walk east then back west; return seconds per command"""
+    engine = GameEngine(game_world)
+    commands = ["east"] * STEPS + ["west"] * STEPS
+    started = time.perf_counter()
+    for command in commands:
+        engine.process_command(command)
+    return (time.perf_counter() - started) / len(commands)
+
+def measure(label, open_world):
+    """Open a world, walk it and print one row"""
+    started = time.perf_counter()
+    game_world = open_world()
+    opened = time.perf_counter() - started
+    per_command = walk(game_world)
+    del game_world
+
+    # Memory is measured on a second run, since tracing slows everything down
+    tracemalloc.start()
+    game_world = open_world()
+    walk(game_world)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    loads = getattr(game_world["rooms"], "loads", "-")
+    print(f"{label:<18} {opened * 1000:>10.1f} {per_command * 1e6:>14.1f} {memory / 1e6:>10.1f} {loads:>8}")
+
+def main():
+    """Run the benchmark and print a table"""
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "world.json")
+        store = os.path.join(directory, "world.db")
+        game_world = build_world(ROOMS)
+        save_world(game_world, source)
+        write_room_store(store, game_world["starting_room"],
+                         game_world["rooms"].items(), game_world["items"].items())
+        del game_world
+        # Build the compiled cache before timing
+        load_world(source)
+
+        print(f"{'world':<18} {'open (ms)':>10} {'command (us)':>14} {'memory MB':>10} {'loads':>8}")
+        measure("json, in memory", lambda: load_world(source, use_cache=False))
+        measure("compiled cache", lambda: load_world(source, max_bytes=CACHE_BYTES))
+        measure("sqlite store", lambda: open_room_store(store, CACHE_BYTES))
+
+if __name__ == "__main__":
+    main()
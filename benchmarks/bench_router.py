@@ -0,0 +1,76 @@
+"""
+Session Router Benchmark
+Measures commands/sec for 1000 sessions run in this process and through a SessionRouter
+with 1, 2, 4... worker processes up to the CPU count, and how long migrating a session takes
+
+Scaling is only visible on a machine with several cores; with one core, extra
+workers just take turns.
+"""
+import os
+import time
+
+from game_data import initialize_game_world
+from game_engine import GameEngine
+from session_router import SessionRouter
+from world_state import World
+
+SESSIONS = 1000
+ROUNDS = 20
+SCRIPT = ["take flashlight", "take note", "n", "look", "n", "use flashlight", "take crowbar",
+          "s", "drop note", "i", "s", "look"]
+
+def command_for(round_number):
+    """Return the command every session runs in a round"""
+    return SCRIPT[round_number % len(SCRIPT)]
+
+def in_process():
+    """Return commands/sec running every session in this process"""
+    world = World(initialize_game_world())
+    engines = [GameEngine(world) for _ in range(SESSIONS)]
+    started = time.perf_counter()
+    for round_number in range(ROUNDS):
+        command = command_for(round_number)
+        for engine in engines:
+            engine.process_command(command)
+    return SESSIONS * ROUNDS / (time.perf_counter() - started)
+
+def routed(workers):
+    """Return (commands/sec, milliseconds per migration) through a router with workers processes"""
+    with SessionRouter(workers) as router:
+        # Start every session first, so creating engines isn't timed
+        router.request_many([("open", session, None) for session in range(SESSIONS)])
+        started = time.perf_counter()
+        for round_number in range(ROUNDS):
+            command = command_for(round_number)
+            router.request_many([("command", session, command) for session in range(SESSIONS)])
+        throughput = SESSIONS * ROUNDS / (time.perf_counter() - started)
+
+        # Moving needs somewhere to move to
+        if workers == 1:
+            return throughput, None
+        moves = min(SESSIONS, 200)
+        started = time.perf_counter()
+        for session in range(moves):
+            router.migrate(session, (router.worker_for(session) + 1) % workers)
+        migration = (time.perf_counter() - started) / moves * 1000
+    return throughput, migration
+
+def main():
+    """Run the benchmark and print a table"""
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= max(cores, 2):
+        counts.append(counts[-1] * 2)
+
+    print(f"{cores} CPU core(s), {SESSIONS} sessions, {ROUNDS} commands each")
+    print(f"{'workers':>10} {'commands/s':>12} {'speedup':>8} {'migrate (ms)':>13}")
+    print(f"{'in-process':>10} {in_process():>12.0f} {'-':>8} {'-':>13}")
+    single = None
+    for workers in counts:
+        throughput, migration = routed(workers)
+        single = single or throughput
+        migration = "-" if migration is None else f"{migration:.3f}"
+        print(f"{workers:>10} {throughput:>12.0f} {throughput / single:>7.2f}x {migration:>13}")
+
+if __name__ == "__main__":
+    main()
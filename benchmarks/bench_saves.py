@@ -0,0 +1,67 @@
+"""
+Save Benchmark
+Times saving and restoring 10k sessions in bulk, and compares journal appends with
+full snapshots for one long-running session
+"""
+import os
+import random
+import tempfile
+import time
+
+from game_data import initialize_game_world
+from game_engine import GameEngine
+from saves import SaveStore, restore_sessions, save_sessions
+from world_state import World
+
+SESSIONS = 10000
+COMMANDS = ["take flashlight", "take note", "n", "n", "use flashlight", "take crowbar",
+            "s", "use crowbar", "take silver coin", "e", "use crowbar", "drop note"]
+
+def play(world, rnd):
+    """Return an engine that played a random prefix of COMMANDS"""
+    engine = GameEngine(world)
+    for command in COMMANDS[:rnd.randint(1, len(COMMANDS))]:
+        engine.process_command(command)
+    return engine
+
+def time_saves(store, world, rounds=200):
+    """Return (microseconds per save, final file size) for repeated saves of one session"""
+    engine = GameEngine(world)
+    elapsed = 0.0
+    for number in range(rounds):
+        engine.process_command(COMMANDS[number % len(COMMANDS)])
+        started = time.perf_counter()
+        store.save(engine, "bench")
+        elapsed += time.perf_counter() - started
+    return elapsed / rounds * 1e6, os.path.getsize(store.path("bench"))
+
+def main():
+    """Run the benchmark and print the results"""
+    world = World(initialize_game_world())
+    rnd = random.Random(1)
+    sessions = {f"player-{number}": play(world, rnd) for number in range(SESSIONS)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.bin")
+        started = time.perf_counter()
+        save_sessions(path, sessions)
+        saved = time.perf_counter() - started
+
+        started = time.perf_counter()
+        restored = restore_sessions(world, path)
+        loaded = time.perf_counter() - started
+        assert all(restored[key].export_session() == engine.export_session()
+                   for key, engine in sessions.items())
+
+        print(f"{SESSIONS} sessions, {os.path.getsize(path) / SESSIONS:.0f} bytes each")
+        print(f"  save all:    {saved * 1000:.1f} ms")
+        print(f"  restore all: {loaded * 1000:.1f} ms ({loaded / SESSIONS * 1e6:.1f} us per session)")
+
+        print("\nrepeated saves of one session:")
+        for label, store in (("snapshot", SaveStore(os.path.join(directory, "full"), journal=False)),
+                             ("journal", SaveStore(os.path.join(directory, "journal")))):
+            per_save, size = time_saves(store, world)
+            print(f"  {label:<9} {per_save:>8.1f} us per save, file {size} bytes")
+
+if __name__ == "__main__":
+    main()
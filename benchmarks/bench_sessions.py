@@ -0,0 +1,46 @@
+"""
+Session Benchmark
+Compares creating sessions from deep copies of the world with sharing one World
+"""
+import copy
+import timeit
+import tracemalloc
+
+from game_data import initialize_game_world
+from game_engine import GameEngine
+from world_state import World
+
+SESSIONS = 10000
+PLAYTHROUGH = ["take flashlight", "take note", "n", "n", "use flashlight", "take crowbar", "drop note"]
+
+def measure(make_engine):
+    """Return (microseconds per session, bytes per session after a short playthrough)"""
+    per_session = min(timeit.repeat(make_engine, number=1000, repeat=5)) / 1000 * 1e6
+
+    tracemalloc.start()
+    engines = []
+    for _ in range(SESSIONS):
+        engine = make_engine()
+        for command in PLAYTHROUGH:
+            engine.process_command(command)
+        engines.append(engine)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_session, size / SESSIONS
+
+def main():
+    """Run the benchmark and print a table"""
+    game_world = initialize_game_world()
+    shared = World(game_world)
+
+    rows = [
+        ("deep copy per session", lambda: GameEngine(copy.deepcopy(game_world))),
+        ("shared World", lambda: GameEngine(shared)),
+    ]
+    print(f"{'strategy':<24} {'create (us)':>12} {'bytes/session':>14}")
+    for label, make_engine in rows:
+        create, memory = measure(make_engine)
+        print(f"{label:<24} {create:>12.2f} {memory:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Shared World Benchmark
+Runs hundreds of players as threads in one SharedWorld, checks that no item is
+ever lost or duplicated and that every take is seen by the rest of the room,
+then measures commands/sec with 1 to 500 players crowded into one room and
+spread over many
+
+Python threads take turns, so the numbers show how much locking and
+broadcasting cost, not parallel speedup. In a crowded room every command is
+passed on to every other player there, which is what slows that column down.
+"""
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from shared_world import SharedWorld
+
+ROOMS = 50
+COINS = 20
+PLAYERS = 300
+TOTAL_COMMANDS = 60000
+WANDER = ["take coin", "drop coin", "take key", "drop key", "use key", "e", "w", "look", "i"]
+
+def build_world(coins_per_room=COINS):
+    """Return a ring of rooms full of coins, where the first room's east exit is locked"""
+    rooms, items = {}, {"key": {"name": "Key", "description": "A brass key."}}
+    for number in range(ROOMS):
+        coins = [f"coin_{number}_{index}" for index in range(coins_per_room)]
+        for coin in coins:
+            items[coin] = {"name": "Coin", "description": "A coin."}
+        rooms[f"room_{number}"] = {
+            "name": f"Room {number}", "description": "A round room.",
+            "exits": {"east": f"room_{(number + 1) % ROOMS}", "west": f"room_{(number - 1) % ROOMS}"},
+            "items": coins,
+        }
+    rooms["room_0"]["items"].append("key")
+    rooms["room_0"]["locked_exits"] = {"east": {"description": "locked", "hint": "It needs a key."}}
+    rooms["room_0"]["item_uses"] = {"key": {"unlocks": "east", "message": "The door swings open."}}
+    return {"starting_room": "room_0", "rooms": rooms, "items": items}
+
+def run_players(players, play):
+    """Run play(player) on a thread per player, all starting together; return the seconds taken"""
+    start = threading.Barrier(len(players) + 1)
+    def run(player):
+        start.wait()
+        play(player)
+    threads = [threading.Thread(target=run, args=(player,)) for player in players]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+def item_counts(shared, players):
+    """Return how many times each item is found across every room and inventory"""
+    counts = Counter()
+    for room_id in shared.world.rooms:
+        counts.update(shared.state.room_items(room_id))
+    for player in players:
+        counts.update(player.inventory)
+    return counts
+
+def check_crowded_takes():
+    """Have every player grab coins in one room; each coin must go to exactly one of them"""
+    shared = SharedWorld(build_world())
+    players = [shared.join(f"P{number}") for number in range(PLAYERS)]
+    for player in players:
+        player.take_messages()
+
+    def grab(player):
+        while player.process_command("take coin").startswith("You take"):
+            pass
+    run_players(players, grab)
+
+    taken = Counter(item_id for player in players for item_id in player.inventory)
+    assert len(taken) == COINS and set(taken.values()) == {1}, "a coin was lost or taken twice"
+    # Everyone was in the room the whole time, so everyone saw every take but their own
+    for player in players:
+        seen = sum(message.endswith("takes the Coin.") for message in player.take_messages())
+        assert seen == COINS - len(player.inventory), "a take wasn't broadcast to the room"
+    print(f"{PLAYERS} players grabbing {COINS} coins in one room: each coin taken once, every take seen")
+
+def check_wandering():
+    """Have every player wander and trade items; afterwards each item must be somewhere exactly once"""
+    shared = SharedWorld(build_world())
+    # Unlocks are global: one player opens the door and another without the key walks through
+    opener, walker = shared.join("Opener"), shared.join("Walker")
+    opener.process_command("take key")
+    opener.process_command("use key")
+    assert walker.process_command("e").startswith("\nRoom 1"), "an unlock wasn't seen by another player"
+    players = [opener, walker] + [shared.join(f"P{number}") for number in range(PLAYERS)]
+
+    def wander(player):
+        rnd = random.Random(player.name)
+        for _ in range(200):
+            player.process_command(rnd.choice(WANDER))
+            player.take_messages()
+    run_players(players, wander)
+
+    counts = item_counts(shared, players)
+    assert len(counts) == ROOMS * COINS + 1 and set(counts.values()) == {1}, "an item was lost or duplicated"
+    # Leaving puts a player's items back in the world
+    for player in players:
+        shared.leave(player)
+    assert item_counts(shared, []) == counts
+    print(f"{len(players)} players wandering for 200 commands each: all {len(counts)} items accounted for")
+
+def throughput(player_count, spread):
+    """Return commands/sec for player_count players dropping and taking coins"""
+    # Every player gets a coin first, so a coin is always there to take back
+    per_room = -(-player_count // ROOMS) if spread else player_count
+    shared = SharedWorld(build_world(per_room))
+    players = [shared.join(f"P{number}") for number in range(player_count)]
+    if spread:
+        for number, player in enumerate(players):
+            for _ in range(number % ROOMS):
+                player.process_command("w")
+    for player in players:
+        player.process_command("take coin")
+    commands = TOTAL_COMMANDS // player_count
+
+    def play(player):
+        for number in range(commands):
+            player.process_command("drop coin" if number % 2 == 0 else "take coin")
+            player.messages.clear()
+    return commands * player_count / run_players(players, play)
+
+def main():
+    """Run the checks and the benchmark and print the results"""
+    # Switch threads far more often than usual to shake out races
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        check_crowded_takes()
+        check_wandering()
+    finally:
+        sys.setswitchinterval(interval)
+
+    print(f"\n{'players':>8} {'one room (cmd/s)':>17} {'spread out (cmd/s)':>19}")
+    for player_count in (1, 10, 100, 500):
+        crowded = throughput(player_count, spread=False)
+        spread = throughput(player_count, spread=True)
+        print(f"{player_count:>8} {crowded:>17.0f} {spread:>19.0f}")
+
+if __name__ == "__main__":
+    main()
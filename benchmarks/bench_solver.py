@@ -0,0 +1,57 @@
+"""
+Solver Benchmark
+Times the shortest-path search and the greedy search on chains of 10, 100 and 1k
+locked doors, where each room holds the key to the next
+"""
+import time
+
+from solver import Solver, verify
+
+SIZES = [10, 100, 1000]
+
+def build_world(puzzles):
+    """Return a world of rooms in a row, each east exit locked, with its key in the room"""
+    rooms = {}
+    items = {}
+    for number in range(puzzles + 1):
+        room = {
+            "name": f"Room {number}",
+            "description": f"Room number {number}.",
+            "exits": {},
+            "items": [],
+            "features": {},
+        }
+        if number < puzzles:
+            room["exits"]["east"] = f"room_{number + 1}"
+            room["locked_exits"] = {"east": {"description": "A locked door.", "hint": "Find a key."}}
+            room["items"].append(f"key_{number}")
+            room["item_uses"] = {f"key_{number}": {"message": "Click.", "unlocks": "east"}}
+            items[f"key_{number}"] = {"name": f"Key {number}", "description": "A key.", "takeable": True}
+        else:
+            room["items"].append("trophy")
+            room["item_uses"] = {"trophy": {"message": "You win!", "wins_game": True}}
+            items["trophy"] = {"name": "Trophy", "description": "A trophy.", "takeable": True}
+        if number > 0:
+            room["exits"]["west"] = f"room_{number - 1}"
+        rooms[f"room_{number}"] = room
+    return {"starting_room": "room_0", "rooms": rooms, "items": items}
+
+def timed(func):
+    """Return (result, milliseconds) for one call"""
+    started = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - started) * 1000
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'puzzles':>8} {'states':>8} {'shortest':>10} {'greedy':>9} {'commands':>9}   (ms)")
+    for size in SIZES:
+        game_world = build_world(size)
+        solver = Solver(game_world, budget=10 * size + 10)
+        result, search_time = timed(solver.solve)
+        commands, greedy_time = timed(solver.greedy)
+        assert verify(game_world, result.commands) and verify(game_world, commands)
+        print(f"{size:>8} {result.explored:>8} {search_time:>10.1f} {greedy_time:>9.1f} {len(result.commands):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Startup Benchmark
+Measures the time from launching main.py to its first prompt with each renderer
+"""
+import os
+import subprocess
+import sys
+import time
+
+RUNS = 5
+
+def time_to_first_prompt(renderer, prompt=b"> "):
+    """Start the game and return the seconds until the prompt (or first result) appears"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "--renderer", renderer],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # Headless mode has no prompt, so ask for something and wait for the answer
+    if renderer == "headless":
+        process.stdin.write(b"help\n")
+        process.stdin.flush()
+        prompt = b"Available commands"
+
+    seen = b""
+    while prompt not in seen:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            break
+        seen += chunk
+    elapsed = time.perf_counter() - started
+    # Let the game see the end of its input and finish normally
+    process.stdin.close()
+    process.stdout.read()
+    process.stdout.close()
+    process.wait()
+    return elapsed
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'renderer':<12} {'first prompt (ms)':>18}")
+    for renderer, runs in [("instant", RUNS), ("headless", RUNS), ("typewriter", 1)]:
+        best = min(time_to_first_prompt(renderer) for _ in range(runs))
+        print(f"{renderer:<12} {best * 1000:>18.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Trigger Benchmark
+Times use, take and moving into a room whose world defines 10, 1k and 100k triggers,
+to show dispatch doesn't slow down as the number of rules grows
+"""
+import timeit
+
+from game_engine import GameEngine
+
+SIZES = [10, 1000, 100000]
+
+def build_world(trigger_count):
+    """Return two rooms where the first holds trigger_count use triggers for different items"""
+    items = {"lamp": {"name": "Lamp", "description": "A lamp."}}
+    triggers = [{"on": "use", "item": f"rune_{number}", "if": {"has_item": "lamp"},
+                 "effects": [{"unlock": "east"}], "message": "A rune glows."}
+                for number in range(trigger_count)]
+    triggers.append({"on": "use", "item": "lamp", "if": {"locked": "east"}, "message": "The lamp flickers."})
+    triggers.append({"on": "enter", "if": {"visited": "hall"}, "message": "Welcome back."})
+    rooms = {
+        "hall": {"name": "Hall", "description": "A hall.", "exits": {"east": "vault"},
+                 "items": ["lamp"], "triggers": triggers,
+                 "locked_exits": {"east": {"description": "sealed", "hint": "Runes cover it."}}},
+        "vault": {"name": "Vault", "description": "A vault.", "exits": {"west": "hall"}, "items": []},
+    }
+    return {"starting_room": "hall", "rooms": rooms, "items": items}
+
+def per_command(engine, commands):
+    """Return microseconds per command for commands that leave the engine as it was"""
+    def run():
+        for command in commands:
+            engine.process_command(command)
+    return min(timeit.repeat(run, number=2000, repeat=5)) / 2000 / len(commands) * 1e6
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'triggers':>9} {'use (us)':>9} {'take+drop (us)':>15} {'enter (us)':>11}")
+    for size in SIZES:
+        engine = GameEngine(build_world(size))
+        engine.process_command("take lamp")
+        use = per_command(engine, ["use lamp"])
+        take = per_command(engine, ["drop lamp", "take lamp"])
+        # Nothing above opens the door, so open it for the walk
+        engine.state.unlock_exit("hall", "east")
+        enter = per_command(engine, ["e", "w"])
+        print(f"{size:>9} {use:>9.2f} {take:>15.2f} {enter:>11.2f}")
+
+if __name__ == "__main__":
+    main()
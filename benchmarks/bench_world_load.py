@@ -0,0 +1,52 @@
+"""
+World Load Benchmark
+Times loading JSON worlds of 10, 1k and 100k rooms from source and from the compiled cache
+"""
+import os
+import tempfile
+import time
+
+from world_loader import load_world, save_world
+
+SIZES = [10, 1000, 100000]
+
+def build_world(room_count):
+    """Build a corridor of rooms, each with an item and a feature"""
+    game_world = {"starting_room": "room_0", "rooms": {}, "items": {}}
+    for number in range(room_count):
+        exits = {}
+        if number > 0:
+            exits["west"] = f"room_{number - 1}"
+        if number < room_count - 1:
+            exits["east"] = f"room_{number + 1}"
+        game_world["items"][f"item_{number}"] = {"name": f"Item {number}", "description": "An item."}
+        game_world["rooms"][f"room_{number}"] = {
+            "name": f"Room {number}",
+            "description": "A plain room.",
+            "exits": exits,
+            "items": [f"item_{number}"],
+            "features": {"wall": {"description": "A wall."}},
+        }
+    return game_world
+
+def timed(func):
+    """Return (result, seconds) for one call"""
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+def main():
+    """Run the benchmark and print a table"""
+    print(f"{'rooms':>8} {'source (ms)':>12} {'cached (ms)':>12} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            path = os.path.join(directory, f"world_{size}.json")
+            save_world(build_world(size), path)
+            # The first load parses, validates and writes the cache
+            source, cold = timed(lambda: load_world(path))
+            cached, warm = timed(lambda: load_world(path))
+            assert source == cached
+            print(f"{size:>8} {cold * 1000:>12.1f} {warm * 1000:>12.1f} {cold / warm:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
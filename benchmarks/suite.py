@@ -0,0 +1,247 @@
+"""
+Benchmark Suite
+Times building the world, creating engines, every verb and whole playthroughs on the
+built-in world and on synthetic corridors of 10, 1k and 100k rooms, writes the results
+as JSON and flags anything slower than a stored baseline
+
+Run it from the repository root:
+    python -m benchmarks.suite                   compare against benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline   make this run the new baseline
+
+Timings depend on the machine, so refresh the baseline when moving to a new one.
+Noise on a busy machine isn't a reason to: each case counts the median of its
+repeats, a slowdown has to pass the threshold plus how far the case's repeats
+spread, and a case that does is measured again and only counts if it stays slow.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+from benchmarks.bench_world_load import build_world
+from game_data import initialize_game_world
+from game_engine import GameEngine
+from solver import Solver
+from world_state import World
+
+SIZES = [10, 1000, 100000]
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Slowdown, as a fraction, before a result counts as a regression
+THRESHOLD = 0.25
+# Smaller slowdowns than this, in seconds, are timer noise on sub-microsecond cases
+NOISE_FLOOR = 0.5e-6
+# Times a case over the threshold is measured again before it counts as a regression
+CONFIRM_RUNS = 2
+# Longest walk timed in the synthetic playthroughs
+MAX_WALK = 1000
+
+def engine_at(world, commands):
+    """Return a new engine that has already run some commands"""
+    engine = GameEngine(world)
+    for command in commands:
+        engine.process_command(command)
+    return engine
+
+def repeat_commands(engine, commands):
+    """Return a function that runs commands on engine, for commands that undo each other"""
+    process = engine.process_command
+
+    def run():
+        for command in commands:
+            process(command)
+    return run
+
+def playthrough(world, commands):
+    """Return a function that plays commands on a fresh engine"""
+    def run():
+        engine = GameEngine(world)
+        for command in commands:
+            engine.process_command(command)
+    return run
+
+def builtin_cases():
+    """Yield (name, function, operations per call) for the built-in world"""
+    game_world = initialize_game_world()
+    world = World(game_world)
+    yield "initialize_game_world", initialize_game_world, 1
+    yield "engine/from dict", lambda: GameEngine(game_world), 1
+    yield "engine/shared world", lambda: GameEngine(world), 1
+
+    # Each verb on an engine in the bedroom or the hallway; pairs undo each other
+    bedroom = engine_at(world, ["take flashlight"])
+    hallway = engine_at(world, ["take flashlight", "n"])
+    verbs = [
+        ("look", bedroom, ["look"]),
+        ("examine", bedroom, ["examine bed"]),
+        ("examine partial name", bedroom, ["examine flash"]),
+        ("inventory", bedroom, ["i"]),
+        ("help", bedroom, ["help"]),
+        ("go", hallway, ["s", "n"]),
+        ("take and drop", bedroom, ["take note", "drop note"]),
+        ("use", bedroom, ["use flashlight"]),
+        ("goto", hallway, ["goto bedroom", "goto hallway"]),
+        ("unknown verb", bedroom, ["xyzzy"]),
+        ("empty", bedroom, [""]),
+    ]
+    for name, engine, commands in verbs:
+        yield f"verb/{name}", repeat_commands(engine, commands), len(commands)
+
+    winning = Solver(game_world).solve().commands
+    yield "playthrough/win", playthrough(world, winning), len(winning)
+
+def synthetic_cases(size):
+    """Yield (name, function, operations per call) for a corridor of size rooms"""
+    game_world = build_world(size)
+    world = World(game_world)
+    prefix = f"rooms-{size}"
+    yield f"{prefix}/world", lambda: World(game_world).graph, 1
+    yield f"{prefix}/engine", lambda: GameEngine(world), 1
+
+    far = min(size, MAX_WALK) - 1
+    walk = ["e"] * far
+    engine = engine_at(world, walk + ["w"] * far)
+    yield f"{prefix}/look", repeat_commands(engine, ["look"]), 1
+    yield f"{prefix}/go", repeat_commands(engine, ["e", "w"]), 2
+    yield f"{prefix}/take and drop", repeat_commands(engine, ["take item 0", "drop item 0"]), 2
+    yield f"{prefix}/goto", repeat_commands(engine, [f"goto room {far}", "goto room 0"]), 2
+    commands = [command for number in range(far + 1) for command in (f"take item {number}", "e")]
+    yield f"{prefix}/playthrough", playthrough(world, commands), len(commands)
+
+def measure(func, operations, repeat):
+    """Return the median seconds per operation, and the spread of the repeats as a fraction of it"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = sorted(timer.repeat(repeat, number))
+    median = statistics.median(times)
+    return median / number / operations, (times[-1] - times[0]) / median
+
+def run_suite(sizes=SIZES, name_filter=None, repeat=5, names=None):
+    """Run every case and return dicts of case name to seconds per operation and to spread
+
+    With names given, only those cases are run.
+    """
+    results = {}
+    noise = {}
+    if names is not None:
+        # Synthetic worlds are only built when one of their cases is wanted
+        sizes = [size for size in sizes if any(name.startswith(f"rooms-{size}/") for name in names)]
+    cases = [builtin_cases()] + [synthetic_cases(size) for size in sizes]
+    for case_group in cases:
+        for name, func, operations in case_group:
+            if (name_filter and name_filter not in name) or (names is not None and name not in names):
+                continue
+            results[name], noise[name] = measure(func, operations, repeat)
+            print(f"  {name:<36} {results[name] * 1e6:>12.2f} us  +-{noise[name]:.0%}", file=sys.stderr)
+    return results, noise
+
+def compare(results, baseline, threshold=THRESHOLD, noise=None, baseline_noise=None):
+    """Return (name, baseline seconds, seconds, change) for every case slower than threshold
+
+    A case's threshold is raised by the wider spread of its repeats, in this
+    run or in the baseline, so slowdowns within timer noise aren't flagged.
+    """
+    noise = noise or {}
+    baseline_noise = baseline_noise or {}
+    regressions = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before:
+            change = seconds / before - 1
+            allowed = threshold + max(noise.get(name, 0), baseline_noise.get(name, 0))
+            if change > allowed and seconds - before > NOISE_FLOOR:
+                regressions.append((name, before, seconds, change))
+    return regressions
+
+def confirm(results, noise, baseline, baseline_noise, threshold, sizes, repeat, runs=CONFIRM_RUNS):
+    """Return the regressions that are still there after measuring them again up to runs times
+
+    Busy machines slow down in bursts that can catch any case, while a real
+    regression stays slow however often it is timed. Each case measured again
+    keeps its fastest median.
+    """
+    regressions = compare(results, baseline, threshold, noise, baseline_noise)
+    for _ in range(runs):
+        if not regressions:
+            break
+        print(f"Measuring {len(regressions)} slow case(s) again", file=sys.stderr)
+        again, again_noise = run_suite(sizes, repeat=repeat, names={name for name, _, _, _ in regressions})
+        for name, seconds in again.items():
+            if seconds < results[name]:
+                results[name], noise[name] = seconds, again_noise[name]
+        regressions = compare(results, baseline, threshold, noise, baseline_noise)
+    return regressions
+
+def report(results, baseline):
+    """Return a table of results next to the baseline"""
+    lines = [f"{'case':<36} {'us/op':>12} {'baseline':>12} {'change':>9}"]
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before:
+            lines.append(f"{name:<36} {seconds * 1e6:>12.2f} {before * 1e6:>12.2f} {(seconds / before - 1) * 100:>8.1f}%")
+        else:
+            lines.append(f"{name:<36} {seconds * 1e6:>12.2f} {'-':>12} {'-':>9}")
+    return "\n".join(lines)
+
+def load_results(path):
+    """Return the results and their spreads stored in a JSON file written by this suite"""
+    with open(path, encoding="utf-8") as results_file:
+        document = json.load(results_file)
+    # Files from before spreads were kept have none
+    return document["results"], document.get("noise", {})
+
+def save_results(path, results, noise):
+    """Write results to a JSON file, with enough context to know where they came from"""
+    document = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "results": results,
+        "noise": noise,
+    }
+    with open(path, "w", encoding="utf-8") as results_file:
+        json.dump(document, results_file, indent=2, sort_keys=True)
+        results_file.write("\n")
+
+def main(argv=None):
+    """Run the suite, write the results and check them against the baseline"""
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--output", metavar="PATH", help="write the results to PATH as JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="slowdown that counts as a regression, e.g. 0.25 for 25%%")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES),
+                        help="synthetic world sizes, comma separated")
+    parser.add_argument("--filter", metavar="TEXT", help="only run cases whose name contains TEXT")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats; the median counts")
+    parser.add_argument("--confirm", type=int, default=CONFIRM_RUNS,
+                        help="times a case slower than the baseline is measured again before it counts")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results, noise = run_suite(sizes, args.filter, args.repeat)
+    if args.save_baseline:
+        if args.output:
+            save_results(args.output, results, noise)
+        save_results(args.baseline, results, noise)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    baseline, baseline_noise = load_results(args.baseline) if os.path.exists(args.baseline) else ({}, {})
+    regressions = confirm(results, noise, baseline, baseline_noise, args.threshold, sizes, args.repeat, args.confirm)
+    if args.output:
+        save_results(args.output, results, noise)
+    print(report(results, baseline))
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline by more than "
+              f"{args.threshold:.0%} plus their timing spread:")
+        for name, before, seconds, change in regressions:
+            print(f"  {name}: {before * 1e6:.2f} -> {seconds * 1e6:.2f} us (+{change:.0%})")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Command Journal for Retro Text Adventure
+Appends every command each session runs to a log so that, after a crash, every
+session can be rebuilt by replaying its commands
+
+The journal lives in a directory as numbered generations: sessions-N.sav is a
+snapshot of every session (written by saves.save_sessions) and journal-N.log
+holds the commands run since that snapshot. A command that loads a saved game is
+logged as the state it loaded, so recovery never depends on save files. Commands are buffered and written in
+batches (once batch_size are waiting or flush_interval seconds have passed) and
+synced to disk at most every fsync_interval seconds. A process that dies loses
+only what was still buffered; a machine that loses power, at most one
+fsync_interval more. compact() starts a new generation from the live
+sessions and deletes the old one, which keeps recovery short.
+"""
+import os
+import re
+import time
+
+from game_engine import GameEngine, parse_command
+from saves import _header, _read_records, _record, restore_sessions, save_sessions
+from world_state import as_world
+
+# Journal record kinds, after the ones saves.py uses
+COMMAND = 4
+END = 5
+STATE = 6
+
+GENERATION_FILE = re.compile(r"^sessions-(\d+)\.sav$")
+
+class CommandJournal:
+    """Write-batched, append-only log of the commands every session runs
+
+    Call record() after each command and end() when a session finishes.
+    recover() rebuilds the sessions after a restart. Buffered records are only
+    written when another record arrives, so a server should also call flush()
+    now and then while it is idle.
+    """
+
+    def __init__(self, directory, batch_size=256, flush_interval=0.05, fsync_interval=1.0,
+                 compact_after=100000):
+        """Keep the journal in directory; nothing is written until recover() or the first record"""
+        self.directory = directory
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.flush_interval = flush_interval
+        self.compact_after = compact_after
+        self.generation = 0
+        self.records = 0
+        self.bytes_written = 0
+        self._buffer = []
+        self._file = None
+        self._flushed_at = self._synced_at = time.monotonic()
+
+    def _path(self, kind, generation):
+        """Return the snapshot or journal file of a generation"""
+        if kind == "sessions":
+            return os.path.join(self.directory, f"sessions-{generation}.sav")
+        return os.path.join(self.directory, f"journal-{generation}.log")
+
+    def _generations(self):
+        """Return the generation numbers that have a snapshot, plus 0, newest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return [0]
+        found = {0}
+        for name in names:
+            match = GENERATION_FILE.match(name)
+            if match:
+                found.add(int(match.group(1)))
+        return sorted(found, reverse=True)
+
+    def _open(self):
+        """Open the current generation's journal for appending"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self._path("journal", self.generation), "ab")
+        if self._file.tell() == 0:
+            self._write(_header())
+
+    def _write(self, data):
+        """Write bytes to the journal file and count them"""
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def record(self, session_id, command, engine=None):
+        """Add a command a session ran
+
+        Pass the session's engine too, so a load is logged as the state it
+        loaded rather than as a command that reads a save file.
+        """
+        parsed = parse_command(command) if engine is not None else None
+        if parsed is not None and engine.commands.get(parsed.verb) is GameEngine._cmd_load:
+            self._append(STATE, (session_id, engine.export_session()))
+        else:
+            self._append(COMMAND, (session_id, command))
+
+    def end(self, session_id):
+        """Note that a session finished, so recovery leaves it out"""
+        self._append(END, session_id)
+
+    def _append(self, kind, payload):
+        """Buffer one record, writing the batch once it is full"""
+        self._buffer.append(_record(kind, payload))
+        self.records += 1
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self, sync=False):
+        """Write buffered records in one go, and sync them if the interval is up or sync is set"""
+        if self._file is None:
+            self._open()
+        if self._buffer:
+            self._write(b"".join(self._buffer))
+            self._buffer = []
+        self._file.flush()
+        now = self._flushed_at = time.monotonic()
+        if sync or now - self._synced_at >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._synced_at = now
+
+    def should_compact(self):
+        """Return whether enough has been logged that compact() is worthwhile"""
+        return self.records >= self.compact_after
+
+    def compact(self, sessions):
+        """Snapshot the live sessions as a new generation and delete the older ones
+
+        sessions maps session ids to engines and must include every session
+        whose commands were recorded and that hasn't ended.
+        """
+        if self._file is not None:
+            self.flush(sync=True)
+            self._file.close()
+            self._file = None
+        os.makedirs(self.directory, exist_ok=True)
+        old_generation = self.generation
+        self.generation += 1
+        snapshot = self._path("sessions", self.generation)
+        live = {session_id: engine for session_id, engine in sessions.items() if engine.is_running}
+        save_sessions(snapshot, live, fsync=True)
+        self.bytes_written += os.path.getsize(snapshot)
+        self._open()
+        self.flush(sync=True)
+
+        # The new snapshot is on disk, so everything before it can go
+        for generation in range(old_generation + 1):
+            for kind in ("sessions", "journal"):
+                try:
+                    os.remove(self._path(kind, generation))
+                except FileNotFoundError:
+                    pass
+        self.records = 0
+
+    def recover(self, world, save_store=None):
+        """Rebuild every session from the newest snapshot and the journal after it
+
+        Returns a dict of session ids to engines. If save_store is given, each
+        keeps its saved games in the store's folder for its session. The recovered sessions are compacted straight away,
+        so a record torn by the crash is never appended to.
+        """
+        world = as_world(world)
+        self.generation = self._generations()[0]
+        snapshot = self._path("sessions", self.generation)
+        sessions = restore_sessions(world, snapshot, save_store) if os.path.exists(snapshot) else {}
+
+        try:
+            with open(self._path("journal", self.generation), "rb") as journal_file:
+                data = journal_file.read()
+        except FileNotFoundError:
+            data = b""
+        if data:
+            for kind, payload in _read_records(data):
+                if kind in (COMMAND, STATE):
+                    session_id, value = payload
+                    engine = sessions.get(session_id)
+                    if engine is None:
+                        engine = sessions[session_id] = GameEngine(world)
+                        if save_store is not None:
+                            engine.save_store = save_store.for_session(session_id)
+                    if kind == COMMAND:
+                        engine.process_command(value)
+                    else:
+                        engine.load_session(value)
+                elif kind == END:
+                    sessions.pop(payload, None)
+
+        sessions = {session_id: engine for session_id, engine in sessions.items() if engine.is_running}
+        self.compact(sessions)
+        return sessions
+
+    def close(self):
+        """Write and sync everything buffered, then close the journal"""
+        if self._file is not None or self._buffer:
+            self.flush(sync=True)
+            self._file.close()
+            self._file = None
@@ -0,0 +1,92 @@
+"""
+Command Memo for Retro Text Adventure
+Remembers the output of read-only commands such as look, examine and inventory,
+so repeating one costs a dictionary lookup until something changes
+
+A CommandMemo belongs to one engine and holds results for a single state
+version: the engine's own version, the world state's generation and the version
+of the room the player is in. They are kept as three numbers, so checking them
+on a hit builds nothing. When any of them change, everything is dropped.
+Entries are evicted oldest-first once their text passes max_bytes.
+"""
+from collections import OrderedDict
+
+# Rough bytes an entry costs besides its text: the key tuple and the dict slot
+ENTRY_OVERHEAD = 200
+
+class MemoStats:
+    """Hits and misses of every engine's memo, per verb, for monitoring
+
+    The counts are added to without a lock, so with engines on several
+    threads (server.py --shared) a few can be lost; treat them as approximate.
+    """
+
+    def __init__(self):
+        """Start with nothing counted"""
+        self.hits = {}
+        self.misses = {}
+
+    def hit_rate(self, verb=None):
+        """Return the fraction of lookups that were hits, for one verb or all of them"""
+        if verb is None:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        else:
+            hits, misses = self.hits.get(verb, 0), self.misses.get(verb, 0)
+        return hits / (hits + misses) if hits or misses else 0.0
+
+    def snapshot(self):
+        """Return the counts as a JSON-friendly dict of verb -> hits, misses and hit rate"""
+        return {verb: {"hits": self.hits.get(verb, 0), "misses": self.misses.get(verb, 0),
+                       "hit_rate": self.hit_rate(verb)}
+                for verb in sorted(set(self.hits) | set(self.misses))}
+
+    def reset(self):
+        """Forget every count"""
+        self.hits = {}
+        self.misses = {}
+
+# Shared by every engine in the process
+memo_stats = MemoStats()
+
+class CommandMemo:
+    """LRU of command outputs that are only valid for one state version"""
+
+    __slots__ = ("max_bytes", "engine_version", "generation", "room_version", "size", "_entries")
+
+    def __init__(self, max_bytes):
+        """Keep at most about max_bytes of results"""
+        self.max_bytes = max_bytes
+        self.engine_version = self.generation = self.room_version = None
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return the output stored for key, or None; check the versions first"""
+        output = self._entries.get(key)
+        if output is not None:
+            self._entries.move_to_end(key)
+        return output
+
+    def put(self, key, output, engine_version, generation, room_version):
+        """Store a command's output, evicting the least recently used results if needed"""
+        if (engine_version != self.engine_version or generation != self.generation
+                or room_version != self.room_version):
+            self.clear()
+            self.engine_version, self.generation, self.room_version = engine_version, generation, room_version
+        cost = len(output) + ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            return
+        self._entries[key] = output
+        self.size += cost
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted) + ENTRY_OVERHEAD
+
+    def clear(self):
+        """Drop every stored result"""
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self):
+        """Return the number of stored results"""
+        return len(self._entries)
@@ -0,0 +1,206 @@
+"""
+Compact World for Retro Text Adventure
+Stores rooms and items as __slots__ records with integer ids and direction codes
+instead of nested dicts, and serves them back through read-only dict views so the
+rest of the game doesn't notice the difference
+"""
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# How many rooms and items keep a ready-made dict view
+VIEW_CACHE_SIZE = 4096
+
+class Room:
+    """One room's strings and rarely used parts; exits and items live in CompactWorld's arrays"""
+
+    __slots__ = ("name", "description", "features", "locked_exits", "item_uses", "triggers")
+
+class Item:
+    """One item"""
+
+    __slots__ = ("name", "description", "takeable")
+
+class CompactWorld:
+    """A game world packed into Room and Item records and flat arrays
+
+    Room and item ids become numbers and directions become codes into one
+    shared table. Every room's exits and items are stored back to back in
+    arrays, with room n's share running from exit_start[n] to exit_start[n + 1]
+    (and the same for items), so a room costs a few machine words instead of
+    several dicts and lists. Repeated strings are stored once.
+
+    game_world() returns a dict with the usual "starting_room", "rooms" and
+    "items" keys, so GameEngine, World and everything else can use it unchanged.
+    """
+
+    def __init__(self, game_world):
+        """Pack a game world dict"""
+        self.room_ids = list(game_world["rooms"])
+        self.room_numbers = {room_id: number for number, room_id in enumerate(self.room_ids)}
+        self.item_ids = list(game_world["items"])
+        self.item_numbers = {item_id: number for number, item_id in enumerate(self.item_ids)}
+        self.starting_room = game_world["starting_room"]
+        self.directions = []
+        self.direction_codes = {}
+        # Strings seen so far, so repeated descriptions are kept once
+        self._strings = {}
+
+        self.items = []
+        for item in game_world["items"].values():
+            record = Item()
+            record.name = self._intern(item["name"])
+            record.description = self._intern(item["description"])
+            # None when the world file leaves takeable out
+            record.takeable = item.get("takeable")
+            self.items.append(record)
+
+        self.rooms = []
+        self.exit_start = array("L", [0])
+        self.exit_codes = array("H")
+        self.exit_targets = array("l")
+        self.item_start = array("L", [0])
+        self.room_items = array("L")
+        # (room number, exit position) -> target id, for exits to rooms that don't exist
+        self.missing_targets = {}
+        for room in game_world["rooms"].values():
+            self._pack_room(room)
+        self._strings = None
+
+    def _intern(self, text):
+        """Return a shared copy of a string"""
+        return self._strings.setdefault(text, text)
+
+    def _direction_code(self, direction):
+        """Return the code for a direction, adding it to the table if it is new"""
+        code = self.direction_codes.get(direction)
+        if code is None:
+            code = self.direction_codes[direction] = len(self.directions)
+            self.directions.append(sys.intern(direction))
+        return code
+
+    def _pack_room(self, room):
+        """Add a room dict to the records and arrays"""
+        number = len(self.rooms)
+        for direction, target in room["exits"].items():
+            target_number = self.room_numbers.get(target, -1)
+            if target_number < 0:
+                self.missing_targets[number, len(self.exit_targets)] = target
+            self.exit_codes.append(self._direction_code(direction))
+            self.exit_targets.append(target_number)
+        self.exit_start.append(len(self.exit_targets))
+        self.room_items.extend(self.item_numbers[item_id] for item_id in room["items"])
+        self.item_start.append(len(self.room_items))
+
+        record = Room()
+        record.name = self._intern(room["name"])
+        record.description = self._intern(room["description"])
+        # Optional parts are None when the room leaves them out; features are
+        # kept as one flat tuple of id, description, id, description...
+        features = room.get("features")
+        if features is not None:
+            features = tuple(text for feature_id, feature in features.items()
+                             for text in (sys.intern(feature_id), self._intern(feature["description"])))
+        record.features = features
+        record.locked_exits = room.get("locked_exits")
+        record.item_uses = room.get("item_uses")
+        record.triggers = room.get("triggers")
+        self.rooms.append(record)
+
+    def room_dict(self, number):
+        """Rebuild the dict for a room"""
+        record = self.rooms[number]
+        room_ids, directions, targets = self.room_ids, self.directions, self.exit_targets
+        exits = {}
+        for position in range(self.exit_start[number], self.exit_start[number + 1]):
+            target = targets[position]
+            if target < 0:
+                exits[directions[self.exit_codes[position]]] = self.missing_targets[number, position]
+            else:
+                exits[directions[self.exit_codes[position]]] = room_ids[target]
+        item_ids = self.item_ids
+        room = {
+            "name": record.name,
+            "description": record.description,
+            "exits": exits,
+            "items": [item_ids[item] for item in self.room_items[self.item_start[number]:self.item_start[number + 1]]],
+        }
+        features = record.features
+        if features is not None:
+            room["features"] = {features[position]: {"description": features[position + 1]}
+                                for position in range(0, len(features), 2)}
+        if record.locked_exits is not None:
+            room["locked_exits"] = record.locked_exits
+        if record.item_uses is not None:
+            room["item_uses"] = record.item_uses
+        if record.triggers is not None:
+            room["triggers"] = record.triggers
+        return room
+
+    def item_dict(self, number):
+        """Rebuild the dict for an item"""
+        record = self.items[number]
+        item = {"name": record.name, "description": record.description}
+        if record.takeable is not None:
+            item["takeable"] = record.takeable
+        return item
+
+    def game_world(self):
+        """Return a game world dict whose rooms and items are views of the records"""
+        return {
+            "starting_room": self.starting_room,
+            "rooms": CompactView(self.room_ids, self.room_numbers, self.room_dict),
+            "items": CompactView(self.item_ids, self.item_numbers, self.item_dict),
+        }
+
+class CompactView(Mapping):
+    """A read-only mapping of ids to dicts rebuilt from packed records
+
+    The most recently used dicts are kept, so a room the player is standing in
+    isn't rebuilt for every command. Callers must not change the dicts. Threads
+    can share a view: the cache is only added to and trimmed under a lock.
+    """
+
+    def __init__(self, ids, numbers, build, cache_size=VIEW_CACHE_SIZE):
+        """Serve build(number) for each id in ids"""
+        self._ids = ids
+        self._numbers = numbers
+        self._build = build
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        """Return the dict for an id"""
+        value = self._cache.get(key)
+        if value is not None:
+            try:
+                self._cache.move_to_end(key)
+            except KeyError:
+                # Another thread evicted it since the get; the dict is still good
+                pass
+            return value
+        value = self._build(self._numbers[key])
+        with self._lock:
+            self._cache[key] = value
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def __contains__(self, key):
+        """Return whether an id exists, without building its dict"""
+        return key in self._numbers
+
+    def __iter__(self):
+        """Iterate over ids in their original order"""
+        return iter(self._ids)
+
+    def __len__(self):
+        """Return the number of entries"""
+        return len(self._ids)
+
+def compact_world(game_world):
+    """Return a packed copy of a game world dict that works anywhere the dict did"""
+    return CompactWorld(game_world).game_world()
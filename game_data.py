@@ -3,6 +3,15 @@ Game Data for Retro Text Adventure
 Contains all game content: rooms, items, and game world structure
 """
 
+# Shown when the game starts
+INTRO_TEXT = """
+    You wake up in a dimly lit room. Your head is pounding and you can't 
+    remember how you got here. The air is musty and cold. You need to 
+    find your way out and discover what happened to you...
+    
+    Type 'help' at any time to see available commands.
+    """
+
 def initialize_game_world():
     """Create and return the initial game world data structure"""
     
@@ -3,87 +3,328 @@ Game Engine for Retro Text Adventure
 Handles game mechanics, command processing, and game state
 """
 
+from collections import namedtuple
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from command_memo import CommandMemo, memo_stats
+from triggers import fire
+from world_graph import ReachableSet
+from world_index import TYPO, NameIndex, NounMatcher, add_item_noun, fold_name, remove_item_noun, scope_matcher
+from world_state import WorldState, as_world
+
+# Directional shortcuts and the direction each one moves in
+DIRECTION_SHORTCUTS = {
+    "n": "north", "s": "south", "e": "east", "w": "west",
+    "north": "north", "south": "south", "east": "east", "west": "west",
+    "up": "up", "down": "down"
+}
+
+# Used by save and load when no name is given
+DEFAULT_SAVE_NAME = "game"
+# Most partly matching names a noun is looked up under
+MAX_CANDIDATES = 32
+# Up to this many items and features in reach, partial names are matched with
+# one matcher over all of them instead of following each item as it moves
+SMALL_SCOPE = 64
+
+class Command(namedtuple("Command", ["text", "verb", "args", "target"])):
+    """A parsed command: the raw text, the verb, its argument words and the joined target"""
+    __slots__ = ()
+
+@lru_cache(maxsize=4096)
+def parse_command(command):
+    """Split a command into a Command, or return None if it is empty"""
+    words = command.split()
+    if not words:
+        return None
+    args = tuple(words[1:])
+    return Command(command, words[0], args, " ".join(args))
+
 class GameEngine:
     """Main game engine class that processes commands and manages game state"""
     
+    # Maps every verb, alias and direction shortcut to handler(engine, command)
+    commands = {}
+    # Most bytes of pure command output each engine remembers; 0 turns memoizing off
+    memo_max_bytes = 32 * 1024
+    
     def __init__(self, game_world):
-        """Initialize the game engine with the game world data"""
-        self.game_world = game_world
-        self.current_room = game_world["starting_room"]
+        """Initialize the game engine with a game world dict or a shared World"""
+        self.world = as_world(game_world)
+        self.game_world = self.world.game_world
+        self.state = WorldState(self.world)
+        self.current_room = self.world.starting_room
         self.inventory = []
+        self.inventory_index = NameIndex()
         self.is_running = True
         self.game_won = False
         self.visited_rooms = set()
+        # Where save and load keep games; see saves.SaveStore
+        self.save_store = None
+        # Rooms first visited since take_changes(), once track_changes() is called
+        self._unsaved_visits = None
+        # Rooms reachable from the start, built by reachable_rooms() when first needed
+        self._reachable = None
+        # Goes up whenever this player's own state changes, so remembered outputs are dropped
+        self.version = 0
+        # Outputs of pure commands, made on first use
+        self._memo = None
+        # NounMatcher over the inventory, made when a partial name is first looked up
+        self._inventory_matcher = None
+        # NounMatcher over everything in reach in a small room, with the items it
+        # covers and the state version it was last checked at
+        self._matcher = None
+        self._matcher_scope = None
+        self._matcher_version = None
     
     def process_command(self, command):
         """Process player commands and return the result"""
-        # Split the command into words
-        words = command.split()
+        output = self.run_command(command)
+        if isinstance(output, str):
+            return output
+        return "".join(output)
+    
+    def command_output(self, command):
+        """Run a command and return its output as a list of string fragments
+        
+        Front-ends can hand the fragments to their output sink, which joins
+        them once, instead of every handler building one big string.
+        """
+        output = self.run_command(command)
+        if isinstance(output, str):
+            return [output]
+        return output
+    
+    def run_command(self, command):
+        """Run a command and return its output: a string, or a list of string fragments"""
+        # Split the command into a verb and its arguments
+        parsed = parse_command(command)
         
         # Handle empty command
-        if not words:
+        if parsed is None:
             return "Please enter a command."
         
-        # Get the first word (the action)
-        action = words[0]
+        # Look up the handler for the verb in the command table
+        handler = self.commands.get(parsed.verb)
+        if handler is None:
+            return f"I don't understand '{command}'. Type 'help' for a list of commands."
         
-        # Process different commands
-        if action in ["quit", "exit"]:
-            self.is_running = False
-            return "Goodbye!"
-            
-        elif action == "help":
-            return self._get_help()
-            
-        elif action in ["look", "examine"]:
-            if len(words) > 1:
-                target = " ".join(words[1:])
-                return self._examine_object(target)
-            else:
-                return self._look_around()
-                
-        elif action in ["go", "move", "walk"]:
-            if len(words) > 1:
-                direction = words[1]
-                return self._move(direction)
-            else:
-                return "Go where? Try 'go north', 'go south', etc."
-                
-        elif action in ["take", "get", "grab"]:
-            if len(words) > 1:
-                item = " ".join(words[1:])
-                return self._take_item(item)
-            else:
-                return "Take what? Try 'take [item name]'."
-                
-        elif action in ["drop", "leave"]:
-            if len(words) > 1:
-                item = " ".join(words[1:])
-                return self._drop_item(item)
-            else:
-                return "Drop what? Try 'drop [item name]'."
-                
-        elif action in ["inventory", "i"]:
-            return self._show_inventory()
-            
-        elif action in ["use"]:
-            if len(words) > 1:
-                item = " ".join(words[1:])
-                return self._use_item(item)
-            else:
-                return "Use what? Try 'use [item name]'."
+        # Handlers may also return a generator; it is run to the end here so
+        # the command has taken effect before anything is written
+        output = handler(self, parsed)
+        if isinstance(output, (str, list)):
+            return output
+        return list(output)
+    
+    def _run_pure(self, handler, parsed):
+        """Run a read-only command, reusing its output while nothing has changed
         
-        # Handle directional shortcuts
-        elif action in ["north", "n", "south", "s", "east", "e", "west", "w", "up", "down"]:
-            direction_map = {
-                "n": "north", "s": "south", "e": "east", "w": "west",
-                "north": "north", "south": "south", "east": "east", "west": "west",
-                "up": "up", "down": "down"
-            }
-            return self._move(direction_map[action])
-            
+        Outputs are remembered for one version of what they can depend on:
+        this player's state, and the items and exits of the room they are in.
+        """
+        if not self.memo_max_bytes:
+            return handler(self, parsed)
+        engine_version = self.version
+        state = self.state
+        generation = state.generation
+        room_version = state.versions.get(self.current_room, 0)
+        memo = self._memo
+        if memo is None:
+            memo = self._memo = CommandMemo(self.memo_max_bytes)
+        elif (memo.engine_version == engine_version and memo.generation == generation
+              and memo.room_version == room_version):
+            # Results are keyed by the command's exact text
+            output = memo.get(parsed.text)
+            if output is not None:
+                hits = memo_stats.hits
+                hits[parsed.verb] = hits.get(parsed.verb, 0) + 1
+                return output
+        misses = memo_stats.misses
+        misses[parsed.verb] = misses.get(parsed.verb, 0) + 1
+        
+        output = handler(self, parsed)
+        if not isinstance(output, str):
+            output = "".join(output)
+        # Looking at something can still set off a trigger that changes things;
+        # that output is only right this once
+        if (self.version == engine_version and state.generation == generation
+                and state.versions.get(self.current_room, 0) == room_version):
+            memo.put(parsed.text, output, engine_version, generation, room_version)
+        return output
+    
+    @classmethod
+    def register_command(cls, verbs, handler, pure=False):
+        """Register handler(engine, command) for one or more verbs
+        
+        The handler returns the output as a string or as an iterable of
+        string fragments. Pass pure=True for handlers that only read the game
+        state; their output is remembered until the state changes. The
+        engine's own methods note every change they make, so a handler that
+        changes the player's state some other way should add 1 to
+        engine.version.
+        """
+        # Give subclasses their own table so they don't change the base engine
+        if "commands" not in cls.__dict__:
+            cls.commands = dict(cls.commands)
+        
+        # Pure handlers go through the memo; other verbs don't pay for it
+        if pure:
+            handler = _memoized(handler)
+        if isinstance(verbs, str):
+            verbs = [verbs]
+        for verb in verbs:
+            cls.commands[verb] = handler
+    
+    def _cmd_quit(self, command):
+        """Stop the game"""
+        self.is_running = False
+        return "Goodbye!"
+    
+    def _cmd_help(self, command):
+        """Show the help text"""
+        return self._get_help()
+    
+    def _cmd_look(self, command):
+        """Look around the room, or examine an object if one is named"""
+        if command.args:
+            return self._examine_object(command.target)
         else:
-            return f"I don't understand '{command}'. Type 'help' for a list of commands."
+            return self._look_around()
+    
+    def _cmd_go(self, command):
+        """Move in the direction given as the first argument"""
+        if command.args:
+            return self._move(command.args[0])
+        else:
+            return "Go where? Try 'go north', 'go south', etc."
+    
+    def _cmd_take(self, command):
+        """Pick up the named item"""
+        if command.args:
+            return self._take_item(command.target)
+        else:
+            return "Take what? Try 'take [item name]'."
+    
+    def _cmd_drop(self, command):
+        """Drop the named item"""
+        if command.args:
+            return self._drop_item(command.target)
+        else:
+            return "Drop what? Try 'drop [item name]'."
+    
+    def _cmd_inventory(self, command):
+        """Show the inventory"""
+        return self._show_inventory()
+    
+    def _cmd_use(self, command):
+        """Use the named item"""
+        if command.args:
+            return self._use_item(command.target)
+        else:
+            return "Use what? Try 'use [item name]'."
+    
+    def _cmd_save(self, command):
+        """Save the game under a name"""
+        if self.save_store is None:
+            return "Saving isn't available in this game."
+        return self.save_store.save_command(self, command.target or DEFAULT_SAVE_NAME)
+    
+    def _cmd_load(self, command):
+        """Restore a saved game by name"""
+        if self.save_store is None:
+            return "Saving isn't available in this game."
+        return self.save_store.load_command(self, command.target or DEFAULT_SAVE_NAME)
+    
+    def _cmd_key(self, command):
+        """Show the key to this session's saved games, or switch to another key's"""
+        if self.save_store is None:
+            return "Saving isn't available in this game."
+        return self.save_store.key_command(self, command.target)
+    
+    def _cmd_goto(self, command):
+        """Travel to a room visited before, by the shortest open path"""
+        if not command.args:
+            return "Go to where? Try 'goto [room name]'."
+        
+        graph = self.world.room_graph
+        room_id = graph.find_room(command.target)
+        if room_id is None:
+            # Rooms are only named once compiled, which the player's own may not be yet
+            graph.add_rooms(self.visited_rooms)
+            graph.add_room(self.world.starting_room)
+            room_id = graph.find_room(command.target)
+        # Only rooms the player has seen, or woke up in, can be travelled to
+        known = room_id in self.visited_rooms or room_id == self.world.starting_room
+        if room_id is None or not known:
+            return f"You don't know a place called '{command.target}'."
+        if room_id == self.current_room:
+            return "You're already here."
+        
+        # The way there only leads through rooms the player has been to, so
+        # the search never reads rooms they haven't
+        path = graph.shortest_path(self.current_room, room_id, self.visited_rooms, self.state.unlocked_exits)
+        if path is None:
+            return f"You can't find a way to the {self.world.rooms[room_id]['name']} from here."
+        
+        # Walk the path a room at a time, setting off arrival triggers as a move
+        # would; the walk ends early if one of them ends the game
+        taken = []
+        messages = []
+        for direction in path:
+            self._enter_room(self.world.rooms[self.current_room]["exits"][direction])
+            taken.append(direction)
+            messages.extend(fire(self, "enter"))
+            self._mark_visited(self.current_room)
+            if self.game_won or not self.is_running:
+                break
+        return _with_messages(f"You make your way {', '.join(taken)}.\n" + self._look_around(), messages)
+    
+    def reachable_rooms(self):
+        """Return the ReachableSet of rooms that can be walked to from the start"""
+        if self._reachable is None:
+            self._reachable = ReachableSet(self.world.graph, self.world.starting_room,
+                                           self.state.unlocked_exits)
+        return self._reachable
+    
+    def export_session(self):
+        """Return this session's difference from the starting world as plain data"""
+        return (self.current_room, list(self.inventory), set(self.visited_rooms),
+                self.game_won, self.state.export())
+    
+    def load_session(self, exported):
+        """Replace this session's state with data from export_session()"""
+        current_room, inventory, visited_rooms, game_won, state = exported
+        self.current_room = current_room
+        self.visited_rooms = set(visited_rooms)
+        self.game_won = game_won
+        self.state.load(state)
+        self._set_inventory(inventory)
+        self._reachable = None
+        self.version += 1
+    
+    def track_changes(self):
+        """Start recording changes so take_changes() can return just those"""
+        self.state.track_changes()
+        self._unsaved_visits = set()
+    
+    def take_changes(self):
+        """Return what changed since the last call as plain data, and start over"""
+        visits = self._unsaved_visits
+        self._unsaved_visits = set()
+        return (self.current_room, list(self.inventory), visits, self.game_won,
+                self.state.take_changes())
+    
+    def apply_changes(self, changes):
+        """Apply data from take_changes() on top of the current state"""
+        current_room, inventory, visits, game_won, state = changes
+        self.current_room = current_room
+        self.visited_rooms.update(visits)
+        self.game_won = game_won
+        self.state.apply_changes(state)
+        self._set_inventory(inventory)
+        self._reachable = None
+        self.version += 1
     
     def _get_help(self):
         """Return help text with available commands"""
@@ -95,6 +336,9 @@ Available commands:
 - drop [item] - Drop an item from your inventory
 - inventory or i - Show items you're carrying
 - use [item] - Use an item in your inventory
+- goto [room] - Travel to a room you have visited before
+- save [name] - Save your progress
+- load [name] - Load a saved game
 - quit or exit - End the game
 - help - Show this help text
 
@@ -104,57 +348,111 @@ You can also use shortcuts for directions: n, s, e, w
     
     def _look_around(self):
         """Return description of the current room"""
-        room = self.game_world["rooms"][self.current_room]
-        
         # Mark room as visited
-        self.visited_rooms.add(self.current_room)
-        
-        # Build the description
-        description = f"\n{room['name']}\n"
-        description += f"{'-' * len(room['name'])}\n"
-        description += f"{room['description']}\n"
+        self._mark_visited(self.current_room)
         
-        # List available exits
-        exits = []
-        for direction, room_id in room["exits"].items():
-            exits.append(direction)
-        
-        if exits:
-            description += f"\nExits: {', '.join(exits)}\n"
-        else:
-            description += "\nThere are no obvious exits.\n"
-        
-        # List items in the room
-        if room["items"]:
-            description += "\nYou can see:\n"
-            for item in room["items"]:
-                description += f"- {self.game_world['items'][item]['name']}\n"
-        
-        return description
+        # Descriptions are cached until the room's items change
+        return self.state.room_description(self.current_room)
+    
+    def _mark_visited(self, room_id):
+        """Add a room to the visited rooms"""
+        if room_id not in self.visited_rooms:
+            if self._unsaved_visits is not None:
+                self._unsaved_visits.add(room_id)
+            self.visited_rooms.add(room_id)
+            self.version += 1
     
     def _examine_object(self, target):
         """Examine a specific object or item"""
         room = self.game_world["rooms"][self.current_room]
+        features = self.world.index.room_features(self.current_room)
         
-        # Check if the target is an item in the room
-        for item_id in room["items"]:
-            item = self.game_world["items"][item_id]
-            if target.lower() == item["name"].lower():
-                return item["description"]
+        # Look for an item in the room, then in the inventory, then a feature of the room
+        place, found = self._find_noun(target, [
+            lambda name: self.state.find_room_item(self.current_room, name),
+            self.inventory_index.find,
+            lambda name: features.get(fold_name(name)),
+        ])
+        if place is None:
+            return f"You don't see any {target} here."
+        if place == 2:
+            description = room["features"][found]["description"]
+        else:
+            description = self.game_world["items"][found]["description"]
+        return _with_messages(description, fire(self, "examine", found))
+    
+    def _find_noun(self, target, lookups):
+        """Return (lookup number, id) for what the player meant by target, or (None, None)
         
-        # Check if the target is an item in inventory
-        for item_id in self.inventory:
-            item = self.game_world["items"][item_id]
-            if target.lower() == item["name"].lower():
-                return item["description"]
+        lookups are functions that find an exact name in one place, such as the
+        room or the inventory, in order of preference. If none knows target
+        itself, the names it partly matches are tried, best matches first.
+        """
+        for place, lookup in enumerate(lookups):
+            found = lookup(target)
+            if found is not None:
+                return place, found
+        
+        # Fall back on prefixes, single words and typos among the names in reach
+        candidates = self._match_noun(target)
+        for score in sorted(set(candidates.values())):
+            names = [name for name, name_score in candidates.items() if name_score == score]
+            for place, lookup in enumerate(lookups):
+                for name in names:
+                    found = lookup(name)
+                    if found is not None:
+                        return place, found
+        return None, None
+    
+    def _match_noun(self, target):
+        """Return the names in reach that target partly matches, to how well they match
         
-        # Check if the target is a feature in the room
-        if "features" in room:
-            for feature_id, feature in room["features"].items():
-                if target.lower() == feature_id.lower():
-                    return feature["description"]
+        In a big room, the room's starting items and features share one matcher
+        across sessions, and items put into the room and the inventory have
+        matchers that follow them as they move, so nothing is rebuilt after a
+        take or drop.
+        """
+        room_id = self.current_room
+        features = self.world.index.room_features(room_id)
+        if (len(self.game_world["rooms"][room_id]["items"]) + len(self.state.added_items.get(room_id, ()))
+                + len(self.inventory) + len(features) <= SMALL_SCOPE):
+            return self._scope_matcher(room_id, features).match(target, MAX_CANDIDATES)
         
-        return f"You don't see any {target} here."
+        found = self.world.index.room_matcher(room_id).match(target, MAX_CANDIDATES)
+        merged = False
+        for matcher in (self.state.added_matcher(room_id), self._inventory_nouns()):
+            if matcher:
+                for name, score in matcher.match(target, MAX_CANDIDATES).items():
+                    if score < found.get(name, TYPO + 1):
+                        found[name] = score
+                        merged = True
+        # Each matcher's results are already in order, so one on its own needs no sorting
+        if not merged:
+            return found
+        return dict(sorted(found.items(), key=itemgetter(1))[:MAX_CANDIDATES])
+    
+    def _scope_matcher(self, room_id, features):
+        """Return a NounMatcher over the items in reach and the room's features"""
+        state = self.state
+        version = (self.version, state.generation, room_id, state.versions.get(room_id, 0))
+        if self._matcher_version != version:
+            # Taking or dropping moves an item between the room and the inventory,
+            # so the matcher is only rebuilt when the items in reach change
+            scope = (room_id, frozenset(chain(state.room_items(room_id), self.inventory)))
+            if scope != self._matcher_scope:
+                self._matcher = scope_matcher(scope[1], self.game_world["items"], features)
+                self._matcher_scope = scope
+            self._matcher_version = version
+        return self._matcher
+    
+    def _inventory_nouns(self):
+        """Return a NounMatcher over the inventory, or None if it is empty"""
+        if self._inventory_matcher is None and self.inventory:
+            matcher = self._inventory_matcher = NounMatcher()
+            items = self.game_world["items"]
+            for item_id in self.inventory:
+                add_item_noun(matcher, item_id, items[item_id]["name"])
+        return self._inventory_matcher
     
     def _move(self, direction):
         """Move player in the specified direction"""
@@ -163,100 +461,154 @@ You can also use shortcuts for directions: n, s, e, w
         # Check if the direction is valid
         if direction in room["exits"]:
             # Check if the exit is locked
-            if "locked_exits" in room and direction in room["locked_exits"]:
-                lock_info = room["locked_exits"][direction]
+            lock_info = self.state.locked_exit(self.current_room, direction)
+            if lock_info is not None:
                 return f"The way {direction} is {lock_info['description']}. {lock_info['hint']}"
             
-            # Move to the new room
-            self.current_room = room["exits"][direction]
+            # Move to the new room; arrival triggers run before it is described
+            self._enter_room(room["exits"][direction])
+            messages = fire(self, "enter")
+            if messages:
+                return _with_messages(self._look_around(), messages)
             return self._look_around()
         else:
             return f"You can't go {direction} from here."
     
+    def _enter_room(self, room_id):
+        """Put the player in another room"""
+        self.current_room = room_id
+        self.version += 1
+    
     def _take_item(self, item_name):
         """Pick up an item from the current room"""
-        room = self.game_world["rooms"][self.current_room]
-        
         # Check if the item is in the room
-        for item_id in room["items"]:
+        _, item_id = self._find_noun(item_name, [
+            lambda name: self.state.find_room_item(self.current_room, name)])
+        if item_id is not None:
             item = self.game_world["items"][item_id]
-            if item_name.lower() == item["name"].lower():
-                if item.get("takeable", True):
-                    # Remove from room and add to inventory
-                    room["items"].remove(item_id)
-                    self.inventory.append(item_id)
-                    return f"You take the {item['name']}."
-                else:
-                    return f"You can't take the {item['name']}."
+            if item.get("takeable", True):
+                # Remove from room and add to inventory
+                self.state.remove_room_item(self.current_room, item_id)
+                self._add_to_inventory(item_id)
+                return _with_messages(f"You take the {item['name']}.", fire(self, "take", item_id))
+            else:
+                return f"You can't take the {item['name']}."
         
         return f"You don't see any {item_name} here."
     
     def _drop_item(self, item_name):
         """Drop an item from inventory into the current room"""
-        room = self.game_world["rooms"][self.current_room]
-        
         # Check if the item is in inventory
-        for item_id in self.inventory:
+        _, item_id = self._find_noun(item_name, [self.inventory_index.find])
+        if item_id is not None:
             item = self.game_world["items"][item_id]
-            if item_name.lower() == item["name"].lower():
-                # Remove from inventory and add to room
-                self.inventory.remove(item_id)
-                room["items"].append(item_id)
-                return f"You drop the {item['name']}."
+            # Remove from inventory and add to room
+            self._remove_from_inventory(item_id)
+            self.state.add_room_item(self.current_room, item_id)
+            return f"You drop the {item['name']}."
         
         return f"You don't have a {item_name}."
     
+    def _unlock_exit(self, room_id, direction):
+        """Unlock an exit and keep the reachable rooms up to date"""
+        self.state.unlock_exit(room_id, direction)
+        if self._reachable is not None:
+            self._reachable.unlock(room_id, direction)
+    
+    def _add_to_inventory(self, item_id):
+        """Put an item in the inventory and its name index"""
+        name = self.game_world["items"][item_id]["name"]
+        self.inventory.append(item_id)
+        self.inventory_index.add(name, item_id)
+        if self._inventory_matcher is not None:
+            add_item_noun(self._inventory_matcher, item_id, name)
+        self.version += 1
+    
+    def _remove_from_inventory(self, item_id):
+        """Take an item out of the inventory and its name index"""
+        name = self.game_world["items"][item_id]["name"]
+        self.inventory.remove(item_id)
+        self.inventory_index.remove(name, item_id)
+        if self._inventory_matcher is not None:
+            remove_item_noun(self._inventory_matcher, item_id, name)
+        self.version += 1
+    
+    def _set_inventory(self, inventory):
+        """Replace the inventory and rebuild its name index"""
+        self.inventory = []
+        self.inventory_index = NameIndex()
+        self._inventory_matcher = None
+        self.version += 1
+        for item_id in inventory:
+            self._add_to_inventory(item_id)
+    
     def _show_inventory(self):
         """Show the player's inventory"""
         if not self.inventory:
             return "Your inventory is empty."
         
-        result = "You are carrying:\n"
+        output = ["You are carrying:\n"]
+        items = self.game_world["items"]
         for item_id in self.inventory:
-            item = self.game_world["items"][item_id]
-            result += f"- {item['name']}\n"
+            output += ["- ", items[item_id]["name"], "\n"]
         
-        return result
+        return output
     
     def _use_item(self, item_name):
         """Use an item from inventory"""
         # Check if the item is in inventory
-        item_id_to_use = None
-        for item_id in self.inventory:
-            item = self.game_world["items"][item_id]
-            if item_name.lower() == item["name"].lower():
-                item_id_to_use = item_id
-                break
+        _, item_id_to_use = self._find_noun(item_name, [self.inventory_index.find])
         
         if not item_id_to_use:
             return f"You don't have a {item_name}."
         
-        # Get the current room
-        room = self.game_world["rooms"][self.current_room]
-        
-        # Check if the item has a special use in this room
-        if "item_uses" in room and item_id_to_use in room["item_uses"]:
-            use_result = room["item_uses"][item_id_to_use]
-            
-            # Handle unlocking exits
-            if "unlocks" in use_result:
-                direction = use_result["unlocks"]
-                if "locked_exits" in room and direction in room["locked_exits"]:
-                    del room["locked_exits"][direction]
-            
-            # Handle adding items
-            if "adds_item" in use_result:
-                room["items"].append(use_result["adds_item"])
-            
-            # Handle removing the used item if it's consumed
-            if use_result.get("consumes_item", False):
-                self.inventory.remove(item_id_to_use)
-            
-            # Handle winning the game
-            if "wins_game" in use_result and use_result["wins_game"]:
-                self.game_won = True
-            
-            return use_result["message"]
+        # Run the room's triggers for this item, including its item_uses
+        messages = fire(self, "use", item_id_to_use)
+        if messages:
+            return _with_messages("", messages) or "Something happens."
         
         # Generic use message if no special use is defined
-        return f"You use the {item_name}, but nothing happens."
\ No newline at end of file
+        item_name = fold_name(self.game_world["items"][item_id_to_use]["name"])
+        return f"You use the {item_name}, but nothing happens."
+
+def _with_messages(text, messages):
+    """Return text followed by the non-empty trigger messages, one per line, as fragments"""
+    if not messages:
+        return text
+    output = [text] if text else []
+    for message in messages:
+        if message:
+            if output:
+                output.append("\n")
+            output.append(message)
+    return output
+
+def _memoized(handler):
+    """Wrap a pure command handler so its output is remembered"""
+    def memoized(engine, command):
+        return engine._run_pure(handler, command)
+    return memoized
+
+def _direction_handler(direction):
+    """Build a command handler that moves in a fixed direction"""
+    def handler(engine, command):
+        return engine._move(direction)
+    return handler
+
+# Register the built-in verbs
+GameEngine.register_command(["quit", "exit"], GameEngine._cmd_quit)
+# help and a plain look are already cached, so memoizing them would only slow them down
+GameEngine.register_command("help", GameEngine._cmd_help)
+GameEngine.register_command("look", GameEngine._cmd_look)
+GameEngine.register_command("examine", GameEngine._cmd_look, pure=True)
+GameEngine.register_command(["go", "move", "walk"], GameEngine._cmd_go)
+GameEngine.register_command(["take", "get", "grab"], GameEngine._cmd_take)
+GameEngine.register_command(["drop", "leave"], GameEngine._cmd_drop)
+GameEngine.register_command(["inventory", "i"], GameEngine._cmd_inventory, pure=True)
+GameEngine.register_command("use", GameEngine._cmd_use)
+GameEngine.register_command("goto", GameEngine._cmd_goto)
+GameEngine.register_command("save", GameEngine._cmd_save)
+GameEngine.register_command(["load", "restore"], GameEngine._cmd_load)
+GameEngine.register_command("key", GameEngine._cmd_key)
+for _shortcut, _direction in DIRECTION_SHORTCUTS.items():
+    GameEngine.register_command(_shortcut, _direction_handler(_direction))
@@ -0,0 +1,259 @@
+"""
+Instrumentation for Retro Text Adventure
+Opt-in timing, allocation and profiling hooks around GameEngine commands, exported
+as a JSON metrics file or Prometheus text
+
+Nothing is measured until install() is called: it swaps timing wrappers into the
+engine class, and uninstall() puts the original methods back, so an engine that
+isn't being measured runs exactly the code it always did.
+"""
+import cProfile
+import functools
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+import types
+
+from command_memo import memo_stats
+from game_engine import GameEngine, parse_command
+
+# Latency buckets: bucket k counts calls under 2**k microseconds, the last one everything else
+BUCKETS = 24
+
+def latency_bucket(seconds):
+    """Return the histogram bucket for a latency"""
+    return min(int(seconds * 1e6).bit_length(), BUCKETS - 1)
+
+class Series:
+    """Totals for one verb or method"""
+
+    __slots__ = ("count", "seconds", "histogram", "blocks", "peak_bytes")
+
+    def __init__(self):
+        """Start with nothing recorded"""
+        self.count = 0
+        self.seconds = 0.0
+        self.histogram = [0] * BUCKETS
+        self.blocks = 0
+        self.peak_bytes = 0
+
+    def to_dict(self):
+        """Return the totals as a JSON-friendly dict"""
+        return {
+            "count": self.count,
+            "seconds": self.seconds,
+            "histogram": {2 ** bucket: count for bucket, count in enumerate(self.histogram) if count},
+            "allocated_blocks": self.blocks,
+            "peak_bytes": self.peak_bytes,
+        }
+
+class Instrumentation:
+    """Records per-verb counts, latency histograms and allocations for GameEngine
+
+    Every command records the time it took and the change in allocated memory
+    blocks. With trace_memory, tracemalloc also measures the peak bytes each
+    command allocated (this slows every command down considerably). With
+    sample_every=N, every Nth command runs under cProfile and the profiles are
+    added up for write_profile().
+    """
+
+    def __init__(self, trace_memory=False, sample_every=0):
+        """Create the recorder; call install() to start measuring"""
+        self.trace_memory = trace_memory
+        self.sample_every = sample_every
+        # verb -> Series, and "_method" -> Series when methods are measured
+        self.verbs = {}
+        self.methods = {}
+        self.profile = None
+        self._commands = 0
+        # (class, attribute name, original value) for everything replaced
+        self._patched = []
+
+    def install(self, engine_class=GameEngine, methods=False):
+        """Start measuring every engine of engine_class
+
+        With methods, every _-prefixed method of the class is timed as well,
+        including the verb handlers in its command table.
+        """
+        if self._patched:
+            raise RuntimeError("instrumentation is already installed")
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        originals = dict(engine_class.__dict__)
+        # process_command and command_output both go through run_command
+        self._patch(engine_class, "run_command", self._wrap_command(engine_class.run_command))
+        if methods:
+            wrapped = {}
+            for name, value in originals.items():
+                if name.startswith("_") and not name.startswith("__") and isinstance(value, types.FunctionType):
+                    wrapped[value] = self._wrap_method(name, value)
+                    self._patch(engine_class, name, wrapped[value])
+            # The command table holds the handler functions themselves
+            commands = {verb: wrapped.get(handler, handler) for verb, handler in engine_class.commands.items()}
+            self._patch(engine_class, "commands", commands)
+
+    def uninstall(self):
+        """Stop measuring and restore the engine class"""
+        for engine_class, name, original in reversed(self._patched):
+            if original is None:
+                delattr(engine_class, name)
+            else:
+                setattr(engine_class, name, original)
+        self._patched = []
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    def _patch(self, engine_class, name, replacement):
+        """Replace one class attribute, remembering what was there"""
+        self._patched.append((engine_class, name, engine_class.__dict__.get(name)))
+        setattr(engine_class, name, replacement)
+
+    def _series(self, table, name):
+        """Return the Series for a name, creating it on first use"""
+        series = table.get(name)
+        if series is None:
+            series = table[name] = Series()
+        return series
+
+    def _wrap_command(self, run_command):
+        """Return run_command wrapped to record each command under its verb"""
+        verbs = self.verbs
+        trace_memory = self.trace_memory
+
+        @functools.wraps(run_command)
+        def measured(engine, command):
+            # Unknown verbs share one series so typos can't grow the table
+            parsed = parse_command(command)
+            if parsed is None:
+                verb = "(empty)"
+            elif parsed.verb in engine.commands:
+                verb = parsed.verb
+            else:
+                verb = "(unknown)"
+
+            self._commands += 1
+            profiler = None
+            if self.sample_every and self._commands % self.sample_every == 0:
+                profiler = cProfile.Profile()
+            if trace_memory:
+                tracemalloc.reset_peak()
+                traced_before = tracemalloc.get_traced_memory()[0]
+            blocks_before = sys.getallocatedblocks()
+            started = time.perf_counter()
+
+            if profiler is None:
+                result = run_command(engine, command)
+            else:
+                result = profiler.runcall(run_command, engine, command)
+
+            elapsed = time.perf_counter() - started
+            series = verbs.get(verb)
+            if series is None:
+                series = verbs[verb] = Series()
+            series.count += 1
+            series.seconds += elapsed
+            series.histogram[latency_bucket(elapsed)] += 1
+            series.blocks += sys.getallocatedblocks() - blocks_before
+            if trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - traced_before
+                series.peak_bytes = max(series.peak_bytes, peak)
+            if profiler is not None:
+                self._add_profile(profiler)
+            return result
+        return measured
+
+    def _wrap_method(self, name, method):
+        """Return a method wrapped to record its calls"""
+        series = self._series(self.methods, name)
+
+        @functools.wraps(method)
+        def measured(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                series.count += 1
+                series.seconds += elapsed
+                series.histogram[latency_bucket(elapsed)] += 1
+        return measured
+
+    def _add_profile(self, profiler):
+        """Add one sampled command's profile to the running total"""
+        if self.profile is None:
+            self.profile = pstats.Stats(profiler)
+        else:
+            self.profile.add(profiler)
+
+    def write_profile(self, path):
+        """Write the sampled profiles in pstats format, for snakeviz or pstats"""
+        if self.profile is None:
+            raise ValueError("no commands have been sampled")
+        self.profile.dump_stats(path)
+
+    def snapshot(self):
+        """Return everything recorded as a JSON-friendly dict"""
+        return {
+            "commands": self._commands,
+            "verbs": {verb: series.to_dict() for verb, series in sorted(self.verbs.items())},
+            "methods": {name: series.to_dict() for name, series in sorted(self.methods.items())
+                        if series.count},
+            # Every engine's memo of pure commands, not just while installed
+            "memo": memo_stats.snapshot(),
+        }
+
+    def write_metrics(self, path):
+        """Write the snapshot to a JSON file"""
+        with open(path, "w", encoding="utf-8") as metrics_file:
+            json.dump(self.snapshot(), metrics_file, indent=2)
+            metrics_file.write("\n")
+
+    def prometheus_text(self):
+        """Return the metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric, label, table in (("command", "verb", self.verbs), ("method", "method", self.methods)):
+            if not table:
+                continue
+            name = f"txt_adventure_{metric}_seconds"
+            lines.append(f"# HELP {name} Time spent per {label}.")
+            lines.append(f"# TYPE {name} histogram")
+            for key, series in sorted(table.items()):
+                if not series.count:
+                    continue
+                labels = f'{label}="{_escape_label(key)}"'
+                total = 0
+                for bucket, count in enumerate(series.histogram[:-1]):
+                    total += count
+                    lines.append(f'{name}_bucket{{{labels},le="{2 ** bucket / 1e6:g}"}} {total}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {series.count}')
+                lines.append(f"{name}_sum{{{labels}}} {series.seconds:.9f}")
+                lines.append(f"{name}_count{{{labels}}} {series.count}")
+
+        name = "txt_adventure_command_allocated_blocks"
+        lines.append(f"# HELP {name} Net memory blocks still allocated after each verb's commands.")
+        lines.append(f"# TYPE {name} gauge")
+        for verb, series in sorted(self.verbs.items()):
+            lines.append(f'{name}{{verb="{_escape_label(verb)}"}} {series.blocks}')
+        if self.trace_memory:
+            name = "txt_adventure_command_peak_bytes"
+            lines.append(f"# HELP {name} Largest memory peak of a single command, per verb.")
+            lines.append(f"# TYPE {name} gauge")
+            for verb, series in sorted(self.verbs.items()):
+                lines.append(f'{name}{{verb="{_escape_label(verb)}"}} {series.peak_bytes}')
+
+        memo = memo_stats.snapshot()
+        if memo:
+            for outcome, help_text in (("hits", "answered from"), ("misses", "run without")):
+                name = f"txt_adventure_memo_{outcome}_total"
+                lines.append(f"# HELP {name} Pure commands {help_text} the memo, per verb.")
+                lines.append(f"# TYPE {name} counter")
+                for verb, counts in memo.items():
+                    lines.append(f'{name}{{verb="{_escape_label(verb)}"}} {counts[outcome]}')
+        return "\n".join(lines) + "\n"
+
+def _escape_label(value):
+    """Escape a Prometheus label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Load Generator for the Retro Text Adventure server
+Opens many connections, replays commands on each and reports latency and throughput
+"""
+import argparse
+import asyncio
+import time
+
+from server import PROMPT
+
+# Commands that wander the house without ending the game
+DEFAULT_SCRIPT = ["look", "n", "examine photographs", "e", "examine mirror", "w",
+                  "w", "examine desk", "e", "s", "i", "take flashlight", "drop flashlight"]
+
+def percentile(sorted_values, fraction):
+    """Return the value at a fraction (0-1) of a sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[position]
+
+async def run_client(host, port, script, command_count, latencies, opening):
+    """Play command_count commands over one connection, recording each latency"""
+    async with opening:
+        reader, writer = await asyncio.open_connection(host, port)
+    prompt = PROMPT.encode("utf-8")
+    try:
+        # Skip the welcome text
+        await reader.readuntil(prompt)
+        for number in range(command_count):
+            command = script[number % len(script)]
+            started = time.perf_counter()
+            writer.write(command.encode("utf-8") + b"\n")
+            await writer.drain()
+            await reader.readuntil(prompt)
+            latencies.append(time.perf_counter() - started)
+
+        writer.write(b"quit\n")
+        await writer.drain()
+        await reader.read()
+    finally:
+        writer.close()
+
+async def run_load(host, port, clients, command_count, script, ramp=200):
+    """Run every client at once and return (latencies, elapsed seconds, failures)"""
+    latencies = []
+    # Limit how many connections are opened at the same moment
+    opening = asyncio.Semaphore(ramp)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_client(host, port, script, command_count, latencies, opening) for _ in range(clients)),
+        return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    failures = [result for result in results if isinstance(result, Exception)]
+    return latencies, elapsed, failures
+
+def report(latencies, elapsed, failures):
+    """Return a summary of a load run"""
+    latencies = sorted(latencies)
+    lines = [
+        f"commands:      {len(latencies)}",
+        f"failures:      {len(failures)}",
+        f"elapsed:       {elapsed:.2f} s",
+        f"commands/sec:  {len(latencies) / elapsed if elapsed else 0.0:.0f}",
+        f"p50 latency:   {percentile(latencies, 0.50) * 1000:.3f} ms",
+        f"p99 latency:   {percentile(latencies, 0.99) * 1000:.3f} ms",
+    ]
+    if failures:
+        lines.append(f"first failure: {failures[0]!r}")
+    return "\n".join(lines)
+
+def main():
+    """Parse command line options and run the load test"""
+    parser = argparse.ArgumentParser(description="Load test a Retro Text Adventure server")
+    parser.add_argument("--host", default="127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, default=4000, help="server port")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent connections")
+    parser.add_argument("--commands", type=int, default=100, help="commands sent by each client")
+    args = parser.parse_args()
+
+    latencies, elapsed, failures = asyncio.run(
+        run_load(args.host, args.port, args.clients, args.commands, DEFAULT_SCRIPT))
+    print(report(latencies, elapsed, failures))
+
+if __name__ == "__main__":
+    main()
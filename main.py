@@ -3,49 +3,102 @@
 Retro Text Adventure Game
 Main entry point for the game
 """
-import time
+import argparse
+from command_journal import CommandJournal
 from game_engine import GameEngine
-from game_data import initialize_game_world
+from instrumentation import Instrumentation
+from renderer import RENDERERS, get_renderer, intro_lines
+from saves import SaveError, SaveStore
+from world_loader import WorldFormatError, get_game_world
 
-def display_intro():
+# The session id the single-player game uses in its journal
+JOURNAL_SESSION = "player"
+
+def display_intro(renderer):
     """Display the game introduction"""
-    print("\n" + "=" * 60)
-    print("RETRO TEXT ADVENTURE".center(60))
-    print("=" * 60 + "\n")
-    
-    intro_text = """
-    You wake up in a dimly lit room. Your head is pounding and you can't 
-    remember how you got here. The air is musty and cold. You need to 
-    find your way out and discover what happened to you...
-    
-    Type 'help' at any time to see available commands.
-    """
-    
-    for line in intro_text.split('\n'):
-        print(line.strip())
-        time.sleep(0.5)  # Slow typing effect
-    
-    print("\n" + "=" * 60 + "\n")
-
-def main():
+    if not renderer.show_intro:
+        return
+
+    for line, paced in intro_lines():
+        renderer.write(line)
+        if paced:
+            renderer.pause()  # Slow typing effect
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Play Retro Text Adventure")
+    parser.add_argument("--renderer", choices=sorted(RENDERERS),
+                        help="how to show the intro (default: typewriter on a terminal, instant otherwise)")
+    parser.add_argument("--fast", action="store_const", const="instant", dest="renderer",
+                        help="skip the typing effect; same as --renderer instant")
+    parser.add_argument("--world", metavar="PATH", help="play a world from a JSON or TOML file")
+    parser.add_argument("--save-dir", default="saves", help="folder for saved games (default: saves)")
+    parser.add_argument("--journal", metavar="DIR",
+                        help="log every command to DIR and pick up where you left off after a crash")
+    parser.add_argument("--metrics", metavar="PATH", help="measure every command and write the metrics to PATH as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main game function"""
-    display_intro()
-    
-    # Initialize game world and engine
-    game_world = initialize_game_world()
+    args = parse_args(argv)
+    try:
+        renderer = get_renderer(args.renderer)
+        game_world = get_game_world(args.world)
+    except WorldFormatError as error:
+        # Schema problems come one per line, each naming the field at fault
+        raise SystemExit(f"{args.world} isn't a valid world:\n{error}")
+    except (ValueError, OSError) as error:
+        raise SystemExit(str(error))
+    display_intro(renderer)
+
+    # Measuring is opt-in; without --metrics the engine runs untouched
+    instrumentation = None
+    if args.metrics:
+        instrumentation = Instrumentation()
+        instrumentation.install(methods=True)
+
+    # Initialize game engine, or rebuild the one the journal was keeping
     game = GameEngine(game_world)
-    
+    journal = None
+    if args.journal:
+        journal = CommandJournal(args.journal, batch_size=1)
+        try:
+            recovered = journal.recover(game.world)
+        except (OSError, SaveError) as error:
+            raise SystemExit(f"Couldn't read the journal: {error}")
+        if JOURNAL_SESSION in recovered:
+            game = recovered[JOURNAL_SESSION]
+            renderer.write("Picking up where you left off.\n" + game._look_around())
+    # The only player has the whole folder to themselves
+    game.save_store = SaveStore(args.save_dir)
+
     # Main game loop
     while game.is_running:
-        command = input("\n> ").strip().lower()
-        result = game.process_command(command)
-        print(result)
-        
+        try:
+            command = input(renderer.prompt).strip().lower()
+        except EOFError:
+            # Input ran out, e.g. when commands are piped in
+            break
+        output = game.command_output(command)
+        if journal is not None:
+            journal.record(JOURNAL_SESSION, command, game)
+            if journal.should_compact():
+                journal.compact({JOURNAL_SESSION: game})
+        renderer.write_output(output)
+
         if game.game_won:
-            print("\nCongratulations! You've completed the adventure!")
+            renderer.write("\nCongratulations! You've completed the adventure!")
             break
-            
-    print("\nThanks for playing!")
+
+    renderer.write("\nThanks for playing!")
+    if journal is not None:
+        # A game that is over has nothing to resume
+        if game.game_won or not game.is_running:
+            journal.end(JOURNAL_SESSION)
+        journal.close()
+    if instrumentation is not None:
+        instrumentation.uninstall()
+        instrumentation.write_metrics(args.metrics)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,108 @@
+"""
+Output Renderers for Retro Text Adventure
+Decide how the intro and other decorative text are paced: typewriter, instant or headless
+"""
+import asyncio
+import os
+import sys
+import time
+
+from game_data import INTRO_TEXT
+
+# Environment variable used when no --renderer option is given
+RENDERER_ENV = "TXT_ADVENTURE_RENDERER"
+
+class Renderer:
+    """Writes game output straight away"""
+
+    # Whether the intro and banners are shown at all
+    show_intro = True
+    # Whether pause() actually waits
+    paced = False
+    # Shown before each command is read
+    prompt = "\n> "
+
+    def __init__(self, stream=None):
+        """Write to stream, or standard output"""
+        self.stream = stream
+
+    def write(self, text):
+        """Write a line of output"""
+        print(text, file=self.stream or sys.stdout)
+
+    def write_output(self, fragments):
+        """Write a command's output fragments as one line
+
+        The fragments are joined in one go, which beats writing many small
+        pieces one by one. Nothing is flushed here; input() flushes standard
+        output once before it reads the next command.
+        """
+        stream = self.stream or sys.stdout
+        stream.write("".join(fragments))
+        stream.write("\n")
+
+    def pause(self):
+        """Wait between decorative lines; instant output doesn't wait"""
+
+    async def pause_async(self):
+        """Wait between decorative lines without blocking the event loop"""
+
+class InstantRenderer(Renderer):
+    """Shows everything, with no typing effect"""
+
+class TypewriterRenderer(Renderer):
+    """Shows the intro one line at a time, like a slow terminal"""
+
+    paced = True
+
+    def __init__(self, stream=None, delay=0.5):
+        """Write to stream, waiting delay seconds after each intro line"""
+        super().__init__(stream)
+        self.delay = delay
+
+    def pause(self):
+        """Wait before the next line, flushing so the line shows now"""
+        (self.stream or sys.stdout).flush()
+        time.sleep(self.delay)
+
+    async def pause_async(self):
+        """Wait before the next line without blocking other players"""
+        await asyncio.sleep(self.delay)
+
+class HeadlessRenderer(Renderer):
+    """Shows only command results, for scripts and piped input"""
+
+    show_intro = False
+    prompt = ""
+
+RENDERERS = {
+    "typewriter": TypewriterRenderer,
+    "instant": InstantRenderer,
+    "headless": HeadlessRenderer,
+}
+
+def get_renderer(name=None, stream=None):
+    """Return a renderer by name, falling back to the environment and then the terminal
+
+    With no name and no environment setting, the typewriter effect is used on an
+    interactive terminal and instant output everywhere else.
+    """
+    name = name or os.environ.get(RENDERER_ENV)
+    if not name:
+        is_tty = (stream or sys.stdout).isatty()
+        name = "typewriter" if is_tty else "instant"
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown renderer '{name}'. Choose from: {', '.join(RENDERERS)}")
+    return RENDERERS[name](stream)
+
+def intro_lines():
+    """Return the intro as (line, paced) pairs; paced lines are followed by a pause"""
+    lines = [
+        ("\n" + "=" * 60, False),
+        ("RETRO TEXT ADVENTURE".center(60), False),
+        ("=" * 60 + "\n", False),
+    ]
+    for line in INTRO_TEXT.split("\n"):
+        lines.append((line.strip(), True))
+    lines.append(("\n" + "=" * 60 + "\n", False))
+    return lines
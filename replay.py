@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Transcript Replay for Retro Text Adventure
+Streams recorded commands through game engines, checks them against golden responses
+and reports throughput, latency and the first divergence in each transcript
+
+Inputs are either plain command files (one command per line, one transcript per
+file) or JSONL files whose records look like
+    {"transcript": "run-1", "command": "take flashlight", "response": "You take the Flashlight."}
+Consecutive records with the same transcript id form one transcript, and
+"response" is optional; when present it is the golden result to compare against.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+
+from game_engine import GameEngine
+from world_loader import get_game_world
+from world_state import World
+
+# The world each worker process replays against, built once per process
+_world = None
+
+def _get_world(world_path=None):
+    """Return this process's shared World, loading it on first use"""
+    global _world
+    if _world is None:
+        _world = World(get_game_world(world_path))
+    return _world
+
+def read_transcripts(path):
+    """Yield (name, records) for each transcript in a file, reading it lazily
+
+    Each record is a (command, expected response or None) pair.
+    """
+    if path.endswith(".jsonl"):
+        yield from _read_jsonl(path)
+    else:
+        name = os.path.basename(path)
+        with open(path, encoding="utf-8") as lines:
+            yield name, ((line.rstrip("\n"), None) for line in lines)
+
+def _read_jsonl(path):
+    """Yield transcripts from a JSONL file, grouping consecutive records by id"""
+    default_name = os.path.basename(path)
+    with open(path, encoding="utf-8") as lines:
+        records = (json.loads(line) for line in lines if line.strip())
+        pending = next(records, None)
+        while pending is not None:
+            name = pending.get("transcript", default_name)
+
+            def same_transcript():
+                nonlocal pending
+                while pending is not None and pending.get("transcript", default_name) == name:
+                    yield pending["command"], pending.get("response")
+                    pending = next(records, None)
+
+            group = same_transcript()
+            yield name, group
+            # Skip whatever the caller didn't read of this transcript
+            for _ in group:
+                pass
+
+def latency_bucket(seconds):
+    """Return the histogram bucket for a latency: bucket k holds [2**(k-1), 2**k) microseconds"""
+    return int(seconds * 1e6).bit_length()
+
+def replay_transcript(name, records, world=None, record_responses=False):
+    """Replay one transcript on a fresh engine and return its result dict"""
+    engine = GameEngine(world or _get_world())
+    histogram = {}
+    divergence = None
+    responses = [] if record_responses else None
+    count = 0
+    busy = 0.0
+
+    for command, expected in records:
+        # Commands are cleaned up the same way as in the terminal game
+        command = command.strip().lower()
+        started = time.perf_counter()
+        response = engine.process_command(command)
+        elapsed = time.perf_counter() - started
+
+        busy += elapsed
+        bucket = latency_bucket(elapsed)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+        if divergence is None and expected is not None and expected != response:
+            divergence = {"index": count, "command": command, "expected": expected, "actual": response}
+        if responses is not None:
+            responses.append((command, response))
+        count += 1
+
+        # The game is over, just like the terminal loop
+        if not engine.is_running or engine.game_won:
+            break
+
+    return {
+        "transcript": name,
+        "commands": count,
+        "busy": busy,
+        "histogram": histogram,
+        "divergence": divergence,
+        "responses": responses,
+        "game_won": engine.game_won,
+    }
+
+def _replay_task(task):
+    """Pool entry point: replay a (name, records, record_responses) tuple"""
+    name, records, record_responses = task
+    return replay_transcript(name, records, record_responses=record_responses)
+
+def _bounded_imap(pool, func, tasks, window):
+    """Like pool.imap, but keeps at most window tasks in flight so input is read lazily"""
+    in_flight = deque()
+    for task in tasks:
+        in_flight.append(pool.apply_async(func, (task,)))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().get()
+    while in_flight:
+        yield in_flight.popleft().get()
+
+def replay_files(paths, workers=1, record_responses=False, world_path=None):
+    """Replay every transcript in paths, yielding result dicts in input order"""
+    transcripts = (transcript for path in paths for transcript in read_transcripts(path))
+
+    if workers <= 1:
+        world = _get_world(world_path)
+        for name, records in transcripts:
+            yield replay_transcript(name, records, world, record_responses)
+        return
+
+    # Worker processes need the whole transcript, but only a few are held at once
+    tasks = ((name, list(records), record_responses) for name, records in transcripts)
+    with multiprocessing.Pool(workers, initializer=_get_world, initargs=(world_path,)) as pool:
+        yield from _bounded_imap(pool, _replay_task, tasks, workers * 4)
+
+class ReplayReport:
+    """Totals up replay results"""
+
+    def __init__(self):
+        """Start with nothing replayed"""
+        self.transcripts = 0
+        self.commands = 0
+        self.busy = 0.0
+        self.histogram = {}
+        self.divergences = []
+
+    def add(self, result):
+        """Add one transcript's result"""
+        self.transcripts += 1
+        self.commands += result["commands"]
+        self.busy += result["busy"]
+        for bucket, count in result["histogram"].items():
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+        if result["divergence"] is not None:
+            self.divergences.append((result["transcript"], result["divergence"]))
+
+    def format(self, elapsed):
+        """Return the report as text"""
+        lines = [
+            f"transcripts:   {self.transcripts}",
+            f"commands:      {self.commands}",
+            f"elapsed:       {elapsed:.2f} s",
+            f"commands/sec:  {self.commands / elapsed if elapsed else 0.0:.0f}",
+            f"engine time:   {self.busy:.2f} s",
+            "",
+            "latency histogram:",
+        ]
+        for bucket in sorted(self.histogram):
+            low = 0 if bucket == 0 else 2 ** (bucket - 1)
+            lines.append(f"  {low:>8}-{2 ** bucket:<8} us  {self.histogram[bucket]}")
+
+        lines.append("")
+        if self.divergences:
+            lines.append(f"{len(self.divergences)} transcript(s) diverged:")
+            for name, divergence in self.divergences:
+                lines.append(f"  {name}: command #{divergence['index']} '{divergence['command']}'")
+                lines.append(f"    expected: {divergence['expected']!r}")
+                lines.append(f"    actual:   {divergence['actual']!r}")
+        else:
+            lines.append("All transcripts matched.")
+        return "\n".join(lines)
+
+def main(argv=None):
+    """Parse command line options and replay the transcripts"""
+    parser = argparse.ArgumentParser(description="Replay Retro Text Adventure transcripts")
+    parser.add_argument("paths", nargs="+", help="command files or .jsonl transcripts")
+    parser.add_argument("--world", metavar="PATH", help="replay against a world from a JSON or TOML file")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1, in-process)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="write every response to PATH as JSONL, for use as golden results")
+    args = parser.parse_args(argv)
+
+    report = ReplayReport()
+    record = open(args.record, "w", encoding="utf-8") if args.record else None
+    started = time.perf_counter()
+    try:
+        for result in replay_files(args.paths, args.workers, record is not None, args.world):
+            report.add(result)
+            if record is not None:
+                for command, response in result["responses"]:
+                    record.write(json.dumps({"transcript": result["transcript"],
+                                             "command": command, "response": response}) + "\n")
+    finally:
+        if record is not None:
+            record.close()
+
+    print(report.format(time.perf_counter() - started))
+    return 1 if report.divergences else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
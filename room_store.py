@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Room Store for Retro Text Adventure
+Loads rooms and items on demand from disk and keeps the recently used ones in a
+memory-bounded LRU cache, so huge worlds only cost memory for the rooms players reach
+"""
+import argparse
+import pickle
+import sqlite3
+import threading
+from abc import abstractmethod
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# Default budget for decoded rooms and items held in memory, per section
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+class LazySection(Mapping):
+    """A read-only mapping whose entries are pickled on disk and loaded on first use
+
+    Subclasses provide _load_raw(key), returning the pickled bytes for an entry,
+    along with __iter__ and __len__.
+    Decoded entries are kept in least-recently-used order until their encoded
+    sizes add up to more than max_bytes; then the oldest are dropped. Changes
+    to the cache are made under a lock, so threads can share a section.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        """Start with an empty cache of at most max_bytes of encoded entries"""
+        self.max_bytes = max_bytes
+        self.cached_bytes = 0
+        self.loads = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _load_raw(self, key):
+        """Return the pickled bytes for key, raising KeyError if there is none"""
+
+    def __getitem__(self, key):
+        """Return an entry, loading it from disk if it isn't cached"""
+        cached = self._cache.get(key)
+        if cached is not None:
+            try:
+                self._cache.move_to_end(key)
+            except KeyError:
+                # Another thread evicted it since the get; the value is still good
+                pass
+            return cached[0]
+
+        raw = self._load_raw(key)
+        value = pickle.loads(raw)
+        with self._lock:
+            self.loads += 1
+            # Another thread may have loaded it meanwhile; don't count it twice
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self.cached_bytes -= old[1]
+            self._cache[key] = (value, len(raw))
+            self.cached_bytes += len(raw)
+
+            # Drop the least recently used entries, but always keep the one just loaded
+            while self.cached_bytes > self.max_bytes and len(self._cache) > 1:
+                _, (_, size) = self._cache.popitem(last=False)
+                self.cached_bytes -= size
+        return value
+
+    @property
+    def cached_count(self):
+        """Return how many decoded entries are held in memory"""
+        return len(self._cache)
+
+class SqliteSection(LazySection):
+    """Rooms or items stored in one section of a sqlite room store"""
+
+    def __init__(self, connection, section, max_bytes=DEFAULT_CACHE_BYTES):
+        """Read the named section ("rooms" or "items") through connection"""
+        super().__init__(max_bytes)
+        self._connection = connection
+        self._section = section
+        self._length = None
+
+    def _load_raw(self, key):
+        """Fetch the pickled entry for key"""
+        row = self._connection.execute(
+            "SELECT data FROM entries WHERE section = ? AND id = ?", (self._section, key)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def __contains__(self, key):
+        """Return whether an entry exists, without loading it"""
+        if key in self._cache:
+            return True
+        return self._connection.execute(
+            "SELECT 1 FROM entries WHERE section = ? AND id = ?", (self._section, key)).fetchone() is not None
+
+    def __iter__(self):
+        """Iterate over entry ids in their original order"""
+        rows = self._connection.execute(
+            "SELECT id FROM entries WHERE section = ? ORDER BY position", (self._section,))
+        for (key,) in rows:
+            yield key
+
+    def __len__(self):
+        """Return the number of entries"""
+        if self._length is None:
+            self._length = self._connection.execute(
+                "SELECT COUNT(*) FROM entries WHERE section = ?", (self._section,)).fetchone()[0]
+        return self._length
+
+def write_room_store(path, starting_room, rooms, items):
+    """Write a sqlite room store from iterables of (id, dict) pairs
+
+    rooms and items are consumed one entry at a time, so they can be generators
+    producing worlds far larger than memory.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript("""
+            DROP TABLE IF EXISTS entries;
+            DROP TABLE IF EXISTS meta;
+            CREATE TABLE entries (
+                section TEXT NOT NULL,
+                id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (section, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        connection.execute("INSERT INTO meta VALUES ('starting_room', ?)", (starting_room,))
+        for section, entries in (("rooms", rooms), ("items", items)):
+            connection.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?)",
+                ((section, key, position, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+                 for position, (key, value) in enumerate(entries)))
+        connection.execute("CREATE INDEX entries_order ON entries (section, position)")
+        connection.commit()
+    finally:
+        connection.close()
+
+def open_room_store(path, max_bytes=DEFAULT_CACHE_BYTES):
+    """Open a sqlite room store as a game world dict whose rooms and items load lazily"""
+    # Opened read-only; sessions never write to the shared world
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    except sqlite3.Error as error:
+        raise ValueError(f"{path}: {error}")
+    try:
+        row = connection.execute("SELECT value FROM meta WHERE key = 'starting_room'").fetchone()
+    except sqlite3.Error:
+        row = None
+    if row is None:
+        connection.close()
+        raise ValueError(f"{path} is not a room store")
+    return {
+        "starting_room": row[0],
+        "rooms": SqliteSection(connection, "rooms", max_bytes),
+        "items": SqliteSection(connection, "items", max_bytes),
+    }
+
+def is_room_store(path):
+    """Return whether a path names a sqlite room store"""
+    return path.endswith((".db", ".sqlite"))
+
+def main():
+    """Convert a world file into a sqlite room store"""
+    # Imported here because world_loader imports this module
+    from world_loader import load_world
+
+    parser = argparse.ArgumentParser(description="Build a sqlite room store from a world file")
+    parser.add_argument("world", help="JSON or TOML world file")
+    parser.add_argument("store", help="sqlite file to write, e.g. world.db")
+    args = parser.parse_args()
+
+    game_world = load_world(args.world)
+    write_room_store(args.store, game_world["starting_room"],
+                     game_world["rooms"].items(), game_world["items"].items())
+    print(f"Wrote {len(game_world['rooms'])} rooms and {len(game_world['items'])} items to {args.store}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Saved Games for Retro Text Adventure
+Stores a session's difference from the starting world as a compact binary snapshot,
+optionally followed by an append-only journal so later saves only write what changed
+"""
+import marshal
+import os
+import re
+import secrets
+import struct
+import weakref
+
+from game_engine import GameEngine
+from world_state import as_world
+
+SAVE_MAGIC = b"TXSAVE"
+SAVE_VERSION = 1
+# marshal format version used for every payload
+MARSHAL_VERSION = 4
+
+# Each record is a kind byte and a payload length, then the marshalled payload
+RECORD = struct.Struct("<BI")
+SNAPSHOT = 1
+CHANGES = 2
+SESSION = 3
+
+SAVE_NAME = re.compile(r"^[a-z0-9_-]{1,32}$", re.IGNORECASE)
+# Session ids become folder names; keys players type must look like new_session_key() ones
+SESSION_ID = re.compile(r"^[a-z0-9_-]{1,64}$", re.IGNORECASE)
+SESSION_KEY = re.compile(r"^[0-9a-f]{32}$")
+
+class SaveError(Exception):
+    """Raised when a saved game can't be read or doesn't fit the world"""
+
+def _header():
+    """Return the bytes every save file starts with"""
+    return SAVE_MAGIC + bytes([SAVE_VERSION])
+
+def _record(kind, payload):
+    """Return one framed record"""
+    data = marshal.dumps(payload, MARSHAL_VERSION)
+    return RECORD.pack(kind, len(data)) + data
+
+def _read_records(data):
+    """Yield (kind, payload) for each record in a save file's contents
+
+    A record cut short, e.g. by a crash while appending, ends the file.
+    """
+    if data[:len(SAVE_MAGIC) + 1] != _header():
+        raise SaveError("not a saved game, or saved by another version")
+    position = len(SAVE_MAGIC) + 1
+    while position + RECORD.size <= len(data):
+        kind, length = RECORD.unpack_from(data, position)
+        position += RECORD.size
+        if position + length > len(data):
+            return
+        try:
+            payload = marshal.loads(data[position:position + length])
+        except (ValueError, EOFError, TypeError):
+            raise SaveError("the save file is damaged")
+        position += length
+        yield kind, payload
+
+def encode_snapshot(engine):
+    """Return a compact binary snapshot of a session"""
+    return _header() + _record(SNAPSHOT, engine.export_session())
+
+def new_session_key():
+    """Return a session id no one can guess, so it can name a player's save folder"""
+    return secrets.token_hex(16)
+
+def _check_fits(world, exported):
+    """Raise SaveError if a session refers to rooms or items the world doesn't have
+
+    Takes data from GameEngine.export_session() or take_changes(), whose
+    world state parts have different shapes.
+    """
+    try:
+        current_room, inventory, visited, _, state = exported
+        if len(state) == 3:
+            removed, added, unlocked = state
+            changed_rooms = {room_id: (removed.get(room_id, ()), added.get(room_id, ()))
+                             for room_id in {*removed, *added}}
+        else:
+            changed_rooms, unlocked = state
+        room_ids = {current_room, *visited, *changed_rooms, *(room_id for room_id, _ in unlocked)}
+        item_ids = {*inventory, *(item_id for removed, added in changed_rooms.values()
+                                  for item_id in (*removed, *added))}
+    except (TypeError, ValueError, AttributeError):
+        raise SaveError("the save file is damaged")
+    if any(room_id not in world.rooms for room_id in room_ids) or any(
+            item_id not in world.items for item_id in item_ids):
+        raise SaveError("the saved game doesn't match this world")
+
+def restore_snapshot(engine, data):
+    """Load a snapshot, plus any journal records after it, into an engine
+
+    Returns the number of journal records applied.
+    """
+    records = _read_records(data)
+    kind, exported = next(records, (None, None))
+    if kind != SNAPSHOT:
+        raise SaveError("the save file has no snapshot")
+    _check_fits(engine.world, exported)
+    engine.load_session(exported)
+
+    applied = 0
+    for kind, changes in records:
+        if kind == CHANGES:
+            _check_fits(engine.world, changes)
+            engine.apply_changes(changes)
+            applied += 1
+    return applied
+
+class SaveStore:
+    """Keeps saved games as files in a directory
+
+    With journal=True, saving again under the same name appends only the
+    changes since the previous save. After compact_after appended records the
+    file is rewritten as a single fresh snapshot, as it is when the file
+    changed since this engine last wrote or read it.
+    """
+
+    def __init__(self, directory, journal=True, compact_after=64, fsync=False, session_id=None):
+        """Store saves in directory, creating it when the first game is saved"""
+        self.directory = directory
+        # Set on stores from for_session(), along with the folder they are under
+        self.session_id = session_id
+        self.root = directory
+        self.journal = journal
+        self.compact_after = compact_after
+        self.fsync = fsync
+        # engine -> [save path, journal records appended since the snapshot, file stamp]
+        self._attached = weakref.WeakKeyDictionary()
+
+    def for_session(self, session_id):
+        """Return a SaveStore with the same settings in a folder of the session's own
+
+        Sessions sharing a server each get one, so players can't overwrite
+        each other's games. The folder is named after the session id, so
+        servers use ids from new_session_key(): ids that restart from 0 would
+        hand a new player the games of whoever had the id before.
+        """
+        session_id = str(session_id)
+        if not SESSION_ID.match(session_id):
+            raise ValueError(session_id)
+        directory = os.path.join(self.root, f"session-{session_id.lower()}")
+        store = SaveStore(directory, self.journal, self.compact_after, self.fsync, session_id)
+        store.root = self.root
+        return store
+
+    def path(self, name):
+        """Return the file for a save name"""
+        if not SAVE_NAME.match(name):
+            raise ValueError(name)
+        return os.path.join(self.directory, f"{name.lower()}.sav")
+
+    def save(self, engine, name):
+        """Save an engine's game under a name"""
+        path = self.path(name)
+        attached = self._attached.get(engine)
+
+        if (self.journal and attached is not None and attached[0] == path
+                and attached[1] < self.compact_after and _file_stamp(path) == attached[2]):
+            # Append just what changed since the last save
+            with open(path, "ab") as save_file:
+                save_file.write(_record(CHANGES, engine.take_changes()))
+                self._flush(save_file)
+                attached[2] = _stamp(save_file)
+            attached[1] += 1
+            return
+
+        # Write a fresh snapshot, replacing the file atomically
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as save_file:
+            save_file.write(encode_snapshot(engine))
+            self._flush(save_file)
+            stamp = _stamp(save_file)
+        os.replace(temporary, path)
+        self._attach(engine, path, 0, stamp)
+
+    def load(self, engine, name):
+        """Replace an engine's game with the one saved under a name"""
+        path = self.path(name)
+        with open(path, "rb") as save_file:
+            data = save_file.read()
+            stamp = _stamp(save_file)
+        applied = restore_snapshot(engine, data)
+        self._attach(engine, path, applied, stamp)
+
+    def names(self):
+        """Return the names of every saved game"""
+        try:
+            files = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".sav")] for name in files if name.endswith(".sav"))
+
+    def save_command(self, engine, name):
+        """Handle the save command and return what to tell the player"""
+        try:
+            self.save(engine, name)
+        except ValueError:
+            return "Save names can only use letters, numbers, '-' and '_'."
+        except OSError:
+            return "The game couldn't be saved."
+        if self.session_id is not None:
+            return f"Game saved as '{name}'. Type 'key' for the key that gets it back after you reconnect."
+        return f"Game saved as '{name}'."
+
+    def load_command(self, engine, name):
+        """Handle the load command and return what to tell the player"""
+        try:
+            self.load(engine, name)
+        except ValueError:
+            return "Save names can only use letters, numbers, '-' and '_'."
+        except FileNotFoundError:
+            return f"There is no saved game called '{name}'."
+        except (OSError, SaveError):
+            return f"The saved game '{name}' couldn't be read."
+        return f"Game '{name}' restored.\n" + engine._look_around()
+
+    def key_command(self, engine, key):
+        """Handle the key command: show this session's key, or switch to the saves of another"""
+        if self.session_id is None:
+            return "Your saved games aren't kept under a key here."
+        if not key:
+            return (f"Your save key is {self.session_id}. After reconnecting, type "
+                    f"'key {self.session_id}' to get back to the games saved with it.")
+        if not SESSION_KEY.match(key):
+            return "That isn't a save key."
+        engine.save_store = self.for_session(key)
+        return f"Using the games saved with key {key}."
+
+    def _attach(self, engine, path, records, stamp):
+        """Remember that later saves of this engine can append to path while it still has stamp"""
+        if self.journal:
+            engine.track_changes()
+            self._attached[engine] = [path, records, stamp]
+
+    def _flush(self, save_file):
+        """Push written data to the OS, and to the disk if fsync is on"""
+        save_file.flush()
+        if self.fsync:
+            os.fsync(save_file.fileno())
+
+def _stamp(save_file):
+    """Return what identifies the contents of an open file: its inode, size and modification time"""
+    status = os.fstat(save_file.fileno())
+    return status.st_ino, status.st_size, status.st_mtime_ns
+
+def _file_stamp(path):
+    """Return the stamp of the file at path, or None if there is none"""
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return status.st_ino, status.st_size, status.st_mtime_ns
+
+def save_sessions(path, sessions, fsync=False):
+    """Write many sessions to one file; sessions maps session ids to engines"""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as save_file:
+        save_file.write(_header())
+        for session_id, engine in sessions.items():
+            save_file.write(_record(SESSION, (session_id, engine.export_session())))
+        if fsync:
+            save_file.flush()
+            os.fsync(save_file.fileno())
+    os.replace(temporary, path)
+
+def restore_sessions(world, path, save_store=None):
+    """Read a file from save_sessions() and return a dict of session ids to engines
+
+    If save_store is given, each engine keeps its saved games in the
+    store's folder for its session.
+    """
+    world = as_world(world)
+    with open(path, "rb") as save_file:
+        data = save_file.read()
+    sessions = {}
+    for kind, payload in _read_records(data):
+        if kind == SESSION:
+            session_id, exported = payload
+            _check_fits(world, exported)
+            engine = GameEngine(world)
+            if save_store is not None:
+                engine.save_store = save_store.for_session(session_id)
+            engine.load_session(exported)
+            sessions[session_id] = engine
+    return sessions
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Game Server for Retro Text Adventure
+Hosts many players in one process over a line-based TCP protocol using asyncio
+"""
+import argparse
+import asyncio
+import itertools
+import signal
+import sys
+
+from compact_world import compact_world
+from game_engine import GameEngine
+from instrumentation import Instrumentation
+from renderer import RENDERERS, InstantRenderer, intro_lines
+from saves import SaveStore, new_session_key
+from session_router import RouterError, SessionRouter
+from shared_world import SharedWorld
+from world_loader import get_game_world
+from world_state import World
+
+# The prompt ends every response, so clients can read up to it
+PROMPT = "\n> "
+# Other players' actions aren't sent to a client with this many bytes still unsent
+EVENT_BUFFER_LIMIT = 64 * 1024
+
+class GameServer:
+    """Runs one GameEngine per connection, all sharing a single World
+
+    With a SessionRouter, the engines run in the router's worker processes
+    instead, and this process only handles the connections. With a
+    SharedWorld, every player acts on the same world and sees what the others
+    in the same room do.
+    """
+
+    def __init__(self, world, host="127.0.0.1", port=4000, idle_timeout=300.0,
+                 max_sessions=10000, max_line=1024, shutdown_grace=5.0, renderer=None,
+                 save_store=None, router=None, shared=None):
+        """Set up the server; call start() to begin accepting players"""
+        self.world = world
+        self.save_store = save_store
+        self.router = router
+        self.shared = shared
+        self._player_numbers = itertools.count(1)
+        self.renderer = renderer or InstantRenderer()
+        self.welcome = "".join(line + "\n" for line, paced in intro_lines())
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_line = max_line
+        self.shutdown_grace = shutdown_grace
+        self.server = None
+        self.closing = False
+        self._shutdown_task = None
+        # Handler task for every open connection
+        self.connections = set()
+        # Handler tasks waiting for their player's next command
+        self._waiting = set()
+
+    async def start(self):
+        """Start listening; returns once the socket is bound"""
+        self.server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=self.max_line)
+        # Report the real port when port 0 asked the OS to pick one
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Serve until shutdown() is called"""
+        if self.server is None:
+            await self.start()
+        try:
+            await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    async def shutdown(self):
+        """Stop accepting players, let current commands finish, then close every connection"""
+        # Every caller waits for the same shutdown to complete
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.ensure_future(self._shutdown())
+        await asyncio.shield(self._shutdown_task)
+
+    async def _shutdown(self):
+        """Do the work of shutdown()"""
+        self.closing = True
+        self.server.close()
+
+        # Handlers waiting for a command are woken to say goodbye; the others
+        # finish their command first and say it before reading another
+        for task in list(self._waiting):
+            task.cancel()
+
+        tasks = list(self.connections)
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=self.shutdown_grace)
+            # Anything still stuck, e.g. writing to a client that stopped reading, is cancelled
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        await self.server.wait_closed()
+
+    @property
+    def session_count(self):
+        """Return the number of connected players"""
+        return len(self.connections)
+
+    async def _send(self, writer, text):
+        """Write text and wait while the client's buffer is full"""
+        writer.write(text.encode("utf-8"))
+        await asyncio.wait_for(writer.drain(), self.idle_timeout)
+
+    async def _send_intro(self, writer):
+        """Send the intro and the first prompt, pacing it if the renderer asks"""
+        if not self.renderer.show_intro:
+            await self._send(writer, PROMPT)
+        elif self.renderer.paced:
+            # Typing effect: each pause only holds up this player
+            for line, paced in intro_lines():
+                await self._send(writer, line + "\n")
+                if paced:
+                    await self.renderer.pause_async()
+            await self._send(writer, PROMPT)
+        else:
+            await self._send(writer, self.welcome + PROMPT)
+
+    async def _handle_connection(self, reader, writer):
+        """Play one game over a connection"""
+        task = asyncio.current_task()
+        try:
+            if self.closing or len(self.connections) >= self.max_sessions:
+                await self._send(writer, "The server is full. Please try again later.\n")
+                return
+
+            self.connections.add(task)
+            # Saved games are kept under the session id, so it mustn't be guessable
+            session_id = new_session_key()
+            engine = None
+            if self.shared is not None:
+                engine = self.shared.join(f"Player {next(self._player_numbers)}", self._event_listener(writer))
+            elif self.router is None:
+                engine = GameEngine(self.world)
+                if self.save_store is not None:
+                    engine.save_store = self.save_store.for_session(session_id)
+            await self._send_intro(writer)
+
+            is_running = True
+            while is_running:
+                if self.closing:
+                    await self._send(writer, "\nThe server is shutting down. Goodbye!\n")
+                    return
+                self._waiting.add(task)
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                except asyncio.CancelledError:
+                    if not self.closing:
+                        raise
+                    await self._send(writer, "\nThe server is shutting down. Goodbye!\n")
+                    return
+                except asyncio.TimeoutError:
+                    await self._send(writer, "\nYou have been idle for too long. Goodbye!\n")
+                    return
+                except ValueError:
+                    # The line was longer than max_line
+                    await self._send(writer, "\nThat command is too long. Goodbye!\n")
+                    return
+                finally:
+                    self._waiting.discard(task)
+
+                if not line:
+                    return
+
+                command = line.decode("utf-8", "replace").strip().lower()
+                try:
+                    output, is_running, game_won = await self._process(engine, session_id, command)
+                except RouterError as error:
+                    # The session's worker failed; the player can try again
+                    print(f"A worker failed to run a command: {error}", file=sys.stderr)
+                    await self._send(writer, "Something went wrong running that command. Please try again.\n" + PROMPT)
+                    continue
+                output.append("\n")
+
+                # Everything for one command goes out in a single write
+                if game_won:
+                    output.append("\nCongratulations! You've completed the adventure!\n")
+                    await self._send(writer, "".join(output))
+                    break
+                if is_running:
+                    output.append(PROMPT)
+                await self._send(writer, "".join(output))
+
+            await self._send(writer, "\nThanks for playing!\n")
+        except (ConnectionError, asyncio.TimeoutError):
+            # The client went away or stopped reading
+            pass
+        finally:
+            if task in self.connections:
+                self.connections.remove(task)
+                if self.router is not None:
+                    await self._end_routed_session(session_id)
+                elif self.shared is not None and engine is not None:
+                    self.shared.leave(engine)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    def _event_listener(self, writer):
+        """Return a listener that sends what other players do to a connection"""
+        def listener(text):
+            # A client that isn't reading misses events rather than piling them up here
+            if not writer.is_closing() and writer.transport.get_write_buffer_size() < EVENT_BUFFER_LIMIT:
+                # No prompt after it: prompt-framed clients would take it for the end of a reply
+                writer.write(("\n" + text + "\n").encode("utf-8"))
+        return listener
+
+    async def _process(self, engine, session_id, command):
+        """Run a command here or on the router; return (output fragments, is_running, game_won)"""
+        if self.router is None:
+            return engine.command_output(command), engine.is_running, engine.game_won
+        response, is_running, game_won = await self.router.submit("command", session_id, command)
+        return [response], is_running, game_won
+
+    async def _end_routed_session(self, session_id):
+        """Drop a finished session from its worker"""
+        try:
+            await self.router.submit("close", session_id)
+        except (RouterError, asyncio.CancelledError):
+            pass
+
+async def serve_metrics(instrumentation, host, port):
+    """Serve instrumentation.prometheus_text() over HTTP for Prometheus to scrape"""
+    async def respond(reader, writer):
+        try:
+            # Any request gets the metrics; read up to the end of its headers first
+            while (await asyncio.wait_for(reader.readline(), 10.0)).strip():
+                pass
+            body = instrumentation.prometheus_text().encode("utf-8")
+            writer.write(b"HTTP/1.1 200 OK\r\n"
+                         b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         + f"Content-Length: {len(body)}\r\n".encode("ascii")
+                         + b"Connection: close\r\n\r\n" + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+    return await asyncio.start_server(respond, host, port)
+
+async def run_server(args):
+    """Run the server until interrupted"""
+    game_world = get_game_world(args.world, max_bytes=int(args.room_cache_mb * 1024 * 1024))
+    if args.compact:
+        game_world = compact_world(game_world)
+    world = World(game_world)
+    # With --workers, sessions run in worker processes that load the world themselves
+    router = None
+    if args.workers:
+        router = SessionRouter(args.workers, args.world, args.save_dir, args.compact)
+    shared = SharedWorld(world) if args.shared else None
+    game_server = GameServer(world, args.host, args.port, args.idle_timeout,
+                             args.max_sessions, args.max_line, args.shutdown_grace,
+                             RENDERERS[args.renderer](), SaveStore(args.save_dir), router, shared)
+    await game_server.start()
+    print(f"Serving on {game_server.host}:{game_server.port}")
+
+    # Measuring is opt-in; without --metrics-port the engine runs untouched
+    metrics_server = None
+    if args.metrics_port is not None:
+        instrumentation = Instrumentation(sample_every=args.profile_every)
+        instrumentation.install()
+        metrics_server = await serve_metrics(instrumentation, args.host, args.metrics_port)
+        print(f"Metrics on http://{args.host}:{metrics_server.sockets[0].getsockname()[1]}/metrics")
+
+    # Shut down cleanly on Ctrl+C or SIGTERM where the platform allows it
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: asyncio.ensure_future(game_server.shutdown()))
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    await game_server.serve_forever()
+    await game_server.shutdown()
+    if metrics_server is not None:
+        metrics_server.close()
+        instrumentation.uninstall()
+        if args.profile_every:
+            instrumentation.write_profile(args.profile_out)
+    if router is not None:
+        router.close()
+    print("Server stopped.")
+
+def main():
+    """Parse command line options and start the server"""
+    parser = argparse.ArgumentParser(description="Host Retro Text Adventure over TCP")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=4000, help="port to listen on")
+    parser.add_argument("--idle-timeout", type=float, default=300.0,
+                        help="seconds a player may stay idle before being disconnected")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="maximum connected players")
+    parser.add_argument("--max-line", type=int, default=1024, help="longest command in bytes")
+    parser.add_argument("--shutdown-grace", type=float, default=5.0,
+                        help="seconds to wait for players to be disconnected on shutdown")
+    parser.add_argument("--world", metavar="PATH", help="serve a world from a JSON or TOML file")
+    parser.add_argument("--room-cache-mb", type=float, default=64.0,
+                        help="memory budget for rooms and items loaded from a world file or room store")
+    parser.add_argument("--compact", action="store_true",
+                        help="keep the whole world in memory in a packed form that takes about a third of the space")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="run sessions in this many worker processes, sharded by session (default: in this process)")
+    parser.add_argument("--shared", action="store_true",
+                        help="put every player in one world, where they see and change the same rooms")
+    parser.add_argument("--save-dir", default="saves", help="folder for players' saved games")
+    parser.add_argument("--renderer", choices=sorted(RENDERERS), default="instant",
+                        help="how to send the intro to each player")
+    parser.add_argument("--metrics-port", type=int,
+                        help="measure every command and serve Prometheus metrics on this port")
+    parser.add_argument("--profile-every", type=int, default=0, metavar="N",
+                        help="with --metrics-port, profile every Nth command into --profile-out")
+    parser.add_argument("--profile-out", default="server.prof", help="where to write sampled profiles")
+    args = parser.parse_args()
+    if args.shared and args.workers:
+        parser.error("--shared can't be used with --workers")
+    asyncio.run(run_server(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Session Router for Retro Text Adventure
+Shards game sessions across worker processes by session id so many players can use
+every CPU core, and moves sessions between workers as plain exported state
+
+Each worker loads the world once (a JSON world is opened from its memory-mapped
+compiled cache) and keeps its sessions' GameEngines. The router talks to each
+worker over a pipe, sending every request waiting for that worker in one batch.
+"""
+import asyncio
+import multiprocessing
+import os
+import zlib
+from collections import deque
+
+from compact_world import compact_world
+from game_engine import GameEngine
+from saves import SaveStore
+from world_loader import get_game_world
+from world_state import World
+
+class RouterError(Exception):
+    """Raised when a worker fails to carry out a request"""
+
+def _run_worker(connection, world_path, save_dir, compact):
+    """Worker process: serve batches of requests until the pipe is closed"""
+    game_world = get_game_world(world_path)
+    if compact:
+        game_world = compact_world(game_world)
+    world = World(game_world)
+    save_store = SaveStore(save_dir) if save_dir else None
+    sessions = {}
+
+    def session(session_id):
+        """Return a session's engine, starting a new game for an unknown id"""
+        engine = sessions.get(session_id)
+        if engine is None:
+            engine = sessions[session_id] = GameEngine(world)
+            if save_store is not None:
+                engine.save_store = save_store.for_session(session_id)
+        return engine
+
+    def handle(operation, session_id, argument):
+        """Carry out one request and return its result"""
+        if operation == "command":
+            engine = session(session_id)
+            return engine.process_command(argument), engine.is_running, engine.game_won
+        if operation == "open":
+            session(session_id)
+            return None
+        if operation == "export":
+            engine = sessions.get(session_id)
+            return None if engine is None else engine.export_session()
+        if operation == "close":
+            engine = sessions.pop(session_id, None)
+            return None if engine is None else engine.export_session()
+        if operation == "load":
+            session(session_id).load_session(argument)
+            return None
+        if operation == "count":
+            return len(sessions)
+        raise ValueError(f"unknown request '{operation}'")
+
+    connection.send("ready")
+    while True:
+        try:
+            batch = connection.recv()
+        except EOFError:
+            break
+        if batch is None:
+            break
+        replies = []
+        for operation, session_id, argument in batch:
+            try:
+                replies.append((True, handle(operation, session_id, argument)))
+            except Exception as error:
+                replies.append((False, f"{type(error).__name__}: {error}"))
+        connection.send(replies)
+    connection.close()
+
+class SessionRouter:
+    """Hosts sessions in a pool of worker processes, sharded by session id
+
+    Sessions start on the worker chosen by a hash of their id and stay there
+    until migrate() moves them. Requests are either made one batch at a time
+    with request()/request_many(), or from asyncio with submit(), which
+    gathers everything sent to a worker in one event loop pass into a single
+    message. A worker has at most one such batch at a time; requests made
+    while it works wait and go in its next batch. Use one style or the other
+    on a router, not both at once.
+
+    Results: "command" gives (response, is_running, game_won), "export" and
+    "close" give the session's export_session() data (None if there was no
+    such session), "count" gives the number of sessions on a worker.
+    """
+
+    def __init__(self, workers=None, world_path=None, save_dir=None, compact=False):
+        """Start the worker processes and wait until each has loaded the world"""
+        self.workers = workers or os.cpu_count() or 1
+        # Compile the world cache once here, so workers only have to map it
+        if world_path is not None:
+            get_game_world(world_path)
+        self.connections = []
+        self.processes = []
+        for _ in range(self.workers):
+            parent_end, child_end = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_run_worker, args=(child_end, world_path, save_dir, compact),
+                                              daemon=True)
+            process.start()
+            child_end.close()
+            self.connections.append(parent_end)
+            self.processes.append(process)
+        for connection in self.connections:
+            if connection.recv() != "ready":
+                raise RouterError("a worker failed to start")
+        # session_id -> worker, for sessions moved away from their home worker
+        self.placement = {}
+        # session_id -> future finished when a migrate_async() of that session is done
+        self._moving = {}
+        # Per worker: requests waiting to be sent, and futures of the batch in flight
+        self._outboxes = [[] for _ in range(self.workers)]
+        self._waiting = [deque() for _ in range(self.workers)]
+        self._flush_scheduled = False
+        self._loop = None
+
+    def home_worker(self, session_id):
+        """Return the worker a session starts on"""
+        return zlib.crc32(str(session_id).encode("utf-8")) % self.workers
+
+    def worker_for(self, session_id):
+        """Return the worker currently hosting a session"""
+        worker = self.placement.get(session_id)
+        return self.home_worker(session_id) if worker is None else worker
+
+    def request(self, operation, session_id=None, argument=None, worker=None):
+        """Send one request and return its result"""
+        return self.request_many([(operation, session_id, argument)], worker)[0]
+
+    def request_many(self, requests, worker=None):
+        """Send (operation, session_id, argument) requests and return their results in order
+
+        Every worker gets its share in one message and they all run at the
+        same time. With worker set, every request goes to that worker.
+        """
+        batches = {}
+        for position, (operation, session_id, argument) in enumerate(requests):
+            target = self.worker_for(session_id) if worker is None else worker
+            batches.setdefault(target, []).append((position, (operation, session_id, argument)))
+        for target, batch in batches.items():
+            self.connections[target].send([request for _, request in batch])
+
+        # Read every worker's replies before raising, so no pipe is left holding an answer
+        replies = [None] * len(requests)
+        for target, batch in batches.items():
+            for (position, _), reply in zip(batch, self.connections[target].recv()):
+                replies[position] = reply
+        return [_unwrap(reply) for reply in replies]
+
+    def process(self, session_id, command):
+        """Run a command in a session and return (response, is_running, game_won)"""
+        return self.request("command", session_id, command)
+
+    def migrate(self, session_id, worker):
+        """Move a session to another worker, carrying its state across"""
+        source = self.worker_for(session_id)
+        if source == worker:
+            return
+        exported = self.request("close", session_id)
+        if exported is not None:
+            self.request("load", session_id, exported, worker=worker)
+        self._place(session_id, worker)
+
+    def session_counts(self):
+        """Return the number of sessions on each worker"""
+        return [self.request("count", worker=worker) for worker in range(self.workers)]
+
+    def _place(self, session_id, worker):
+        """Record which worker now hosts a session"""
+        if worker == self.home_worker(session_id):
+            self.placement.pop(session_id, None)
+        else:
+            self.placement[session_id] = worker
+
+    async def submit(self, operation, session_id=None, argument=None, worker=None):
+        """Send a request from asyncio and wait for its result"""
+        moving = self._moving.get(session_id)
+        if moving is not None:
+            await asyncio.shield(moving)
+        return await self._submit(operation, session_id, argument, worker)
+
+    async def _submit(self, operation, session_id, argument, worker):
+        """Queue a request for the next flush and wait for its result"""
+        target = self.worker_for(session_id) if worker is None else worker
+        future = self._loop_or_start().create_future()
+        self._outboxes[target].append(((operation, session_id, argument), future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._loop.call_soon(self._flush)
+        return await future
+
+    async def migrate_async(self, session_id, worker):
+        """Move a session to another worker from asyncio
+
+        Requests for the session made while it moves wait and then go to its
+        new worker.
+        """
+        if self.worker_for(session_id) == worker or session_id in self._moving:
+            return
+        done = self._moving[session_id] = self._loop_or_start().create_future()
+        try:
+            exported = await self._submit("close", session_id, None, None)
+            if exported is not None:
+                await self._submit("load", session_id, exported, worker)
+            self._place(session_id, worker)
+        finally:
+            del self._moving[session_id]
+            done.set_result(None)
+
+    def _loop_or_start(self):
+        """Return the event loop, hooking the pipes into it on first use"""
+        if self._loop is None:
+            self._start_async()
+        return self._loop
+
+    def _start_async(self):
+        """Watch every worker pipe from the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        for worker, connection in enumerate(self.connections):
+            self._loop.add_reader(connection.fileno(), self._receive, worker)
+
+    def _flush(self):
+        """Send each idle worker everything queued for it since its last batch"""
+        self._flush_scheduled = False
+        for worker in range(self.workers):
+            if not self._waiting[worker]:
+                self._send_outbox(worker)
+
+    def _send_outbox(self, worker):
+        """Send a worker the requests queued for it, if there are any"""
+        # Only one batch is ever in flight per worker: a worker sending replies
+        # while the router blocks sending it more would leave both pipes full
+        outbox = self._outboxes[worker]
+        if outbox:
+            self._outboxes[worker] = []
+            self.connections[worker].send([request for request, _ in outbox])
+            self._waiting[worker].append([future for _, future in outbox])
+
+    def _receive(self, worker):
+        """Hand a worker's replies to the futures waiting for them"""
+        try:
+            replies = self.connections[worker].recv()
+        except EOFError:
+            self._loop.remove_reader(self.connections[worker].fileno())
+            self._waiting[worker].append([future for _, future in self._outboxes[worker]])
+            self._outboxes[worker] = []
+            for futures in self._waiting[worker]:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(RouterError("a worker stopped"))
+            self._waiting[worker].clear()
+            return
+        for future, reply in zip(self._waiting[worker].popleft(), replies):
+            if future.done():
+                continue
+            success, value = reply
+            if success:
+                future.set_result(value)
+            else:
+                future.set_exception(RouterError(value))
+        # The worker is idle again, so it can have whatever queued up meanwhile
+        self._send_outbox(worker)
+
+    def close(self):
+        """Stop every worker; their sessions are discarded"""
+        if self._loop is not None:
+            for connection in self.connections:
+                self._loop.remove_reader(connection.fileno())
+            self._loop = None
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self):
+        """Use the router in a with block"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the workers at the end of the with block"""
+        self.close()
+
+def _unwrap(reply):
+    """Return a worker reply's value, raising RouterError if the request failed"""
+    success, value = reply
+    if not success:
+        raise RouterError(value)
+    return value
@@ -0,0 +1,200 @@
+"""
+Shared World for Retro Text Adventure
+Lets many players act on one world at once: an item one player takes is gone for
+everyone else, and an exit one player unlocks is open for everyone
+
+Every player's SharedPlayer works on the same SharedWorldState. Each room has
+its own lock, and a command holds the lock of the room the player is in.
+Moving hands that lock over for the next room's lock, so a command never holds
+two locks and players in different rooms never wait for each other. Whatever
+a player does that others can see is passed on to the players in the same room.
+"""
+import threading
+from collections import deque
+
+from game_engine import GameEngine
+from world_state import WorldState, as_world
+
+class SharedWorldState(WorldState):
+    """The one WorldState that every player in a SharedWorld changes
+
+    Room changes are only made while holding that room's lock. Unlocks replace
+    unlocked_exits with a new set rather than adding to it, so a player walking
+    the exits of other rooms can never see the set change halfway through.
+    """
+
+    __slots__ = ("_unlock_lock",)
+
+    def __init__(self, world):
+        """Start with no changes to the world"""
+        super().__init__(world)
+        # Unlocks can happen in any room, so copying the set gets a lock of its own
+        self._unlock_lock = threading.Lock()
+
+    def unlock_exit(self, room_id, direction):
+        """Unlock an exit for every player if it is locked"""
+        if self.locked_exit(room_id, direction) is not None:
+            with self._unlock_lock:
+                self.unlocked_exits = self.unlocked_exits | {(room_id, direction)}
+            self.versions[room_id] = self.versions.get(room_id, 0) + 1
+
+class SharedWorld:
+    """One world changed by many players at once, with a lock for each room"""
+
+    def __init__(self, game_world):
+        """Share a game world dict or World between players"""
+        self.world = as_world(game_world)
+        self.state = SharedWorldState(self.world)
+        # room_id -> Lock, made the first time a player needs it
+        self._locks = {}
+        # room_id -> set of SharedPlayers in the room; only changed under the room's lock
+        self.occupants = {}
+
+    def room_lock(self, room_id):
+        """Return the lock that guards a room"""
+        lock = self._locks.get(room_id)
+        if lock is None:
+            # setdefault is atomic, so two players can't end up with different locks
+            lock = self._locks.setdefault(room_id, threading.Lock())
+        return lock
+
+    def join(self, name, listener=None):
+        """Return a new SharedPlayer standing in the starting room
+
+        listener(text) is called with what the player sees others do; without
+        one, those messages wait in the player's messages queue.
+        """
+        player = SharedPlayer(self, name, listener)
+        room_id = player.current_room
+        with self.room_lock(room_id):
+            self._add_occupant(room_id, player)
+            self.broadcast(room_id, f"{name} arrives.", player)
+        return player
+
+    def leave(self, player):
+        """Take a player out of the world, leaving what they carried in their room"""
+        room_id = player.current_room
+        with self.room_lock(room_id):
+            if player not in self.occupants.get(room_id, ()):
+                return
+            for item_id in player.inventory:
+                self.state.add_room_item(room_id, item_id)
+            player._set_inventory([])
+            self._remove_occupant(room_id, player)
+            self.broadcast(room_id, f"{player.name} leaves the game.", None)
+
+    def broadcast(self, room_id, text, sender):
+        """Tell every player in a room but sender; call with the room's lock held"""
+        for player in self.occupants.get(room_id, ()):
+            if player is not sender:
+                player.notify(text)
+
+    def _add_occupant(self, room_id, player):
+        """Record that a player is in a room"""
+        occupants = self.occupants.get(room_id)
+        if occupants is None:
+            occupants = self.occupants[room_id] = set()
+        occupants.add(player)
+
+    def _remove_occupant(self, room_id, player):
+        """Record that a player left a room, forgetting rooms nobody is in"""
+        occupants = self.occupants[room_id]
+        occupants.discard(player)
+        if not occupants:
+            del self.occupants[room_id]
+
+class SharedPlayer(GameEngine):
+    """A GameEngine whose room items and unlocks are shared with other players
+
+    The inventory, current room and visited rooms are still the player's own.
+    Saving and loading aren't available, since loading would change the world
+    under everyone else.
+    """
+
+    def __init__(self, shared, name, listener=None):
+        """Join shared as name; use SharedWorld.join() rather than calling this"""
+        super().__init__(shared.world)
+        self.shared = shared
+        self.state = shared.state
+        self.name = name
+        self.listener = listener
+        self.messages = deque()
+        # The lock of the room the player is in, held while a command runs
+        self._lock = None
+        # The unlocked_exits set the reachable rooms were worked out from
+        self._reachable_unlocks = None
+
+    def notify(self, text):
+        """Pass on something another player did"""
+        if self.listener is not None:
+            self.listener(text)
+        else:
+            self.messages.append(text)
+
+    def take_messages(self):
+        """Return and clear the messages waiting for this player"""
+        messages = []
+        while self.messages:
+            messages.append(self.messages.popleft())
+        return messages
+
+    def run_command(self, command):
+        """Run a command while holding the lock of the player's room"""
+        self._lock = self.shared.room_lock(self.current_room)
+        self._lock.acquire()
+        try:
+            return super().run_command(command)
+        finally:
+            self._lock.release()
+            self._lock = None
+
+    def reachable_rooms(self):
+        """Return the rooms reachable from the start, counting every player's unlocks"""
+        # Another player's unlock replaces the set, so a stale search is easy to spot
+        if self._reachable_unlocks is not self.state.unlocked_exits:
+            self._reachable = None
+            self._reachable_unlocks = self.state.unlocked_exits
+        return super().reachable_rooms()
+
+    def _enter_room(self, room_id):
+        """Move to another room, handing over the old room's lock for the new one"""
+        shared = self.shared
+        old_room = self.current_room
+        shared._remove_occupant(old_room, self)
+        shared.broadcast(old_room, f"{self.name} leaves.", self)
+        self._lock.release()
+        self._lock = shared.room_lock(room_id)
+        self._lock.acquire()
+        self.current_room = room_id
+        self.version += 1
+        shared._add_occupant(room_id, self)
+        shared.broadcast(room_id, f"{self.name} arrives.", self)
+
+    def _take_item(self, item_name):
+        """Pick up an item and let the room see it go"""
+        count = len(self.inventory)
+        output = super()._take_item(item_name)
+        if len(self.inventory) > count:
+            # The item taken is added before any a take trigger gives
+            item = self.game_world["items"][self.inventory[count]]
+            self.shared.broadcast(self.current_room, f"{self.name} takes the {item['name']}.", self)
+        return output
+
+    def _drop_item(self, item_name):
+        """Drop an item and let the room see it arrive"""
+        count = len(self.inventory)
+        output = super()._drop_item(item_name)
+        if len(self.inventory) < count:
+            # A dropped item always goes to the end of the room's list
+            item = self.game_world["items"][self.state.room_items(self.current_room)[-1]]
+            self.shared.broadcast(self.current_room, f"{self.name} drops the {item['name']}.", self)
+        return output
+
+    def _use_item(self, item_name):
+        """Use an item where the room can see it"""
+        _, item_id = self._find_noun(item_name, [self.inventory_index.find])
+        output = super()._use_item(item_name)
+        if item_id is not None:
+            item = self.game_world["items"][item_id]
+            self.shared.broadcast(self.current_room, f"{self.name} uses the {item['name']}.", self)
+        return output
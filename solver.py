@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Solver for Retro Text Adventure
+Searches the game's state space to prove a world can be won, find the shortest
+winning command sequence and list dead ends the player can get stuck in
+
+A state is (room, inventory, starting items taken, added items, unlocked exits).
+Only item_uses are modelled; worlds with room triggers are refused, as their
+conditions and effects can be any registered in the triggers module.
+Walking between rooms is folded into each action: from a state, every take or
+use that can be reached by walking is one transition, costing the number of
+commands it takes. That keeps the search to the states where something changes.
+"""
+import argparse
+import heapq
+import multiprocessing
+import sys
+
+from game_engine import DIRECTION_SHORTCUTS, GameEngine
+from world_loader import get_game_world
+from world_state import as_world
+
+class SolverModel:
+    """The rules of a world, reduced to what matters for winning"""
+
+    def __init__(self, game_world, prune_duplicates=True):
+        """Precompute the graph and which items can ever do anything
+
+        Raises ValueError if a room has triggers, which the solver can't follow.
+        """
+        self.world = as_world(game_world)
+        self.graph = self.world.graph
+        self.prune_duplicates = prune_duplicates
+        # Whether to explore uses that only lose an item; see _apply_use()
+        self.keep_losses = False
+        # Only items with a use somewhere are worth picking up
+        self.useful_items = set()
+        for room_id in self.graph.room_ids:
+            self.useful_items.update(self.world.rooms[room_id].get("item_uses", {}))
+
+        # Per room number: useful starting items that can be taken, and
+        # (item id, use, unlocked exit, whether the use only unlocks) for each use
+        self.room_takes = {}
+        self.room_uses = {}
+        items = self.world.items
+        for number, room_id in enumerate(self.graph.room_ids):
+            room = self.world.rooms[room_id]
+            if room.get("triggers"):
+                raise ValueError(f"room '{room_id}' has triggers, which the solver doesn't model")
+            takes = [item_id for item_id in dict.fromkeys(room["items"])
+                     if item_id in self.useful_items and items[item_id].get("takeable", True)]
+            if takes:
+                self.room_takes[number] = takes
+            uses = []
+            for item_id, use in room.get("item_uses", {}).items():
+                pair = (room_id, use["unlocks"]) if "unlocks" in use else None
+                only_unlocks = pair is not None and "adds_item" not in use and not use.get("wins_game")
+                uses.append((item_id, use, pair, only_unlocks))
+            if uses:
+                self.room_uses[number] = uses
+        self.active_rooms = sorted(set(self.room_takes) | set(self.room_uses))
+
+        # Commands for each direction, using the shortest word the parser accepts
+        self.move_commands = {}
+        for shortcut, direction in DIRECTION_SHORTCUTS.items():
+            best = self.move_commands.get(direction)
+            if best is None or len(shortcut) < len(best):
+                self.move_commands[direction] = shortcut
+
+    def start_state(self):
+        """Return the state a new game begins in"""
+        start = self.graph.room_numbers[self.world.starting_room]
+        return (start, (), frozenset(), (), frozenset())
+
+    def _walker(self, room, came_by):
+        """Return a function giving the commands to walk from room to a reached room"""
+        graph = self.graph
+
+        def walk(target):
+            commands = []
+            current = target
+            while current != room:
+                edge = came_by[current]
+                direction = graph.direction_names[graph.direction_codes[edge]]
+                commands.append(self.move_commands.get(direction, f"go {direction}"))
+                current = graph.sources[edge]
+            commands.reverse()
+            return commands
+        return walk
+
+    def successors(self, state):
+        """Yield (commands, next state, wins) for every useful action from a state
+
+        Paths are only spelled out for rooms that turn out to have an action.
+        """
+        room, inventory, taken, added, unlocked = state
+        graph = self.graph
+        items = self.world.items
+        carried = set(inventory)
+        seen, came_by = graph._search(room, graph._open_edges(unlocked))
+        walk = self._walker(room, came_by)
+
+        # Items added during play, by room number
+        added_here = {}
+        for room_id, item_id in added:
+            added_here.setdefault(graph.room_numbers[room_id], []).append(item_id)
+        rooms = self.active_rooms
+        if added_here:
+            rooms = sorted(set(rooms) | set(added_here))
+
+        for target in rooms:
+            if not seen[target]:
+                continue
+            room_id = graph.room_ids[target]
+
+            # Take a starting item that is still here
+            for item_id in self.room_takes.get(target, ()):
+                if (room_id, item_id) in taken or (self.prune_duplicates and item_id in carried):
+                    continue
+                next_state = (target, tuple(sorted(inventory + (item_id,))),
+                              taken | {(room_id, item_id)}, added, unlocked)
+                yield walk(target) + [f"take {items[item_id]['name'].lower()}"], next_state, False
+
+            # Take an item that was added here
+            for item_id in dict.fromkeys(added_here.get(target, ())):
+                if (item_id not in self.useful_items or not items[item_id].get("takeable", True)
+                        or (self.prune_duplicates and item_id in carried)):
+                    continue
+                remaining = list(added)
+                remaining.remove((room_id, item_id))
+                next_state = (target, tuple(sorted(inventory + (item_id,))), taken,
+                              tuple(remaining), unlocked)
+                yield walk(target) + [f"take {items[item_id]['name'].lower()}"], next_state, False
+
+            # Use an item carried here
+            for item_id, use, pair, only_unlocks in self.room_uses.get(target, ()):
+                if item_id not in carried or (only_unlocks and pair in unlocked and not self.keep_losses):
+                    continue
+                result = self._apply_use(room_id, target, item_id, use, state, added_here.get(target, ()))
+                if result is not None:
+                    yield walk(target) + [f"use {items[item_id]['name'].lower()}"], result, bool(use.get("wins_game"))
+
+    def _apply_use(self, room_id, target, item_id, use, state, added_here):
+        """Return the state after using an item, or None if it changes nothing"""
+        _, inventory, taken, added, unlocked = state
+        changed = bool(use.get("wins_game"))
+
+        direction = use.get("unlocks")
+        if direction is not None and (room_id, direction) not in unlocked \
+                and direction in self.world.rooms[room_id].get("locked_exits", {}):
+            unlocked = unlocked | {(room_id, direction)}
+            changed = True
+
+        new_item = use.get("adds_item")
+        if new_item is not None:
+            duplicate = (new_item in inventory or new_item in added_here
+                         or (new_item in self.world.rooms[room_id]["items"]
+                             and (room_id, new_item) not in taken))
+            if not (self.prune_duplicates and duplicate):
+                added = tuple(sorted(added + ((room_id, new_item),)))
+                changed = True
+
+        # Losing an item never helps to win, so a use that only consumes one is
+        # skipped, unless we're looking for every way the player can get stuck
+        consumes = use.get("consumes_item", False)
+        if not changed and not (consumes and self.keep_losses):
+            return None
+        if consumes:
+            carried = list(inventory)
+            carried.remove(item_id)
+            inventory = tuple(carried)
+        return (target, inventory, taken, added, unlocked)
+
+# The model used by worker processes, built once per process
+_model = None
+
+def _init_worker(game_world, prune_duplicates, keep_losses):
+    """Build the worker's model"""
+    global _model
+    _model = SolverModel(game_world, prune_duplicates)
+    _model.keep_losses = keep_losses
+
+def _expand(state):
+    """Worker entry point: return every successor of a state"""
+    return list(_model.successors(state))
+
+class SolveResult:
+    """What a search found"""
+
+    def __init__(self, commands, explored, complete, dead_ends):
+        """commands is None if no win was found; dead_ends lists command paths"""
+        self.commands = commands
+        self.explored = explored
+        self.complete = complete
+        self.dead_ends = dead_ends
+
+    @property
+    def winnable(self):
+        """Return whether a winning sequence was found"""
+        return self.commands is not None
+
+class Solver:
+    """Finds the shortest winning command sequence with a budgeted best-first search"""
+
+    def __init__(self, game_world, budget=200000, prune_duplicates=True):
+        """Search game_world, expanding at most budget states"""
+        self.game_world = game_world
+        self.budget = budget
+        self.prune_duplicates = prune_duplicates
+        self.model = SolverModel(game_world, prune_duplicates)
+
+    def solve(self, find_dead_ends=False, workers=1, batch=64):
+        """Search for the cheapest win; with find_dead_ends, explore everything in budget
+
+        With workers > 1, up to batch states are expanded at a time in a process
+        pool. The world dict must then be picklable.
+        """
+        self.model.keep_losses = find_dead_ends
+        if workers > 1:
+            with multiprocessing.Pool(workers, initializer=_init_worker,
+                                      initargs=(self.game_world, self.prune_duplicates, find_dead_ends)) as pool:
+                return self._search(find_dead_ends, lambda states: pool.map(_expand, states), batch)
+        return self._search(find_dead_ends, lambda states: [list(self.model.successors(state))
+                                                             for state in states], 1)
+
+    def _search(self, find_dead_ends, expand_all, batch):
+        """Best-first search over states, ordered by commands used so far"""
+        start = self.model.start_state()
+        # Each state has an id; parents and costs are kept per id
+        ids = {start: 0}
+        states = [start]
+        cost = [0]
+        parent = [(-1, [])]
+        successors = [] if find_dead_ends else None
+        winning = set()
+        best_win = None
+
+        queue = [(0, 0)]
+        expanded = set()
+        while queue and len(expanded) < self.budget:
+            # Stop once nothing left in the queue can beat the best win
+            if best_win is not None and queue[0][0] >= cost[best_win[0]] + best_win[1] and not find_dead_ends:
+                break
+
+            picked = []
+            while queue and len(picked) < batch:
+                state_cost, state_id = heapq.heappop(queue)
+                if state_id in expanded or state_cost > cost[state_id]:
+                    continue
+                expanded.add(state_id)
+                picked.append(state_id)
+            if not picked:
+                continue
+
+            for state_id, results in zip(picked, expand_all([states[state_id] for state_id in picked])):
+                children = []
+                for commands, next_state, wins in results:
+                    step = len(commands)
+                    if wins:
+                        winning.add(state_id)
+                        if best_win is None or cost[state_id] + step < cost[best_win[0]] + best_win[1]:
+                            best_win = (state_id, step, commands)
+                        continue
+                    next_id = ids.get(next_state)
+                    next_cost = cost[state_id] + step
+                    if next_id is None:
+                        next_id = ids[next_state] = len(states)
+                        states.append(next_state)
+                        cost.append(next_cost)
+                        parent.append((state_id, commands))
+                        heapq.heappush(queue, (next_cost, next_id))
+                    elif next_cost < cost[next_id]:
+                        cost[next_id] = next_cost
+                        parent[next_id] = (state_id, commands)
+                        heapq.heappush(queue, (next_cost, next_id))
+                    children.append(next_id)
+                if successors is not None:
+                    successors.append((state_id, children))
+
+        # The search is complete unless the budget stopped it with work left to do
+        complete = len(expanded) < self.budget or all(
+            state_id in expanded or state_cost > cost[state_id] for state_cost, state_id in queue)
+        commands = None
+        if best_win is not None:
+            state_id, _, final = best_win
+            commands = self._path_to(parent, state_id) + final
+
+        dead_ends = []
+        if find_dead_ends and complete:
+            dead_ends = [self._path_to(parent, state_id)
+                         for state_id in self._dead_ends(successors, winning, len(states))]
+        return SolveResult(commands, len(expanded), complete, dead_ends)
+
+    def greedy(self):
+        """Return a winning command sequence found by always taking the nearest useful action
+
+        This is fast on huge worlds but not always shortest. Unless some use
+        consumes an item, every action only opens the world up, so if the
+        world can be won at all this finds a way.
+        """
+        self.model.keep_losses = False
+        state = self.model.start_state()
+        commands = []
+        while True:
+            best = None
+            for steps, next_state, wins in self.model.successors(state):
+                if wins:
+                    return commands + steps
+                if best is None or len(steps) < len(best[0]):
+                    best = (steps, next_state)
+            if best is None or len(commands) > self.budget:
+                return None
+            commands += best[0]
+            state = best[1]
+
+    def _path_to(self, parent, state_id):
+        """Return the commands that lead from the start to a state"""
+        pieces = []
+        while state_id > 0:
+            state_id, commands = parent[state_id]
+            pieces.append(commands)
+        return [command for commands in reversed(pieces) for command in commands]
+
+    def _dead_ends(self, successors, winning, state_count):
+        """Return ids of states from which no win can be reached"""
+        predecessors = [[] for _ in range(state_count)]
+        for state_id, children in successors:
+            for child in children:
+                predecessors[child].append(state_id)
+
+        # Walk backwards from every state that can win directly
+        can_win = bytearray(state_count)
+        pending = list(winning)
+        for state_id in pending:
+            can_win[state_id] = 1
+        while pending:
+            state_id = pending.pop()
+            for before in predecessors[state_id]:
+                if not can_win[before]:
+                    can_win[before] = 1
+                    pending.append(before)
+        return [state_id for state_id in range(state_count) if not can_win[state_id]]
+
+def verify(game_world, commands):
+    """Replay commands on a real engine and return whether they win the game"""
+    engine = GameEngine(game_world)
+    for command in commands:
+        engine.process_command(command)
+        if engine.game_won:
+            return True
+    return False
+
+def main(argv=None):
+    """Parse command line options, solve the world and print a report"""
+    parser = argparse.ArgumentParser(description="Check that a Retro Text Adventure world can be won")
+    parser.add_argument("--world", metavar="PATH", help="world file to check (default: the built-in world)")
+    parser.add_argument("--budget", type=int, default=200000, help="most states to expand")
+    parser.add_argument("--workers", type=int, default=1, help="processes used to expand states")
+    parser.add_argument("--dead-ends", action="store_true", help="explore every state and list dead ends")
+    parser.add_argument("--greedy", action="store_true",
+                        help="only look for some win, quickly, instead of the shortest")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="also explore making extra copies of items the player already has")
+    args = parser.parse_args(argv)
+
+    game_world = get_game_world(args.world)
+    try:
+        solver = Solver(game_world, args.budget, not args.keep_duplicates)
+    except ValueError as error:
+        print(f"can't solve this world: {error}")
+        return 2
+    if args.greedy:
+        commands = solver.greedy()
+        shortest = False
+    else:
+        result = solver.solve(args.dead_ends, args.workers)
+        print(f"states explored: {result.explored}{'' if result.complete else ' (budget ran out)'}")
+        commands = result.commands
+        shortest = True
+        if commands is None and not result.complete:
+            # Too many states to search them all; settle for any win
+            commands = solver.greedy()
+            shortest = False
+
+    confirmed = commands is not None and verify(game_world, commands)
+    if commands is not None:
+        print(f"winnable in {len(commands)} commands{'' if shortest else ' (not necessarily the fewest)'}"
+              f"{'' if confirmed else ' (BUT REPLAYING THEM DID NOT WIN)'}:")
+        for command in commands:
+            print(f"  {command}")
+    else:
+        print("no winning sequence found")
+
+    if args.dead_ends and not args.greedy:
+        if not result.complete:
+            print("dead ends: unknown, the search didn't finish")
+        else:
+            print(f"dead ends: {len(result.dead_ends)}")
+            for commands in result.dead_ends[:10]:
+                print(f"  after: {', '.join(commands) or '(start)'}")
+    return 0 if confirmed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
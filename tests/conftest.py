@@ -0,0 +1,49 @@
+"""
+Test setup for Retro Text Adventure
+Puts the game's modules on the import path and builds the small worlds the tests share
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def corridor_world():
+    """Return a hall -> gallery -> vault corridor with a trigger in each room past the hall"""
+    return {
+        "starting_room": "hall",
+        "rooms": {
+            "hall": {
+                "name": "Hall", "description": "A bare hall.",
+                "exits": {"east": "gallery"}, "items": ["lamp"],
+            },
+            "gallery": {
+                "name": "Gallery", "description": "Paintings line the walls.",
+                "exits": {"west": "hall", "east": "vault"}, "items": [],
+                "triggers": [
+                    {"on": "enter", "if": {"not_visited": "gallery"},
+                     "message": "The paintings' eyes follow you."},
+                    {"on": "enter", "if": {"has_item": "lamp"}, "effects": [{"add_item": "coin"}],
+                     "message": "Your lamp shows a coin on the floor."},
+                ],
+            },
+            "vault": {
+                "name": "Vault", "description": "An empty vault.",
+                "exits": {"west": "gallery"}, "items": [],
+                "triggers": [
+                    {"on": "enter", "if": {"has_item": "coin"}, "effects": [{"win": True}],
+                     "message": "The coin opens the way out."},
+                ],
+            },
+        },
+        "items": {
+            "lamp": {"name": "Lamp", "description": "A brass lamp."},
+            "coin": {"name": "Coin", "description": "A gold coin."},
+        },
+    }
+
+@pytest.fixture
+def corridor():
+    """Return a fresh corridor world dict"""
+    return corridor_world()
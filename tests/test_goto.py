@@ -0,0 +1,65 @@
+"""
+Goto tests
+Travel by shortest path to rooms seen before, setting off arrival triggers on the way
+"""
+from game_engine import GameEngine
+
+def test_goto_needs_a_known_room(corridor):
+    """Rooms never seen can't be travelled to"""
+    engine = GameEngine(corridor)
+    assert engine.process_command("goto vault") == "You don't know a place called 'vault'."
+    assert engine.process_command("goto hall") == "You're already here."
+
+def test_goto_fires_enter_triggers_along_the_path(corridor):
+    """Walking through a room with goto sets off its triggers like a move would"""
+    engine = GameEngine(corridor)
+    for command in ["e", "e", "goto hall", "take lamp"]:
+        engine.process_command(command)
+    output = engine.process_command("goto vault")
+    assert output.startswith("You make your way east, east.")
+    # The gallery's lamp trigger ran on the way through
+    assert "Your lamp shows a coin on the floor." in output
+    assert "coin" in engine.state.room_items("gallery")
+    assert engine.current_room == "vault"
+
+def test_goto_stops_when_the_game_is_won(corridor):
+    """A trigger that wins the game ends the walk in its room"""
+    corridor["rooms"]["vault"]["exits"]["east"] = "garden"
+    corridor["rooms"]["garden"] = {"name": "Garden", "description": "Daylight at last.",
+                                   "exits": {"west": "vault"}, "items": []}
+    engine = GameEngine(corridor)
+    for command in ["e", "e", "e", "goto hall", "take lamp", "e", "take coin", "w"]:
+        engine.process_command(command)
+    output = engine.process_command("goto garden")
+    assert output.startswith("You make your way east, east.")
+    assert "The coin opens the way out." in output
+    assert engine.game_won
+    assert engine.current_room == "vault"
+
+class WatchedRooms(dict):
+    """A rooms dict that records which rooms were read"""
+
+    def __init__(self, rooms):
+        """Wrap a rooms dict"""
+        super().__init__(rooms)
+        self.read = set()
+
+    def __getitem__(self, room_id):
+        """Return a room and note that it was read"""
+        self.read.add(room_id)
+        return super().__getitem__(room_id)
+
+def test_goto_only_reads_rooms_the_player_knows(corridor):
+    """The way is found among visited rooms, without compiling the rest of the world"""
+    rooms = corridor["rooms"]
+    for number in range(50):
+        rooms[f"annex_{number}"] = {"name": f"Annex {number}", "description": "Dusty.",
+                                    "exits": {"north": "hall"}, "items": []}
+    rooms["hall"]["exits"].update({f"annex {number}": f"annex_{number}" for number in range(50)})
+    corridor["rooms"] = WatchedRooms(rooms)
+    engine = GameEngine(corridor)
+    engine.process_command("e")
+    engine.process_command("e")
+    corridor["rooms"].read.clear()
+    assert engine.process_command("goto hall").startswith("You make your way west, west.")
+    assert corridor["rooms"].read <= {"hall", "gallery", "vault"}
@@ -0,0 +1,67 @@
+"""
+Noun matcher tests
+Partial, misspelled and id nouns, and matchers that follow items as they move
+"""
+from game_engine import SMALL_SCOPE, GameEngine
+from world_index import NounMatcher
+
+def test_partial_nouns(corridor):
+    """A word, a prefix, a typo or an item's id is enough"""
+    corridor["items"]["lamp"]["name"] = "Brass Lamp"
+    corridor["items"]["coin"]["name"] = "Gold Coin"
+    engine = GameEngine(corridor)
+    assert engine.process_command("examine brss") == "A brass lamp."
+    assert engine.process_command("take lamp") == "You take the Brass Lamp."
+    engine.process_command("e")
+    assert engine.process_command("take coin") == "You take the Gold Coin."
+    assert engine.process_command("drop coin") == "You drop the Gold Coin."
+    assert engine.process_command("take gold") == "You take the Gold Coin."
+
+def test_removing_names_undoes_adding_them():
+    """A matcher that had names added and removed matches like one built from what is left"""
+    live, fresh = NounMatcher(), NounMatcher()
+    for name in ["Rusty Key", "Golden Key", "Gold Coin", "Gold Coin", "Old Book"]:
+        live.add(name, name.lower())
+    for name in ["Golden Key", "Gold Coin"]:
+        live.remove(name, name.lower())
+    for name in ["Rusty Key", "Gold Coin", "Old Book"]:
+        fresh.add(name, name.lower())
+    for text in ["key", "gold", "gol", "goldn key", "rusty_key", "book"]:
+        assert live.match(text) == fresh.match(text)
+    assert "golden key" not in live.match("golden")
+
+def test_item_ids_match():
+    """Items can be named by their ids"""
+    world = {
+        "starting_room": "cellar",
+        "rooms": {"cellar": {"name": "Cellar", "description": "Damp.", "exits": {}, "items": ["lantern_7"]}},
+        "items": {"lantern_7": {"name": "Storm Lamp", "description": "A storm lamp."}},
+    }
+    engine = GameEngine(world)
+    assert engine.process_command("take lantern") == "You take the Storm Lamp."
+
+def test_partial_nouns_in_a_crowded_room():
+    """Rooms past SMALL_SCOPE match through matchers that follow items as they move"""
+    items = {f"pebble_{number}": {"name": f"Grey Pebble {number}", "description": "A pebble."}
+             for number in range(SMALL_SCOPE)}
+    items["lantern_7"] = {"name": "Storm Lamp", "description": "A storm lamp."}
+    world = {
+        "starting_room": "cellar",
+        "rooms": {
+            "cellar": {"name": "Cellar", "description": "Damp.", "exits": {"up": "hall"}, "items": list(items)},
+            "hall": {"name": "Hall", "description": "Dry.", "exits": {"down": "cellar"}, "items": []},
+        },
+        "items": items,
+    }
+    engine = GameEngine(world)
+    assert engine.process_command("take strom") == "You take the Storm Lamp."
+    assert engine.process_command("examine lantern") == "A storm lamp."
+    engine.process_command("up")
+    assert engine.process_command("drop lamp") == "You drop the Storm Lamp."
+    engine.process_command("down")
+    assert engine.process_command("examine lamp") == "You don't see any lamp here."
+    engine.process_command("up")
+    assert engine.process_command("take storm") == "You take the Storm Lamp."
+    engine.process_command("down")
+    assert engine.process_command("drop storm") == "You drop the Storm Lamp."
+    assert engine.process_command("take lantern") == "You take the Storm Lamp."
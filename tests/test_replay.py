@@ -0,0 +1,17 @@
+"""
+Golden transcript tests
+Replays transcripts recorded with replay.py --record and checks every response
+"""
+import os
+
+from replay import replay_files
+
+TRANSCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcripts")
+
+def test_builtin_world_matches_golden():
+    """A full playthrough of the built-in world gives the recorded responses"""
+    # Re-record with: python replay.py tests/transcripts/builtin.txt --record tests/transcripts/builtin.jsonl
+    results = list(replay_files([os.path.join(TRANSCRIPTS, "builtin.jsonl")]))
+    assert len(results) == 1
+    assert results[0]["divergence"] is None
+    assert results[0]["game_won"]
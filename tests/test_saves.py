@@ -0,0 +1,100 @@
+"""
+Save tests
+Saved games round-trip through SaveStore, with and without journalled changes
+"""
+from game_data import initialize_game_world
+from game_engine import GameEngine
+import pytest
+
+from saves import SaveError, SaveStore, encode_snapshot, new_session_key, restore_snapshot
+from world_state import World
+
+def session(engine):
+    """Return the parts of a session a load must bring back"""
+    current_room, inventory, _, game_won, state = engine.export_session()
+    return current_room, inventory, game_won, state
+
+def play(engine, commands):
+    """Run commands on an engine"""
+    for command in commands:
+        engine.process_command(command)
+
+def test_save_and_load(tmp_path):
+    """Loading a save brings back the room, inventory and world changes"""
+    world = World(initialize_game_world())
+    engine = GameEngine(world)
+    engine.save_store = SaveStore(str(tmp_path))
+    play(engine, ["take flashlight", "n", "n", "use flashlight"])
+    assert engine.process_command("save first") == "Game saved as 'first'."
+    saved = session(engine)
+
+    other = GameEngine(world)
+    other.save_store = SaveStore(str(tmp_path))
+    assert other.process_command("load first").startswith("Game 'first' restored.")
+    assert session(other) == saved
+
+def test_journalled_saves(tmp_path):
+    """Saving again appends changes, and loading replays them on the snapshot"""
+    world = World(initialize_game_world())
+    engine = GameEngine(world)
+    engine.save_store = SaveStore(str(tmp_path))
+    play(engine, ["take flashlight", "save game", "n", "take photograph", "save game",
+                  "n", "use flashlight", "take crowbar", "save game"])
+    saved = session(engine)
+
+    other = GameEngine(world)
+    other.save_store = SaveStore(str(tmp_path))
+    play(other, ["load game"])
+    assert session(other) == saved
+
+def test_save_written_by_another_engine_is_replaced(tmp_path):
+    """An engine doesn't append to a save file someone else rewrote since"""
+    world = World(initialize_game_world())
+    first, second = GameEngine(world), GameEngine(world)
+    first.save_store = second.save_store = SaveStore(str(tmp_path))
+    play(first, ["take flashlight", "save game"])
+    play(second, ["n", "take photograph", "save game"])
+    play(first, ["take note", "save game"])
+    saved = session(first)
+
+    other = GameEngine(world)
+    other.save_store = SaveStore(str(tmp_path))
+    play(other, ["load game"])
+    assert session(other) == saved
+
+def test_sessions_have_their_own_saves(tmp_path):
+    """Sessions sharing a store can't see or overwrite each other's games"""
+    store = SaveStore(str(tmp_path))
+    world = World(initialize_game_world())
+    first, second = GameEngine(world), GameEngine(world)
+    first.save_store, second.save_store = store.for_session(1), store.for_session(2)
+    play(first, ["take flashlight", "save game"])
+    assert second.process_command("load game") == "There is no saved game called 'game'."
+    assert first.save_store.names() == ["game"]
+
+def test_key_gets_saves_back_after_reconnecting(tmp_path):
+    """A new session that types an old session's key sees that session's games"""
+    store = SaveStore(str(tmp_path))
+    world = World(initialize_game_world())
+    key = new_session_key()
+    first, second = GameEngine(world), GameEngine(world)
+    first.save_store, second.save_store = store.for_session(key), store.for_session(new_session_key())
+    play(first, ["take flashlight", "save game"])
+    assert key in first.process_command("key")
+    assert second.process_command("key ../other") == "That isn't a save key."
+    assert second.process_command("key " + key) == f"Using the games saved with key {key}."
+    assert second.process_command("load game").startswith("Game 'game' restored.")
+    assert session(second) == session(first)
+
+def test_snapshot_with_unknown_room_is_refused():
+    """Every room in a snapshot must exist, not just the current one"""
+    world = World(initialize_game_world())
+    engine = GameEngine(world)
+    play(engine, ["take flashlight", "n"])
+    current_room, inventory, visited, game_won, state = engine.export_session()
+    bad = engine.export_session()
+    engine.load_session((current_room, inventory, [*visited, "nowhere"], game_won, state))
+    with pytest.raises(SaveError):
+        restore_snapshot(GameEngine(world), encode_snapshot(engine))
+    engine.load_session(bad)
+    restore_snapshot(GameEngine(world), encode_snapshot(engine))
@@ -0,0 +1,62 @@
+"""
+Trigger tests
+Enter triggers, their conditions and effects, and item uses compiled to triggers
+"""
+import pytest
+
+from game_data import initialize_game_world
+from game_engine import GameEngine
+from solver import Solver
+from world_graph import WorldGraph
+
+def test_enter_trigger_runs_before_the_room_is_described(corridor):
+    """Arrival messages come after the room description, which already shows what they added"""
+    engine = GameEngine(corridor)
+    engine.process_command("take lamp")
+    output = engine.process_command("e")
+    assert "The paintings' eyes follow you." in output
+    assert "Your lamp shows a coin on the floor." in output
+    assert output.index("Gallery") < output.index("The paintings' eyes")
+    assert "coin" in engine.state.room_items("gallery")
+
+def test_enter_trigger_conditions(corridor):
+    """Triggers whose conditions fail stay quiet"""
+    engine = GameEngine(corridor)
+    first = engine.process_command("e")
+    assert "The paintings' eyes follow you." in first
+    assert "coin" not in first
+    engine.process_command("w")
+    # The gallery has been visited now, and there is still no lamp
+    assert engine.process_command("e") == engine.process_command("look")
+
+def test_win_effect(corridor):
+    """An effect can end the game"""
+    engine = GameEngine(corridor)
+    for command in ["take lamp", "e", "take coin", "e"]:
+        engine.process_command(command)
+    assert engine.game_won
+
+def test_item_use_unlocks_exit():
+    """The built-in world's item uses behave as use triggers"""
+    engine = GameEngine(initialize_game_world())
+    for command in ["take flashlight", "n", "n", "use flashlight", "take crowbar", "s", "e",
+                    "use crowbar", "take rusty key", "w", "n", "w"]:
+        engine.process_command(command)
+    assert engine.process_command("down").startswith("The way down is locked")
+    assert engine.process_command("use rusty key").startswith("You insert the rusty key")
+    assert "Basement" in engine.process_command("down")
+
+def test_solver_refuses_trigger_worlds(corridor):
+    """The solver can't follow triggers, so it says so instead of calling the world unwinnable"""
+    with pytest.raises(ValueError, match="triggers"):
+        Solver(corridor)
+
+def test_use_trigger_unlock_is_a_key(corridor):
+    """The world graph knows an item whose use trigger unlocks an exit opens it"""
+    corridor["rooms"]["hall"]["locked_exits"] = {"east": "The door is locked."}
+    corridor["rooms"]["hall"]["triggers"] = [
+        {"on": "use", "item": "lamp", "effects": [{"unlock": "east"}]}]
+    graph = WorldGraph(corridor)
+    assert graph.keys[graph.locked_edges[("hall", "east")]] == {"lamp"}
+    assert graph.shortest_path("hall", "vault") is None
+    assert graph.shortest_path("hall", "vault", inventory=["lamp"]) is not None
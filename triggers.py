@@ -0,0 +1,201 @@
+"""
+Triggers for Retro Text Adventure
+Rules that run when a player enters a room or takes, uses or examines something,
+checking conditions and then applying a list of effects
+
+A room lists its triggers under "triggers":
+    {"on": "use", "item": "crowbar", "if": {"locked": "down"},
+     "effects": [{"unlock": "down"}, {"add_item": "rusty_key"}],
+     "message": "You pry the door open."}
+
+"on" is enter, take, use or examine. "item" is the item (or, for examine, the
+feature) the trigger is about; leave it out to match anything. Every condition
+in "if" must hold, then the effects run in order. A room's "item_uses" become
+use triggers too, so older worlds behave exactly as before.
+"""
+import threading
+
+EVENTS = ("enter", "take", "use", "examine")
+
+# Condition name -> check(engine, room_id, item_id, value), true when the condition holds
+CONDITIONS = {}
+# Effect name -> apply(engine, room_id, item_id, value)
+EFFECTS = {}
+
+def register_condition(name, check):
+    """Make a condition available to every world's triggers"""
+    CONDITIONS[name] = check
+
+def register_effect(name, apply):
+    """Make an effect available to every world's triggers"""
+    EFFECTS[name] = apply
+
+class Trigger:
+    """One compiled rule: conditions and effects are (function, value) pairs"""
+
+    __slots__ = ("conditions", "effects", "message")
+
+    def __init__(self, conditions, effects, message):
+        """Store a rule that has already been checked"""
+        self.conditions = conditions
+        self.effects = effects
+        self.message = message
+
+    def fire(self, engine, room_id, item_id):
+        """Apply the effects if every condition holds; return whether they were applied"""
+        for check, value in self.conditions:
+            if not check(engine, room_id, item_id, value):
+                return False
+        for apply, value in self.effects:
+            apply(engine, room_id, item_id, value)
+        return True
+
+def compile_trigger(data):
+    """Return a Trigger for one entry of a room's "triggers" list
+
+    Raises ValueError naming the first unknown event, condition or effect.
+    """
+    if data.get("on") not in EVENTS:
+        raise ValueError(f"unknown event '{data.get('on')}'")
+    conditions = []
+    for name, value in data.get("if", {}).items():
+        if name not in CONDITIONS:
+            raise ValueError(f"unknown condition '{name}'")
+        conditions.append((CONDITIONS[name], value))
+    effects = []
+    for effect in data.get("effects", []):
+        for name, value in effect.items():
+            if name not in EFFECTS:
+                raise ValueError(f"unknown effect '{name}'")
+            effects.append((EFFECTS[name], value))
+    return Trigger(tuple(conditions), tuple(effects), data.get("message", ""))
+
+def _item_use_trigger(use):
+    """Return the Trigger that does what an item_uses entry always did"""
+    effects = []
+    if "unlocks" in use:
+        effects.append((EFFECTS["unlock"], use["unlocks"]))
+    if "adds_item" in use:
+        effects.append((EFFECTS["add_item"], use["adds_item"]))
+    if use.get("consumes_item", False):
+        effects.append((EFFECTS["consume_item"], True))
+    if use.get("wins_game"):
+        effects.append((EFFECTS["win"], True))
+    return Trigger((), tuple(effects), use["message"])
+
+def room_triggers(room):
+    """Return a room's triggers as a dict of event -> item id or None -> list of Triggers"""
+    table = {}
+    for item_id, use in room.get("item_uses", {}).items():
+        table.setdefault("use", {}).setdefault(item_id, []).append(_item_use_trigger(use))
+    for data in room.get("triggers", ()):
+        table.setdefault(data["on"], {}).setdefault(data.get("item"), []).append(compile_trigger(data))
+    return table
+
+class TriggerIndex:
+    """Finds the triggers for an (event, room, item) in constant time
+
+    Each room's table is compiled the first time the room is asked about,
+    and only the most recently compiled tables are kept, so huge lazily loaded
+    worlds stay cheap.
+    """
+
+    def __init__(self, rooms, max_rooms=65536):
+        """Index the triggers of a rooms mapping"""
+        self.rooms = rooms
+        self.max_rooms = max_rooms
+        # A plain dict keeps insertion order and is quicker to read than an OrderedDict
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def table(self, room_id):
+        """Return the compiled trigger table of a room"""
+        table = self._tables.get(room_id)
+        if table is None:
+            table = room_triggers(self.rooms[room_id])
+            # Sessions on other threads may be adding and evicting at the same time
+            with self._lock:
+                self._tables[room_id] = table
+                if len(self._tables) > self.max_rooms:
+                    del self._tables[next(iter(self._tables))]
+        return table
+
+    def find(self, event, room_id, item_id=None):
+        """Return the triggers for an event, those naming item_id before those for any item"""
+        table = self._tables.get(room_id)
+        if table is None:
+            table = self.table(room_id)
+        # Most rooms have no triggers for most events
+        by_item = table.get(event)
+        if by_item is None:
+            return ()
+        anything = by_item.get(None)
+        specific = by_item.get(item_id) if item_id is not None else None
+        if specific is None:
+            return anything or ()
+        return specific + anything if anything else specific
+
+def fire(engine, event, item_id=None):
+    """Run every matching trigger in the engine's current room
+
+    Returns the message of each trigger whose effects ran; a trigger without
+    a message gives "".
+    """
+    room_id = engine.current_room
+    index = engine.world.triggers
+    # Every command that can trigger anything comes through here, so rule out
+    # rooms without triggers for this event before doing any more work
+    table = index._tables.get(room_id)
+    if table is None:
+        table = index.table(room_id)
+    if event not in table:
+        return ()
+    triggers = index.find(event, room_id, item_id)
+    if not triggers:
+        return ()
+    # A plain loop, as a comprehension here would make every call pay for closure cells
+    messages = []
+    for trigger in triggers:
+        if trigger.fire(engine, room_id, item_id):
+            messages.append(trigger.message)
+    return messages
+
+# Conditions
+register_condition("has_item", lambda engine, room_id, item_id, value: value in engine.inventory)
+register_condition("lacks_item", lambda engine, room_id, item_id, value: value not in engine.inventory)
+register_condition("room_has_item",
+                   lambda engine, room_id, item_id, value: value in engine.state.room_items(room_id))
+register_condition("locked",
+                   lambda engine, room_id, item_id, value: engine.state.locked_exit(room_id, value) is not None)
+register_condition("unlocked",
+                   lambda engine, room_id, item_id, value: engine.state.locked_exit(room_id, value) is None)
+register_condition("visited", lambda engine, room_id, item_id, value: value in engine.visited_rooms)
+register_condition("not_visited", lambda engine, room_id, item_id, value: value not in engine.visited_rooms)
+
+# Effects
+def _consume_item(engine, room_id, item_id, value):
+    """Take the event's item, or the named item, out of the inventory"""
+    consumed = item_id if value is True else value
+    if consumed in engine.inventory:
+        engine._remove_from_inventory(consumed)
+
+def _remove_item(engine, room_id, item_id, value):
+    """Take an item out of the room if it is there"""
+    if value in engine.state.room_items(room_id):
+        engine.state.remove_room_item(room_id, value)
+
+def _give_item(engine, room_id, item_id, value):
+    """Put an item straight into the inventory"""
+    engine._add_to_inventory(value)
+
+def _win(engine, room_id, item_id, value):
+    """End the game as won"""
+    if value:
+        engine.game_won = True
+
+register_effect("unlock", lambda engine, room_id, item_id, value: engine._unlock_exit(room_id, value))
+register_effect("add_item", lambda engine, room_id, item_id, value: engine.state.add_room_item(room_id, value))
+register_effect("remove_item", _remove_item)
+register_effect("give_item", _give_item)
+register_effect("consume_item", _consume_item)
+register_effect("win", _win)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+World Generator for Retro Text Adventure
+Builds seeded synthetic worlds of any size in the normal world schema, one room at a
+time, so even million-room worlds can be written to JSON or a room store in little memory
+
+Rooms form a tree: room 0 is the start, room n's parent is room (n - 1) // branching,
+and every room leads back to its parent to the south. The path to the last room is
+blocked by puzzle_depth locked doors. Each door's key lies somewhere that can be
+reached before that door, either on the floor or made by using a tool, and the last
+room holds a trophy that wins the game when used there.
+"""
+import argparse
+import json
+import random
+
+from room_store import write_room_store
+
+# Exits to a room's children, in order; every room's exit to its parent is south
+CHILD_DIRECTIONS = ["north", "east", "west", "up", "down"]
+PARENT_DIRECTION = "south"
+
+# Separate random streams for each part of the world
+SEED_KINDS = {"room": 0, "items": 1, "puzzles": 2}
+
+ADJECTIVES = ["Dusty", "Narrow", "Damp", "Silent", "Crooked", "Faded", "Cold", "Cluttered",
+              "Echoing", "Musty", "Gloomy", "Sunlit", "Drafty", "Cramped", "Grand", "Forgotten"]
+PLACES = ["Hall", "Cellar", "Study", "Attic", "Pantry", "Gallery", "Closet", "Chapel",
+          "Workshop", "Library", "Parlor", "Landing", "Vault", "Nursery", "Conservatory", "Stair"]
+THINGS = ["Candle", "Spoon", "Button", "Marble", "Thimble", "Pebble", "Ribbon", "Whistle",
+          "Teacup", "Feather", "Compass", "Locket", "Bell", "Domino", "Lens", "Spindle"]
+MATERIALS = ["Brass", "Wooden", "Glass", "Copper", "Bone", "Tin", "Silk", "Iron"]
+FEATURES = {
+    "window": "Grimy glass looks out on nothing in particular.",
+    "fireplace": "Cold ashes are heaped in the grate.",
+    "painting": "A stern face watches you from a gilt frame.",
+    "rug": "A threadbare rug, worn through in places.",
+    "shelf": "A sagging shelf holds nothing of interest.",
+    "clock": "The hands stopped long ago.",
+    "mirror": "Your reflection looks tired.",
+    "chest": "An empty chest with a broken hinge.",
+}
+TOOLS = [("crowbar", "Crowbar", "loose floorboard", "You pry up the floorboard and find something underneath."),
+         ("shovel", "Shovel", "mound of earth", "You dig into the mound and uncover something."),
+         ("magnet", "Magnet", "grate", "Something metal clinks up through the grate onto the magnet.")]
+
+class WorldGenerator:
+    """Generates one world, the same every time for the same settings
+
+    rooms is the number of rooms, branching how many exits lead onwards from each
+    room (1 to 5), item_density the average number of ordinary items per room and
+    puzzle_depth the number of locked doors between the start and the trophy.
+    """
+
+    def __init__(self, rooms=1000, branching=3, item_density=0.5, puzzle_depth=5, seed=0):
+        """Lay out the puzzles; rooms and items are only generated when iterated"""
+        if rooms < 1:
+            raise ValueError("a world needs at least one room")
+        if not 1 <= branching <= len(CHILD_DIRECTIONS):
+            raise ValueError(f"branching must be between 1 and {len(CHILD_DIRECTIONS)}")
+        if item_density < 0 or puzzle_depth < 0:
+            raise ValueError("item_density and puzzle_depth can't be negative")
+        self.room_count = rooms
+        self.branching = branching
+        self.item_density = item_density
+        self.seed = seed
+        self.starting_room = "room_0"
+        self.goal = rooms - 1
+        self._generators = {}
+
+        # Only the rooms with puzzle pieces are remembered, not the whole map
+        self.locks = {}
+        self.placed_items = {}
+        self.item_uses = {}
+        self.features = {}
+        self.puzzle_items = {}
+        self._plan_puzzles(puzzle_depth)
+
+    def parent(self, number):
+        """Return the number of a room's parent"""
+        return (number - 1) // self.branching
+
+    def children(self, number):
+        """Return the numbers of a room's children"""
+        first = number * self.branching + 1
+        return range(first, min(first + self.branching, self.room_count))
+
+    def _rng(self, kind, number):
+        """Return a random generator for one part of the world, e.g. ("room", 42)
+
+        Each kind keeps one generator that is reseeded from the settings' seed
+        and the number, which is much cheaper than creating a new one.
+        """
+        rng = self._generators.get(kind)
+        if rng is None:
+            rng = self._generators[kind] = random.Random()
+        rng.seed((self.seed * len(SEED_KINDS) + SEED_KINDS[kind]) << 40 | number)
+        return rng
+
+    def _goal_path(self, depths):
+        """Return {depth: room number} for the rooms at the given depths on the way to the goal"""
+        path = []
+        room = self.goal
+        while True:
+            path.append(room)
+            if room == 0:
+                break
+            room = self.parent(room)
+        # path runs goal to start, so the start is at depth 0
+        total = len(path) - 1
+        return {depth: path[total - depth] for depth in depths if 0 <= depth <= total}, total
+
+    def _plan_puzzles(self, puzzle_depth):
+        """Choose the locked doors, where their keys are and how to get them"""
+        _, path_length = self._goal_path(())
+        puzzle_depth = min(puzzle_depth, path_length)
+        rng = self._rng("puzzles", 0)
+
+        # Doors are spread evenly along the way; each key lies between its door and the one before
+        door_depths = [(number + 1) * path_length // (puzzle_depth + 1) for number in range(puzzle_depth)]
+        door_depths = sorted(set(door_depths))
+        spots = []
+        previous = 0
+        for depth in door_depths:
+            spots.append((rng.randint(previous, depth), rng.randint(previous, depth)))
+            previous = depth + 1
+        wanted = set(door_depths) | {depth + 1 for depth in door_depths}
+        wanted |= {depth for pair in spots for depth in pair}
+        wanted |= {depth + 1 for pair in spots for depth in pair}
+        on_path, _ = self._goal_path(wanted)
+
+        for number, depth in enumerate(door_depths):
+            door_room = on_path[depth]
+            onward = on_path[depth + 1]
+            direction = CHILD_DIRECTIONS[onward - door_room * self.branching - 1]
+            key_id = f"key_{number}"
+            self.locks.setdefault(door_room, {})[direction] = {
+                "description": "blocked by a heavy locked door",
+                "hint": f"A brass plate on the door is engraved with the number {number}.",
+            }
+            self._add_use(door_room, key_id, {
+                "message": f"Key {number} turns in the lock and the door swings open.",
+                "unlocks": direction,
+                "consumes_item": rng.random() < 0.3,
+            })
+            self.puzzle_items[key_id] = {
+                "name": f"Key {number}",
+                "description": f"A brass key stamped with the number {number}.",
+                "takeable": True,
+            }
+
+            key_depth, tool_depth = spots[number]
+            key_room = self._side_room(on_path, key_depth, rng)
+            if number % 2 == 0:
+                self.placed_items.setdefault(key_room, []).append(key_id)
+                continue
+
+            # Odd keys are hidden and need a tool to get at
+            tool_id, tool_name, feature, message = TOOLS[number // 2 % len(TOOLS)]
+            tool_id = f"{tool_id}_{number}"
+            self.puzzle_items[tool_id] = {
+                "name": f"{tool_name} {number}",
+                "description": f"A sturdy {tool_name.lower()} with the number {number} scratched on it.",
+                "takeable": True,
+            }
+            self.placed_items.setdefault(self._side_room(on_path, tool_depth, rng), []).append(tool_id)
+            self.features.setdefault(key_room, {})[feature.replace(" ", "_")] = {
+                "description": f"There's a {feature} here. Something might be hidden under it."}
+            self._add_use(key_room, tool_id, {"message": message, "adds_item": key_id})
+
+        self.puzzle_items["trophy"] = {
+            "name": "Golden Trophy",
+            "description": "A gleaming trophy. Holding it up here feels right.",
+            "takeable": True,
+        }
+        self.placed_items.setdefault(self.goal, []).append("trophy")
+        self._add_use(self.goal, "trophy", {
+            "message": "You raise the trophy and the whole house seems to cheer. You've won!",
+            "wins_game": True,
+        })
+
+    def _add_use(self, room, item_id, use):
+        """Record an item use in a room"""
+        self.item_uses.setdefault(room, {})[item_id] = use
+
+    def _side_room(self, on_path, depth, rng):
+        """Return a room reached from the path room at depth, maybe down a side branch"""
+        room = on_path[depth]
+        onward = on_path.get(depth + 1)
+        for _ in range(rng.randint(0, 3)):
+            choices = [child for child in self.children(room) if child != onward]
+            if not choices:
+                break
+            room = rng.choice(choices)
+            onward = None
+        return room
+
+    def _ordinary_items(self, number):
+        """Return (item id, item) for the ordinary items in a room"""
+        rng = self._rng("items", number)
+        count = int(self.item_density)
+        if rng.random() < self.item_density - count:
+            count += 1
+        items = []
+        for position in range(count):
+            name = f"{rng.choice(MATERIALS)} {rng.choice(THINGS)}"
+            items.append((f"item_{number}_{position}", {
+                "name": name,
+                "description": f"An ordinary {name.lower()}.",
+                "takeable": rng.random() < 0.9,
+            }))
+        return items
+
+    def room(self, number):
+        """Return the room dict for a room number"""
+        rng = self._rng("room", number)
+        exits = {}
+        if number > 0:
+            exits[PARENT_DIRECTION] = f"room_{self.parent(number)}"
+        for position, child in enumerate(self.children(number)):
+            exits[CHILD_DIRECTIONS[position]] = f"room_{child}"
+
+        features = {}
+        for feature_id in rng.sample(sorted(FEATURES), rng.randint(0, 2)):
+            features[feature_id] = {"description": FEATURES[feature_id]}
+        features.update(self.features.get(number, {}))
+
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(PLACES)} {number}"
+        room = {
+            "name": name,
+            "description": f"You are in the {name.lower()}.",
+            "exits": exits,
+            "items": [item_id for item_id, _ in self._ordinary_items(number)]
+                     + self.placed_items.get(number, []),
+            "features": features,
+        }
+        if number in self.locks:
+            room["locked_exits"] = self.locks[number]
+        if number in self.item_uses:
+            room["item_uses"] = self.item_uses[number]
+        return room
+
+    def rooms(self):
+        """Yield (room id, room dict) for every room, in order"""
+        for number in range(self.room_count):
+            yield f"room_{number}", self.room(number)
+
+    def items(self):
+        """Yield (item id, item dict) for every item, puzzle items first"""
+        yield from self.puzzle_items.items()
+        for number in range(self.room_count):
+            yield from self._ordinary_items(number)
+
+    def generate(self):
+        """Return the whole world as a dict; for big worlds, write it out instead"""
+        return {"starting_room": self.starting_room, "rooms": dict(self.rooms()), "items": dict(self.items())}
+
+    def write_json(self, path):
+        """Write the world to a JSON file one room at a time"""
+        with open(path, "w", encoding="utf-8") as world_file:
+            world_file.write(f'{{"starting_room": {json.dumps(self.starting_room)},\n')
+            for section, entries in (("rooms", self.rooms()), ("items", self.items())):
+                world_file.write(f'"{section}": {{')
+                separator = "\n"
+                for key, value in entries:
+                    world_file.write(f"{separator}{json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}")
+                    separator = ",\n"
+                world_file.write("\n}" + (",\n" if section == "rooms" else "\n"))
+            world_file.write("}\n")
+
+    def write_store(self, path):
+        """Write the world to a sqlite room store one room at a time"""
+        write_room_store(path, self.starting_room, self.rooms(), self.items())
+
+def main(argv=None):
+    """Parse command line options and write a generated world"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic Retro Text Adventure world")
+    parser.add_argument("output", help="file to write: .json, or .db/.sqlite for a room store")
+    parser.add_argument("--rooms", type=int, default=1000, help="number of rooms")
+    parser.add_argument("--branching", type=int, default=3, help="exits leading onwards from each room (1-5)")
+    parser.add_argument("--item-density", type=float, default=0.5, help="average ordinary items per room")
+    parser.add_argument("--puzzle-depth", type=int, default=5, help="locked doors between the start and the goal")
+    parser.add_argument("--seed", type=int, default=0, help="random seed; the same seed gives the same world")
+    args = parser.parse_args(argv)
+
+    try:
+        generator = WorldGenerator(args.rooms, args.branching, args.item_density, args.puzzle_depth, args.seed)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    if args.output.endswith((".db", ".sqlite")):
+        generator.write_store(args.output)
+    else:
+        generator.write_json(args.output)
+    print(f"Wrote {args.rooms} rooms with {len(generator.locks)} locked doors to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+World Graph for Retro Text Adventure
+Compiles the rooms' exits into integer-indexed arrays for fast path and reachability queries
+
+WorldGraph compiles every room at once, for tools that look at the whole world.
+RoomGraph compiles rooms one at a time as players walk between them, so huge
+lazily loaded worlds only pay for the rooms someone has been to.
+"""
+import threading
+from array import array
+from collections import deque
+
+from world_index import NameIndex
+
+class WorldGraph:
+    """The rooms of a world as a directed graph in compressed adjacency arrays
+
+    Room n's exits are edges offsets[n] to offsets[n + 1] - 1. Each edge has
+    a source and a target room number (-1 if the exit leads nowhere), a
+    direction code and a locked flag; locked edges also record which items
+    unlock them, through item_uses or use triggers. A trigger's conditions
+    aren't checked, so its item counts as a key even if they might not hold.
+    """
+
+    def __init__(self, game_world):
+        """Compile the graph from a game world dict"""
+        rooms = game_world["rooms"]
+        self.room_ids = list(rooms)
+        self.room_numbers = {room_id: number for number, room_id in enumerate(self.room_ids)}
+        self.room_names = NameIndex()
+
+        self.offsets = array("l", [0])
+        self.sources = array("l")
+        self.targets = array("l")
+        self.direction_codes = array("H")
+        self.direction_names = []
+        self.locked = bytearray()
+        # edge -> set of item ids whose use in the exit's room unlocks it
+        self.keys = {}
+        # (room_id, direction) -> edge, for locked exits only
+        self.locked_edges = {}
+
+        direction_numbers = {}
+        for number, room_id in enumerate(self.room_ids):
+            room = rooms[room_id]
+            self.room_names.add(room["name"], room_id)
+            locks = room.get("locked_exits", {})
+            unlocked_by = {}
+            for item_id, use in room.get("item_uses", {}).items():
+                if "unlocks" in use:
+                    unlocked_by.setdefault(use["unlocks"], set()).add(item_id)
+            for trigger in room.get("triggers", ()):
+                if trigger.get("on") == "use" and trigger.get("item") is not None:
+                    for effect in trigger.get("effects", ()):
+                        if "unlock" in effect:
+                            unlocked_by.setdefault(effect["unlock"], set()).add(trigger["item"])
+
+            for direction, target in room["exits"].items():
+                edge = len(self.targets)
+                self.sources.append(number)
+                self.targets.append(self.room_numbers.get(target, -1))
+                code = direction_numbers.get(direction)
+                if code is None:
+                    code = direction_numbers[direction] = len(self.direction_names)
+                    self.direction_names.append(direction)
+                self.direction_codes.append(code)
+                if direction in locks:
+                    self.locked.append(1)
+                    self.locked_edges[(room_id, direction)] = edge
+                    self.keys[edge] = unlocked_by.get(direction, set())
+                else:
+                    self.locked.append(0)
+            self.offsets.append(len(self.targets))
+
+    def find_room(self, name):
+        """Return the id of the room with this id or display name, or None"""
+        if name in self.room_numbers:
+            return name
+        return self.room_names.find(name)
+
+    def _open_edges(self, unlocked=(), inventory=(), ignore_locks=False):
+        """Return a function telling whether an edge can be walked through"""
+        if ignore_locks:
+            return lambda edge: True
+        opened = {self.locked_edges[pair] for pair in unlocked if pair in self.locked_edges}
+        held = set(inventory)
+        locked = self.locked
+        keys = self.keys
+
+        def is_open(edge):
+            return not locked[edge] or edge in opened or not keys[edge].isdisjoint(held)
+        return is_open
+
+    def _search(self, start, is_open, goal=-1):
+        """Breadth-first search from room number start; return the edge used to reach each room"""
+        came_by = array("l", [-1]) * len(self.room_ids)
+        seen = bytearray(len(self.room_ids))
+        seen[start] = 1
+        queue = deque([start])
+        offsets, targets = self.offsets, self.targets
+        while queue:
+            room = queue.popleft()
+            if room == goal:
+                break
+            for edge in range(offsets[room], offsets[room + 1]):
+                target = targets[edge]
+                if target >= 0 and not seen[target] and is_open(edge):
+                    seen[target] = 1
+                    came_by[target] = edge
+                    queue.append(target)
+        return seen, came_by
+
+    def shortest_path(self, start_id, goal_id, unlocked=(), inventory=(), ignore_locks=False):
+        """Return the directions of a shortest walk between two rooms, or None
+
+        unlocked holds (room_id, direction) pairs already unlocked, and exits
+        whose key is in inventory count as open too.
+        """
+        start, goal = self.room_numbers[start_id], self.room_numbers[goal_id]
+        seen, came_by = self._search(start, self._open_edges(unlocked, inventory, ignore_locks), goal)
+        if not seen[goal]:
+            return None
+        directions = []
+        room = goal
+        while room != start:
+            edge = came_by[room]
+            directions.append(self.direction_names[self.direction_codes[edge]])
+            room = self.sources[edge]
+        directions.reverse()
+        return directions
+
+    def reachable(self, start_id, unlocked=(), inventory=(), ignore_locks=False):
+        """Return the ids of every room that can be walked to from start_id"""
+        seen, _ = self._search(self.room_numbers[start_id],
+                               self._open_edges(unlocked, inventory, ignore_locks))
+        return [room_id for room_id, reached in zip(self.room_ids, seen) if reached]
+
+    def unreachable(self, start_id, unlocked=(), inventory=(), ignore_locks=True):
+        """Return the ids of rooms that can't be walked to from start_id
+
+        By default every lock counts as open, so this lists rooms no exit leads to.
+        """
+        seen, _ = self._search(self.room_numbers[start_id],
+                               self._open_edges(unlocked, inventory, ignore_locks))
+        return [room_id for room_id, reached in zip(self.room_ids, seen) if not reached]
+
+class ReachableSet:
+    """The rooms reachable from a start room, kept up to date as exits unlock
+
+    Unlocking only ever opens the graph up, so each unlock just continues the
+    search from the newly opened exit instead of starting over.
+    """
+
+    def __init__(self, graph, start_id, unlocked=(), inventory=()):
+        """Search from start_id with the given unlocked exits and inventory"""
+        self.graph = graph
+        self.opened = {graph.locked_edges[pair] for pair in unlocked if pair in graph.locked_edges}
+        self.inventory = set(inventory)
+        self.seen = bytearray(len(graph.room_ids))
+        self._extend(graph.room_numbers[start_id])
+
+    def _is_open(self, edge):
+        """Return whether an edge can be walked through"""
+        graph = self.graph
+        return (not graph.locked[edge] or edge in self.opened
+                or not graph.keys[edge].isdisjoint(self.inventory))
+
+    def _extend(self, room):
+        """Mark room and everything newly reachable from it"""
+        graph, seen = self.graph, self.seen
+        if seen[room]:
+            return
+        seen[room] = 1
+        queue = deque([room])
+        while queue:
+            current = queue.popleft()
+            for edge in range(graph.offsets[current], graph.offsets[current + 1]):
+                target = graph.targets[edge]
+                if target >= 0 and not seen[target] and self._is_open(edge):
+                    seen[target] = 1
+                    queue.append(target)
+
+    def _open(self, edge):
+        """Continue the search through an edge that just opened"""
+        if self.seen[self.graph.sources[edge]] and self.graph.targets[edge] >= 0:
+            self._extend(self.graph.targets[edge])
+
+    def unlock(self, room_id, direction):
+        """Record that an exit was unlocked"""
+        edge = self.graph.locked_edges.get((room_id, direction))
+        if edge is not None and edge not in self.opened:
+            self.opened.add(edge)
+            self._open(edge)
+
+    def __contains__(self, room_id):
+        """Return whether a room is reachable"""
+        number = self.graph.room_numbers.get(room_id)
+        return number is not None and bool(self.seen[number])
+
+    def rooms(self):
+        """Return the ids of every reachable room"""
+        return [room_id for room_id, reached in zip(self.graph.room_ids, self.seen) if reached]
+
+class RoomGraph:
+    """The exits of the rooms players know, compiled a room at a time
+
+    A room gets a number when it is first seen, as a room or as an exit's
+    target, but its own exits are only compiled when a search walks through
+    it. Room n's exits are edges first_edge[n] to first_edge[n] + edge_counts[n] - 1;
+    first_edge[n] is -1 until the room is compiled. Sessions on several
+    threads can share one graph: rooms are numbered and compiled under a lock.
+    """
+
+    def __init__(self, rooms):
+        """Start with nothing compiled from a rooms mapping"""
+        self.rooms = rooms
+        self.room_ids = []
+        self.room_numbers = {}
+        # Display names of compiled rooms, for find_room()
+        self.room_names = NameIndex()
+        self.first_edge = array("l")
+        self.edge_counts = array("l")
+        self.targets = array("l")
+        self.direction_codes = array("H")
+        self.direction_names = []
+        self._direction_numbers = {}
+        self.locked = bytearray()
+        self._lock = threading.Lock()
+
+    def _number(self, room_id):
+        """Return a room's number, giving it one if it has none; call with the lock held"""
+        number = self.room_numbers.get(room_id)
+        if number is None:
+            number = self.room_numbers[room_id] = len(self.room_ids)
+            self.room_ids.append(room_id)
+            self.first_edge.append(-1)
+            self.edge_counts.append(0)
+        return number
+
+    def add_room(self, room_id):
+        """Compile a room's exits if they aren't already, and return its number"""
+        number = self.room_numbers.get(room_id)
+        if number is not None and self.first_edge[number] >= 0:
+            return number
+        room = self.rooms[room_id]
+        with self._lock:
+            number = self._number(room_id)
+            if self.first_edge[number] >= 0:
+                return number
+            first = len(self.targets)
+            locks = room.get("locked_exits", {})
+            for direction, target in room["exits"].items():
+                # Targets are only numbered; a missing room is never visited, so never compiled
+                self.targets.append(self._number(target))
+                code = self._direction_numbers.get(direction)
+                if code is None:
+                    code = self._direction_numbers[direction] = len(self.direction_names)
+                    self.direction_names.append(direction)
+                self.direction_codes.append(code)
+                self.locked.append(direction in locks)
+            self.room_names.add(room["name"], room_id)
+            self.edge_counts[number] = len(self.targets) - first
+            # Set last, so other threads never see a room whose edges are half written
+            self.first_edge[number] = first
+        return number
+
+    def add_rooms(self, room_ids):
+        """Compile every room in room_ids"""
+        for room_id in room_ids:
+            self.add_room(room_id)
+
+    def find_room(self, name):
+        """Return the id of the compiled room with this id or display name, or None"""
+        number = self.room_numbers.get(name)
+        if number is not None and self.first_edge[number] >= 0:
+            return name
+        return self.room_names.find(name)
+
+    def shortest_path(self, start_id, goal_id, allowed, unlocked=()):
+        """Return the directions of a shortest walk between two rooms, or None
+
+        The walk only passes through rooms in allowed, such as the rooms a
+        player has visited, so the search costs no more than they do. Locked
+        exits are open if their (room_id, direction) pair is in unlocked.
+        """
+        start, goal = self.add_room(start_id), self.add_room(goal_id)
+        came_by = {start: None}
+        queue = deque([start])
+        room_ids, targets, locked = self.room_ids, self.targets, self.locked
+        while queue and goal not in came_by:
+            room = queue.popleft()
+            room_id = room_ids[room]
+            self.add_room(room_id)
+            first = self.first_edge[room]
+            for edge in range(first, first + self.edge_counts[room]):
+                target = targets[edge]
+                if target in came_by:
+                    continue
+                if target != goal and room_ids[target] not in allowed:
+                    continue
+                if locked[edge] and (room_id, self.direction_names[self.direction_codes[edge]]) not in unlocked:
+                    continue
+                came_by[target] = (room, edge)
+                queue.append(target)
+        if goal not in came_by:
+            return None
+        directions = []
+        room = goal
+        while room != start:
+            room, edge = came_by[room]
+            directions.append(self.direction_names[self.direction_codes[edge]])
+        directions.reverse()
+        return directions
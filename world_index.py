@@ -0,0 +1,329 @@
+"""
+World Index for Retro Text Adventure
+Case-folded name lookups for items and room features, so commands don't scan lists,
+and a matcher that recognises partial and misspelled names
+"""
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from functools import lru_cache
+from operator import itemgetter
+
+def fold_name(name):
+    """Fold a name the same way the engine compares names typed by the player"""
+    return name.lower()
+
+class NameIndex:
+    """Maps folded names to the ids that carry them, in the order they were added"""
+
+    __slots__ = ("_ids",)
+
+    def __init__(self):
+        """Create an empty index"""
+        self._ids = {}
+
+    def add(self, name, key):
+        """Add an id under a name"""
+        folded = fold_name(name)
+        ids = self._ids.get(folded)
+        if ids is None:
+            self._ids[folded] = [key]
+        else:
+            ids.append(key)
+
+    def remove(self, name, key):
+        """Remove the first occurrence of an id from under a name"""
+        folded = fold_name(name)
+        ids = self._ids[folded]
+        ids.remove(key)
+        if not ids:
+            del self._ids[folded]
+
+    def find(self, name):
+        """Return the first id added under a name, or None"""
+        ids = self._ids.get(fold_name(name))
+        if ids:
+            return ids[0]
+        return None
+
+    def find_all(self, name):
+        """Return every id added under a name, oldest first"""
+        return self._ids.get(fold_name(name), ())
+
+    def __len__(self):
+        """Return the number of distinct names in the index"""
+        return len(self._ids)
+
+# Shortest word that can stand for a longer one, and shortest word that may be misspelled
+MIN_PREFIX = 3
+MIN_TYPO = 4
+
+# How well a noun matched, best first
+EXACT = 0
+WORDS = 1
+PREFIX = 2
+TYPO = 3
+
+class NounMatcher:
+    """Finds the names a player probably meant by a partial or misspelled noun
+
+    Each name is added under one or more phrases (e.g. "Rusty Key" under
+    "rusty key" and its id "rusty_key"). A noun matches a phrase when every
+    word typed matches a word of the phrase exactly, as a prefix, or with one
+    letter added, missing, changed or swapped. Prefixes are found by bisecting
+    a sorted word list and typos through an index of every word with one letter
+    deleted, so lookups don't depend on how many names there are. Names can be
+    added and removed one at a time, as items come and go; a word stays indexed
+    once seen, so an item moving back and forth doesn't rebuild its entries.
+    """
+
+    __slots__ = ("_phrases", "_words", "_sorted_words", "_deletions")
+
+    def __init__(self):
+        """Create an empty matcher"""
+        # folded phrase -> names it stands for -> how many times it was added for them
+        self._phrases = {}
+        # word -> phrases containing it, empty once they have all been removed
+        self._words = {}
+        self._sorted_words = None
+        # word with one letter deleted -> words it came from
+        self._deletions = {}
+
+    def add(self, phrase, name):
+        """Add a phrase the player might type for a name"""
+        phrase = _fold_phrase(phrase)
+        if not phrase:
+            return
+        names = self._phrases.get(phrase)
+        if names is None:
+            names = self._phrases[phrase] = {}
+            for word in phrase.split():
+                self._add_word(word, phrase)
+        names[name] = names.get(name, 0) + 1
+
+    def remove(self, phrase, name):
+        """Undo one add() of a phrase for a name"""
+        phrase = _fold_phrase(phrase)
+        names = self._phrases.get(phrase)
+        if names is None or name not in names:
+            return
+        if names[name] > 1:
+            names[name] -= 1
+            return
+        del names[name]
+        if not names:
+            del self._phrases[phrase]
+            for word in set(phrase.split()):
+                del self._words[word][phrase]
+
+    def _add_word(self, word, phrase):
+        """Index one word of a phrase"""
+        phrases = self._words.get(word)
+        if phrases is not None:
+            phrases[phrase] = None
+            return
+        self._words[word] = {phrase: None}
+        if self._sorted_words is not None:
+            insort(self._sorted_words, word)
+        if len(word) >= MIN_TYPO:
+            for deleted in _deletions(word):
+                self._deletions.setdefault(deleted, set()).add(word)
+
+    def _match_word(self, word):
+        """Return a dict of known words matching a typed word to how well they match"""
+        # Words whose phrases were all removed are skipped
+        known_words = self._words
+        matches = {}
+        if known_words.get(word):
+            matches[word] = WORDS
+        if len(word) >= MIN_PREFIX:
+            if self._sorted_words is None:
+                self._sorted_words = sorted(known_words)
+            words = self._sorted_words
+            position = bisect_left(words, word)
+            while position < len(words) and words[position].startswith(word):
+                if known_words[words[position]]:
+                    matches.setdefault(words[position], PREFIX)
+                position += 1
+        if not matches and len(word) >= MIN_TYPO:
+            # One letter missing, extra, changed or two letters swapped
+            variants = _deletions(word)
+            for known in (word, *variants):
+                for candidate in self._deletions.get(known, ()):
+                    if known_words[candidate]:
+                        matches.setdefault(candidate, TYPO)
+            for known in variants:
+                if known_words.get(known):
+                    matches.setdefault(known, TYPO)
+        return matches
+
+    def match(self, text, limit=None):
+        """Return a dict of names the text could mean to how well they match, best first
+
+        With limit set, only that many of the best matches are returned.
+        """
+        folded = _fold_phrase(text)
+        found = {}
+        for name in self._phrases.get(folded, ()):
+            found[name] = EXACT
+
+        # Every word typed has to match some word of the phrase. The phrases of
+        # the word with the fewest are gathered first and the other words only
+        # narrow them down, so a word that is in every name costs nothing extra.
+        word_matches = [self._match_word(word) for word in folded.split()]
+        if len(word_matches) > 1:
+            word_matches.sort(key=self._phrase_count)
+        phrases = None
+        for matches in word_matches:
+            if phrases is None:
+                phrases = {}
+                for known, score in matches.items():
+                    for phrase in self._words[known]:
+                        if score < phrases.get(phrase, TYPO + 1):
+                            phrases[phrase] = score
+            else:
+                narrowed = {}
+                for phrase, score in phrases.items():
+                    best = min([matches[word] for word in phrase.split() if word in matches], default=None)
+                    if best is not None:
+                        narrowed[phrase] = max(score, best)
+                phrases = narrowed
+            if not phrases:
+                break
+
+        for phrase, score in (phrases or {}).items():
+            for name in self._phrases[phrase]:
+                if score < found.get(name, TYPO + 1):
+                    found[name] = score
+        if len(found) < 2:
+            return found
+        return dict(sorted(found.items(), key=itemgetter(1))[:limit])
+
+    def _phrase_count(self, matches):
+        """Return how many phrases contain the words of a _match_word() result"""
+        return sum(len(self._words[known]) for known in matches)
+
+    def __len__(self):
+        """Return the number of distinct phrases"""
+        return len(self._phrases)
+
+@lru_cache(maxsize=4096)
+def _fold_phrase(text):
+    """Fold a name or id into the words a player would type, one space apart"""
+    return " ".join(fold_name(text).replace("_", " ").split())
+
+def _deletions(word):
+    """Return every string made by deleting one letter of word"""
+    return {word[:position] + word[position + 1:] for position in range(len(word))}
+
+def scope_matcher(item_ids, items, features):
+    """Return a NounMatcher over some items and a room_features() dict"""
+    matcher = NounMatcher()
+    for item_id in item_ids:
+        add_item_noun(matcher, item_id, items[item_id]["name"])
+    for folded, feature_id in features.items():
+        matcher.add(feature_id, folded)
+    return matcher
+
+def add_item_noun(matcher, item_id, name):
+    """Let a matcher find an item by its name or its id
+
+    Matches are the folded names the exact lookups use, so an id leads to the
+    item's name.
+    """
+    folded = fold_name(name)
+    matcher.add(name, folded)
+    matcher.add(item_id, folded)
+
+def remove_item_noun(matcher, item_id, name):
+    """Undo add_item_noun()"""
+    folded = fold_name(name)
+    matcher.remove(name, folded)
+    matcher.remove(item_id, folded)
+
+class WorldIndex:
+    """Name indexes over a static game world, built lazily one room at a time
+
+    At most max_rooms rooms keep their indexes; the least recently used are
+    rebuilt if they are needed again, so huge worlds don't grow without bound.
+    The caches are only added to and trimmed under a lock, so sessions on
+    several threads can share one index.
+    """
+
+    def __init__(self, game_world, max_rooms=65536):
+        """Create the index for a game world; nothing is built until it is needed"""
+        self.game_world = game_world
+        self.max_rooms = max_rooms
+        self._items_by_name = None
+        self._room_items = OrderedDict()
+        self._room_features = OrderedDict()
+        self._room_matchers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, cache, room_id, index):
+        """Store a room's index, dropping the least recently used room if over the limit"""
+        with self._lock:
+            cache[room_id] = index
+            if len(cache) > self.max_rooms:
+                cache.popitem(last=False)
+
+    @staticmethod
+    def _touch(cache, room_id):
+        """Mark a room's index as just used, unless another thread has evicted it"""
+        try:
+            cache.move_to_end(room_id)
+        except KeyError:
+            pass
+
+    def find_item(self, name):
+        """Return the id of the first item in the world with this name, or None"""
+        if self._items_by_name is None:
+            index = NameIndex()
+            for item_id, item in self.game_world["items"].items():
+                index.add(item["name"], item_id)
+            self._items_by_name = index
+        return self._items_by_name.find(name)
+
+    def room_items(self, room_id):
+        """Return the index of the items a room starts with"""
+        index = self._room_items.get(room_id)
+        if index is None:
+            index = NameIndex()
+            items = self.game_world["items"]
+            for item_id in self.game_world["rooms"][room_id]["items"]:
+                index.add(items[item_id]["name"], item_id)
+            self._remember(self._room_items, room_id, index)
+        else:
+            self._touch(self._room_items, room_id)
+        return index
+
+    def room_features(self, room_id):
+        """Return a dict of folded feature names to feature ids for a room"""
+        features = self._room_features.get(room_id)
+        if features is None:
+            features = {}
+            for feature_id in self.game_world["rooms"][room_id].get("features", {}):
+                features.setdefault(fold_name(feature_id), feature_id)
+            self._remember(self._room_features, room_id, features)
+        else:
+            self._touch(self._room_features, room_id)
+        return features
+
+    def room_matcher(self, room_id):
+        """Return a NounMatcher over the items a room starts with and its features
+
+        Items taken from the room still match; the exact lookups the engine
+        tries each match with leave them out.
+        """
+        matcher = self._room_matchers.get(room_id)
+        if matcher is None:
+            matcher = NounMatcher()
+            items = self.game_world["items"]
+            for item_id in self.game_world["rooms"][room_id]["items"]:
+                add_item_noun(matcher, item_id, items[item_id]["name"])
+            for folded, feature_id in self.room_features(room_id).items():
+                matcher.add(feature_id, folded)
+            self._remember(self._room_matchers, room_id, matcher)
+        else:
+            self._touch(self._room_matchers, room_id)
+        return matcher
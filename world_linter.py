@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+World Linter for Retro Text Adventure
+Finds broken references, rooms nobody can reach, items nobody can get and
+one-way exits in a world, reading each room only once
+
+The pass over the rooms checks everything a room refers to and compiles its
+exits into integer arrays, as WorldGraph does. Reachability, items and one-way
+exits are then worked out from those arrays and small per-item tables, so
+nothing is read twice and huge lazily loaded worlds never have to fit in memory.
+"""
+import argparse
+import json
+import sys
+from array import array
+from collections import deque, namedtuple
+
+from world_loader import WorldFormatError, get_game_world, validate_world_schema
+
+# How bad each kind of finding is: errors break the game, warnings may be on purpose
+KINDS = {
+    "schema": "error",
+    "dangling": "error",
+    "unreachable": "warning",
+    "unobtainable": "warning",
+    "one_way": "warning",
+}
+
+# What the value of each built-in trigger condition and effect refers to
+CONDITION_REFERENCES = {
+    "has_item": "item", "lacks_item": "item", "room_has_item": "item",
+    "locked": "exit", "unlocked": "exit", "visited": "room", "not_visited": "room",
+}
+EFFECT_REFERENCES = {
+    "unlock": "exit", "add_item": "item", "remove_item": "item",
+    "give_item": "item", "consume_item": "item",
+}
+
+class Finding(namedtuple("Finding", ["kind", "where", "message"])):
+    """One problem: its kind, the world field at fault and what is wrong with it"""
+    __slots__ = ()
+
+    @property
+    def severity(self):
+        """Return error or warning, depending on the kind"""
+        return KINDS[self.kind]
+
+    def as_dict(self):
+        """Return the finding as plain data for JSON output"""
+        return {"severity": self.severity, "kind": self.kind, "where": self.where, "message": self.message}
+
+    def __str__(self):
+        """Return the finding as one line of text"""
+        return f"{self.severity}: {self.where}: {self.message}"
+
+class WorldLinter:
+    """Checks one game world; call lint() for the findings"""
+
+    def __init__(self, game_world):
+        """Lint a game world dict, room store or compact world"""
+        self.rooms = game_world["rooms"]
+        self.items = game_world["items"]
+        self.starting_room = game_world["starting_room"]
+        self.findings = []
+
+        # Room numbers come from the keys alone, so no room is read to number them
+        self.room_ids = list(self.rooms)
+        self.room_numbers = {room_id: number for number, room_id in enumerate(self.room_ids)}
+        # Room n's exits are offsets[n] to offsets[n + 1] - 1; targets are -1 for missing rooms
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        self.direction_codes = array("H")
+        self.direction_names = []
+        self._direction_numbers = {}
+        # 1 for exits that are open or that something in their room unlocks
+        self.passable = bytearray()
+        # item id -> numbers of the rooms it lies in, is added to or is given out in
+        self.sources = {}
+
+    def _add(self, kind, where, message):
+        """Record a finding"""
+        self.findings.append(Finding(kind, where, message))
+
+    def _check_reference(self, kind, value, room, where):
+        """Report value if it isn't a known item, room, or exit of room"""
+        if kind == "item" and value not in self.items:
+            self._add("dangling", where, f"no item called '{value}'")
+        elif kind == "room" and value not in self.room_numbers:
+            self._add("dangling", where, f"no room called '{value}'")
+        elif kind == "exit" and value not in room["exits"]:
+            self._add("dangling", where, f"no exit '{value}' in this room")
+
+    def _note(self, item_id, number):
+        """Record that room number can hand out item_id"""
+        rooms = self.sources.get(item_id)
+        if rooms is None:
+            self.sources[item_id] = [number]
+        elif rooms[-1] != number:
+            rooms.append(number)
+
+    def _lint_room(self, number, room_id, room):
+        """Check everything one room refers to and compile its exits"""
+        where = f"rooms.{room_id}"
+        exits = room["exits"]
+        locks = room.get("locked_exits", {})
+        unlocked = set()
+
+        for position, item_id in enumerate(room["items"]):
+            self._check_reference("item", item_id, room, f"{where}.items[{position}]")
+            self._note(item_id, number)
+
+        for item_id, use in room.get("item_uses", {}).items():
+            use_where = f"{where}.item_uses.{item_id}"
+            self._check_reference("item", item_id, room, use_where)
+            if "unlocks" in use:
+                self._check_reference("exit", use["unlocks"], room, f"{use_where}.unlocks")
+                unlocked.add(use["unlocks"])
+            if "adds_item" in use:
+                self._check_reference("item", use["adds_item"], room, f"{use_where}.adds_item")
+                self._note(use["adds_item"], number)
+
+        for position, trigger in enumerate(room.get("triggers", ())):
+            trigger_where = f"{where}.triggers[{position}]"
+            # Examine triggers may name a feature of the room instead of an item
+            item_id = trigger.get("item")
+            if item_id is not None and trigger["on"] != "enter":
+                if item_id not in self.items and not (trigger["on"] == "examine"
+                                                      and item_id in room.get("features", {})):
+                    self._add("dangling", f"{trigger_where}.item", f"no item called '{item_id}'")
+            for name, value in trigger.get("if", {}).items():
+                if name in CONDITION_REFERENCES:
+                    self._check_reference(CONDITION_REFERENCES[name], value, room, f"{trigger_where}.if.{name}")
+            for effect_position, effect in enumerate(trigger.get("effects", ())):
+                for name, value in effect.items():
+                    # consume_item: true means the trigger's own item
+                    if name in EFFECT_REFERENCES and value is not True:
+                        self._check_reference(EFFECT_REFERENCES[name], value, room,
+                                              f"{trigger_where}.effects[{effect_position}].{name}")
+                    if name == "unlock":
+                        unlocked.add(value)
+                    elif name in ("add_item", "give_item"):
+                        self._note(value, number)
+
+        for direction in locks:
+            if direction not in exits:
+                self._add("dangling", f"{where}.locked_exits.{direction}", f"no exit '{direction}' to lock")
+
+        for direction, target in exits.items():
+            target_number = self.room_numbers.get(target, -1)
+            if target_number < 0:
+                self._add("dangling", f"{where}.exits.{direction}", f"no room called '{target}'")
+            self.targets.append(target_number)
+            code = self._direction_numbers.get(direction)
+            if code is None:
+                code = self._direction_numbers[direction] = len(self.direction_names)
+                self.direction_names.append(direction)
+            self.direction_codes.append(code)
+            self.passable.append(direction not in locks or direction in unlocked)
+        self.offsets.append(len(self.targets))
+
+    def _search(self, start, passable_only):
+        """Return a bytearray marking the room numbers reachable from start"""
+        seen = bytearray(len(self.room_ids))
+        seen[start] = 1
+        queue = deque([start])
+        offsets, targets, passable = self.offsets, self.targets, self.passable
+        while queue:
+            room = queue.popleft()
+            for edge in range(offsets[room], offsets[room + 1]):
+                target = targets[edge]
+                if target >= 0 and not seen[target] and (passable[edge] or not passable_only):
+                    seen[target] = 1
+                    queue.append(target)
+        return seen
+
+    def _lint_reachability(self):
+        """Report rooms that can't be reached and return the bytearray of those that can"""
+        start = self.room_numbers[self.starting_room]
+        seen = self._search(start, passable_only=True)
+        if all(seen):
+            return seen
+        anywhere = self._search(start, passable_only=False)
+        for number, room_id in enumerate(self.room_ids):
+            if not seen[number]:
+                if anywhere[number]:
+                    message = "only behind locked exits that nothing unlocks"
+                else:
+                    message = "no exit leads here from the starting room"
+                self._add("unreachable", f"rooms.{room_id}", message)
+        return seen
+
+    def _lint_items(self, seen):
+        """Report items no player can ever get"""
+        for item_id in self.items:
+            # Items that can't be taken count as found too: they are scenery, meant to stay put
+            rooms = self.sources.get(item_id, ())
+            if any(seen[number] for number in rooms):
+                continue
+            if not rooms:
+                message = "never placed in a room or given by a trigger"
+            else:
+                message = "only found in rooms that can't be reached"
+            self._add("unobtainable", f"items.{item_id}", message)
+
+    def _lint_one_way(self):
+        """Report exits whose room has no exit back"""
+        offsets, targets = self.offsets, self.targets
+        for number, room_id in enumerate(self.room_ids):
+            for edge in range(offsets[number], offsets[number + 1]):
+                target = targets[edge]
+                if target < 0 or target == number:
+                    continue
+                if number not in targets[offsets[target]:offsets[target + 1]]:
+                    direction = self.direction_names[self.direction_codes[edge]]
+                    self._add("one_way", f"rooms.{room_id}.exits.{direction}",
+                              f"'{self.room_ids[target]}' has no exit back")
+
+    def lint(self):
+        """Check the whole world and return the findings, errors first"""
+        for number, room_id in enumerate(self.room_ids):
+            self._lint_room(number, room_id, self.rooms[room_id])
+        self._lint_one_way()
+        if self.starting_room not in self.room_numbers:
+            self._add("dangling", "world.starting_room", f"no room called '{self.starting_room}'")
+        else:
+            self._lint_items(self._lint_reachability())
+        return sorted(self.findings, key=lambda finding: finding.severity != "error")
+
+def lint_world(game_world):
+    """Return the Findings for a game world"""
+    return WorldLinter(game_world).lint()
+
+def main(argv=None):
+    """Parse command line options, lint a world and print the findings"""
+    parser = argparse.ArgumentParser(description="Check a Retro Text Adventure world for broken content")
+    parser.add_argument("--world", metavar="PATH", help="world file or room store to check (default: the built-in world)")
+    parser.add_argument("--json", action="store_true", help="print the findings as JSON")
+    parser.add_argument("--strict", action="store_true", help="exit with an error on warnings too")
+    args = parser.parse_args(argv)
+
+    try:
+        game_world = get_game_world(args.world)
+        # World files are checked against the schema as they load; the built-in world isn't
+        if args.world is None:
+            validate_world_schema(game_world)
+        findings = lint_world(game_world)
+    except WorldFormatError as error:
+        findings = []
+        for line in str(error).splitlines():
+            where, _, message = line.partition(": ")
+            findings.append(Finding("schema", where, message))
+
+    errors = sum(finding.severity == "error" for finding in findings)
+    warnings = len(findings) - errors
+    if args.json:
+        json.dump({"errors": errors, "warnings": warnings,
+                   "findings": [finding.as_dict() for finding in findings]}, sys.stdout, indent=2)
+        print()
+    else:
+        for finding in findings:
+            print(finding)
+        print(f"{errors} errors, {warnings} warnings")
+    return 1 if errors or (args.strict and warnings) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+World Loader for Retro Text Adventure
+Loads game worlds from JSON or TOML files, checks them against the world schema
+and keeps a compiled, memory-mapped copy so later startups skip parsing
+"""
+import gc
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+from array import array
+
+from game_data import initialize_game_world
+from room_store import DEFAULT_CACHE_BYTES, LazySection, is_room_store, open_room_store
+from triggers import compile_trigger
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Bump when the cache layout or the world schema changes, so old caches are ignored
+CACHE_VERSION = 2
+CACHE_MAGIC = b"TXTWORLD"
+CACHE_DIR_NAME = ".world_cache"
+
+# Compiled file header: magic, version, content hash, offset of the table of contents
+HEADER = struct.Struct("<8sI64sQ")
+
+class WorldFormatError(ValueError):
+    """Raised when a world file doesn't match the world schema"""
+
+# Allowed fields and their types; the first group in each pair is required
+ITEM_FIELDS = ({"name": str, "description": str}, {"takeable": bool})
+ROOM_FIELDS = (
+    {"name": str, "description": str, "exits": dict, "items": list},
+    {"features": dict, "locked_exits": dict, "item_uses": dict, "triggers": list},
+)
+FEATURE_FIELDS = ({"description": str}, {})
+LOCK_FIELDS = ({"description": str, "hint": str}, {})
+ITEM_USE_FIELDS = (
+    {"message": str},
+    {"unlocks": str, "adds_item": str, "consumes_item": bool, "wins_game": bool},
+)
+TRIGGER_FIELDS = ({"on": str}, {"item": str, "if": dict, "effects": list, "message": str})
+
+def _check_fields(value, fields, where, errors):
+    """Check one object's fields against a (required, optional) pair of field types"""
+    if not isinstance(value, dict):
+        errors.append(f"{where}: expected an object")
+        return False
+    required, optional = fields
+    for key, expected in required.items():
+        if key not in value:
+            errors.append(f"{where}: missing '{key}'")
+    for key, field in value.items():
+        expected = required.get(key) or optional.get(key)
+        if expected is None:
+            errors.append(f"{where}: unknown field '{key}'")
+        elif not isinstance(field, expected):
+            errors.append(f"{where}.{key}: expected {expected.__name__}")
+    return True
+
+def _check_mapping(value, fields, where, errors):
+    """Check every entry of an object whose values share one set of fields"""
+    for key, entry in value.items():
+        _check_fields(entry, fields, f"{where}.{key}", errors)
+
+def _check_trigger(trigger, where, errors):
+    """Check one trigger's fields and that its event, conditions and effects exist"""
+    before = len(errors)
+    if not _check_fields(trigger, TRIGGER_FIELDS, where, errors):
+        return
+    for position, effect in enumerate(trigger.get("effects", [])):
+        if not isinstance(effect, dict):
+            errors.append(f"{where}.effects[{position}]: expected an object")
+    if len(errors) == before:
+        try:
+            compile_trigger(trigger)
+        except ValueError as error:
+            errors.append(f"{where}: {error}")
+
+def validate_world_schema(game_world):
+    """Raise WorldFormatError listing every place game_world breaks the world schema"""
+    errors = []
+    if not isinstance(game_world, dict):
+        raise WorldFormatError("world: expected an object")
+
+    for key, expected in (("starting_room", str), ("rooms", dict), ("items", dict)):
+        if not isinstance(game_world.get(key), expected):
+            errors.append(f"world.{key}: expected {expected.__name__}")
+    if errors:
+        raise WorldFormatError("\n".join(errors))
+
+    _check_mapping(game_world["items"], ITEM_FIELDS, "items", errors)
+
+    for room_id, room in game_world["rooms"].items():
+        where = f"rooms.{room_id}"
+        if not _check_fields(room, ROOM_FIELDS, where, errors):
+            continue
+        if isinstance(room.get("exits"), dict):
+            for direction, target in room["exits"].items():
+                if not isinstance(target, str):
+                    errors.append(f"{where}.exits.{direction}: expected str")
+        if isinstance(room.get("items"), list):
+            for position, item_id in enumerate(room["items"]):
+                if not isinstance(item_id, str):
+                    errors.append(f"{where}.items[{position}]: expected str")
+        for key, fields in (("features", FEATURE_FIELDS), ("locked_exits", LOCK_FIELDS),
+                            ("item_uses", ITEM_USE_FIELDS)):
+            if isinstance(room.get(key), dict):
+                _check_mapping(room[key], fields, f"{where}.{key}", errors)
+        if isinstance(room.get("triggers"), list):
+            for position, trigger in enumerate(room["triggers"]):
+                _check_trigger(trigger, f"{where}.triggers[{position}]", errors)
+
+    if game_world["starting_room"] not in game_world["rooms"]:
+        errors.append(f"world.starting_room: no room called '{game_world['starting_room']}'")
+
+    if errors:
+        raise WorldFormatError("\n".join(errors))
+
+def parse_world(data, path):
+    """Parse world file contents, choosing JSON or TOML by the file extension"""
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise WorldFormatError("Reading TOML worlds needs Python 3.11+ or the 'tomli' package")
+        try:
+            return tomllib.loads(data.decode("utf-8"))
+        except tomllib.TOMLDecodeError as error:
+            raise WorldFormatError(f"{path}: {error}")
+    try:
+        return json.loads(data)
+    except ValueError as error:
+        raise WorldFormatError(f"{path}: {error}")
+
+def content_hash(data):
+    """Return the cache key for world file contents"""
+    digest = hashlib.sha256(data)
+    digest.update(CACHE_MAGIC + str(CACHE_VERSION).encode("ascii"))
+    return digest.hexdigest()
+
+def _cache_stem(path, cache_dir=None):
+    """Return the cache directory path plus the world file's name without its extension"""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0])
+
+def cache_path(path, key, cache_dir=None):
+    """Return where the compiled copy of a world file with this key is kept"""
+    return f"{_cache_stem(path, cache_dir)}-{key[:16]}.world"
+
+class CompiledSection(LazySection):
+    """A read-only mapping of rooms or items stored in a compiled world file
+
+    Entries are unpickled from the memory-mapped file when they are looked up,
+    so opening a huge world only reads its table of contents.
+    """
+
+    def __init__(self, blob, positions, offsets, max_bytes=DEFAULT_CACHE_BYTES):
+        """Wrap the ids -> position table and the offsets of each pickled entry"""
+        super().__init__(max_bytes)
+        self._blob = blob
+        self._positions = positions
+        self._offsets = offsets
+
+    def _load_raw(self, key):
+        """Slice the pickled entry for key out of the mapped file"""
+        position = self._positions[key]
+        return self._blob[self._offsets[position]:self._offsets[position + 1]]
+
+    def __contains__(self, key):
+        """Return whether an entry exists, without loading it"""
+        return key in self._positions
+
+    def __iter__(self):
+        """Iterate over entry ids in their original order"""
+        return iter(self._positions)
+
+    def __len__(self):
+        """Return the number of entries"""
+        return len(self._positions)
+
+def _write_section(out, entries):
+    """Pickle each entry into out and return (ids -> position, offsets)"""
+    positions = {}
+    offsets = array("Q", [out.tell()])
+    for position, (key, value) in enumerate(entries.items()):
+        positions[key] = position
+        pickle.dump(value, out, protocol=pickle.HIGHEST_PROTOCOL)
+        offsets.append(out.tell())
+    return positions, offsets
+
+def read_cache(path, key, max_bytes=DEFAULT_CACHE_BYTES):
+    """Open a compiled world, or return None if it is missing or stale"""
+    try:
+        with open(path, "rb") as cache:
+            header = cache.read(HEADER.size)
+            magic, version, stored_key, contents_at = HEADER.unpack(header)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION or stored_key != key.encode("ascii"):
+                return None
+            blob = mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, struct.error):
+        return None
+
+    # The table of contents is many small objects; skip the cycle collector while reading it
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        starting_room, rooms, items = pickle.loads(blob[contents_at:])
+    except (pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        blob.close()
+        return None
+    finally:
+        if was_enabled:
+            gc.enable()
+    return {
+        "starting_room": starting_room,
+        "rooms": CompiledSection(blob, *rooms, max_bytes),
+        "items": CompiledSection(blob, *items, max_bytes),
+    }
+
+def write_cache(path, key, game_world):
+    """Compile a world, replacing the file atomically so readers never see half of it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as cache:
+        # Leave room for the header, which points at the table of contents written last
+        cache.write(b"\0" * HEADER.size)
+        rooms = _write_section(cache, game_world["rooms"])
+        items = _write_section(cache, game_world["items"])
+        contents_at = cache.tell()
+        pickle.dump((game_world["starting_room"], rooms, items), cache, protocol=pickle.HIGHEST_PROTOCOL)
+        cache.seek(0)
+        cache.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, key.encode("ascii"), contents_at))
+    os.replace(temporary, path)
+
+def _stat_fingerprint(path):
+    """Return a string that changes whenever the file at path is edited"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+
+def _fingerprint_path(path, cache_dir=None):
+    """Return where the last known content hash of a world file is remembered"""
+    return _cache_stem(path, cache_dir) + ".fingerprint"
+
+def _remembered_key(path, cache_dir=None):
+    """Return the content hash recorded for the file as it is now, or None"""
+    try:
+        with open(_fingerprint_path(path, cache_dir), encoding="utf-8") as remembered:
+            fingerprint, key = remembered.read().rsplit("\0", 1)
+        if fingerprint == _stat_fingerprint(path):
+            return key
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _remember_key(path, key, cache_dir=None):
+    """Record the content hash for the file as it is now, so the next load can skip hashing"""
+    fingerprint_path = _fingerprint_path(path, cache_dir)
+    temporary = f"{fingerprint_path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as remembered:
+        remembered.write(f"{_stat_fingerprint(path)}\0{key}")
+    os.replace(temporary, fingerprint_path)
+
+def load_world(path, cache_dir=None, use_cache=True, max_bytes=DEFAULT_CACHE_BYTES):
+    """Load and validate a world file, using its compiled cache when it is up to date
+
+    Rooms and items from the compiled cache are loaded lazily and at most
+    max_bytes of each are kept decoded in memory.
+    """
+    # An unchanged file is opened straight from its compiled copy without being read
+    if use_cache:
+        key = _remembered_key(path, cache_dir)
+        if key is not None:
+            game_world = read_cache(cache_path(path, key, cache_dir), key, max_bytes)
+            if game_world is not None:
+                return game_world
+
+    with open(path, "rb") as world_file:
+        data = world_file.read()
+
+    key = content_hash(data)
+    compiled = cache_path(path, key, cache_dir)
+    game_world = read_cache(compiled, key, max_bytes) if use_cache else None
+    if game_world is None:
+        game_world = parse_world(data, path)
+        validate_world_schema(game_world)
+
+    if use_cache:
+        try:
+            if not isinstance(game_world["rooms"], CompiledSection):
+                write_cache(compiled, key, game_world)
+            _remember_key(path, key, cache_dir)
+        except OSError:
+            # A read-only checkout can still play, just without the cache
+            pass
+    return game_world
+
+def get_game_world(path=None, cache_dir=None, max_bytes=DEFAULT_CACHE_BYTES):
+    """Load the world at path, or build the built-in world when no path is given
+
+    Paths ending in .db or .sqlite are opened as room stores.
+    """
+    if path is None:
+        return initialize_game_world()
+    if is_room_store(path):
+        return open_room_store(path, max_bytes)
+    return load_world(path, cache_dir, max_bytes=max_bytes)
+
+def save_world(game_world, path):
+    """Write a world dict to a JSON file"""
+    with open(path, "w", encoding="utf-8") as world_file:
+        json.dump(game_world, world_file, indent=2, ensure_ascii=False)
+        world_file.write("\n")
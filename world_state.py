@@ -0,0 +1,274 @@
+"""
+World State for Retro Text Adventure
+Splits a shared, read-only game world from the small set of changes each player makes
+"""
+import threading
+from collections import OrderedDict
+
+from triggers import TriggerIndex
+from world_graph import RoomGraph, WorldGraph
+from world_index import NameIndex, NounMatcher, WorldIndex, add_item_noun, remove_item_noun
+
+class World:
+    """A game world that is built once and shared by every session"""
+
+    def __init__(self, game_world, max_descriptions=65536):
+        """Wrap a game world dict; the dict must not be changed afterwards"""
+        self.game_world = game_world
+        self.rooms = game_world["rooms"]
+        self.items = game_world["items"]
+        self.starting_room = game_world["starting_room"]
+        self.index = WorldIndex(game_world)
+        # Descriptions of rooms as they start out, shared by every session
+        self.max_descriptions = max_descriptions
+        self._descriptions = OrderedDict()
+        self._descriptions_lock = threading.Lock()
+        self._graph = None
+        # The exits of the rooms players have walked between, for goto
+        self.room_graph = RoomGraph(self.rooms)
+        # Each room's triggers are compiled when the room first needs them
+        self.triggers = TriggerIndex(self.rooms)
+
+    @property
+    def graph(self):
+        """Return the compiled WorldGraph, building it on first use
+
+        This reads every room in the world, so it is meant for tools such as
+        the solver; players travel with room_graph instead.
+        """
+        if self._graph is None:
+            self._graph = WorldGraph(self.game_world)
+        return self._graph
+
+    def describe_room(self, room_id, item_ids):
+        """Build the text shown by look for a room holding item_ids"""
+        room = self.rooms[room_id]
+        name = room["name"]
+        parts = ["\n", name, "\n", "-" * len(name), "\n", room["description"], "\n"]
+
+        # List available exits
+        if room["exits"]:
+            parts += ["\nExits: ", ", ".join(room["exits"]), "\n"]
+        else:
+            parts.append("\nThere are no obvious exits.\n")
+
+        # List items in the room
+        if item_ids:
+            parts.append("\nYou can see:\n")
+            items = self.items
+            for item_id in item_ids:
+                parts += ["- ", items[item_id]["name"], "\n"]
+
+        return "".join(parts)
+
+    def starting_description(self, room_id):
+        """Return the cached description of a room nobody has changed"""
+        description = self._descriptions.get(room_id)
+        if description is None:
+            description = self.describe_room(room_id, self.rooms[room_id]["items"])
+            # Sessions on other threads may be adding and evicting at the same time
+            with self._descriptions_lock:
+                self._descriptions[room_id] = description
+                if len(self._descriptions) > self.max_descriptions:
+                    self._descriptions.popitem(last=False)
+        else:
+            # Keep rooms players are in from being evicted first, unless another thread just did
+            try:
+                self._descriptions.move_to_end(room_id)
+            except KeyError:
+                pass
+        return description
+
+def as_world(game_world):
+    """Return game_world as a World, wrapping a plain dict if needed"""
+    if isinstance(game_world, World):
+        return game_world
+    return World(game_world)
+
+class WorldState:
+    """One session's changes on top of a shared World
+
+    Only rooms the player has changed take up memory: items taken from a
+    room's starting list, items put into a room, and exits that were unlocked.
+    """
+
+    __slots__ = ("world", "removed_items", "added_items", "added_index", "added_matchers", "unlocked_exits",
+                 "dirty_rooms", "dirty_unlocks", "descriptions", "versions", "generation")
+
+    def __init__(self, world):
+        """Start with no changes to the world"""
+        self.world = world
+        # room_id -> set of starting item ids no longer in the room
+        self.removed_items = {}
+        # room_id -> list of item ids put into the room, in the order they arrived
+        self.added_items = {}
+        # room_id -> NameIndex over added_items
+        self.added_index = {}
+        # room_id -> NounMatcher over added_items, made by added_matcher() when first needed
+        self.added_matchers = {}
+        # set of (room_id, direction) pairs that were unlocked
+        self.unlocked_exits = set()
+        # Rooms and unlocks changed since take_changes(), once track_changes() is called
+        self.dirty_rooms = None
+        self.dirty_unlocks = None
+        # room_id -> cached description, only for rooms this session changed
+        self.descriptions = {}
+        # room_id -> number of changes to the room's items and exits, for remembered outputs;
+        # generation goes up when load() or apply_changes() replace many rooms at once
+        self.versions = {}
+        self.generation = 0
+
+    def room_items(self, room_id):
+        """Return the item ids currently in a room, in display order"""
+        items = self.world.rooms[room_id]["items"]
+        removed = self.removed_items.get(room_id)
+        if removed:
+            items = [item_id for item_id in items if item_id not in removed]
+        added = self.added_items.get(room_id)
+        if added:
+            return list(items) + added
+        return items
+
+    def room_description(self, room_id):
+        """Return the text shown by look for a room, building it only after a change"""
+        if room_id not in self.removed_items and room_id not in self.added_items:
+            return self.world.starting_description(room_id)
+        description = self.descriptions.get(room_id)
+        if description is None:
+            description = self.world.describe_room(room_id, self.room_items(room_id))
+            self.descriptions[room_id] = description
+        return description
+
+    def find_room_item(self, room_id, name):
+        """Return the id of the first item in a room with this name, or None"""
+        removed = self.removed_items.get(room_id, ())
+        for item_id in self.world.index.room_items(room_id).find_all(name):
+            if item_id not in removed:
+                return item_id
+        added = self.added_index.get(room_id)
+        if added is not None:
+            return added.find(name)
+        return None
+
+    def added_matcher(self, room_id):
+        """Return a NounMatcher over the items put into a room, or None if there are none"""
+        matcher = self.added_matchers.get(room_id)
+        if matcher is None:
+            added = self.added_items.get(room_id)
+            if not added:
+                return None
+            matcher = self.added_matchers[room_id] = NounMatcher()
+            items = self.world.items
+            for item_id in added:
+                add_item_noun(matcher, item_id, items[item_id]["name"])
+        return matcher
+
+    def add_room_item(self, room_id, item_id):
+        """Put an item into a room"""
+        added = self.added_items.get(room_id)
+        if added is None:
+            added = self.added_items[room_id] = []
+            self.added_index[room_id] = NameIndex()
+        added.append(item_id)
+        name = self.world.items[item_id]["name"]
+        self.added_index[room_id].add(name, item_id)
+        matcher = self.added_matchers.get(room_id)
+        if matcher is not None:
+            add_item_noun(matcher, item_id, name)
+        self.descriptions.pop(room_id, None)
+        self.versions[room_id] = self.versions.get(room_id, 0) + 1
+        if self.dirty_rooms is not None:
+            self.dirty_rooms.add(room_id)
+
+    def remove_room_item(self, room_id, item_id):
+        """Take the first occurrence of an item out of a room"""
+        name = self.world.items[item_id]["name"]
+        removed = self.removed_items.get(room_id)
+        self.descriptions.pop(room_id, None)
+        self.versions[room_id] = self.versions.get(room_id, 0) + 1
+        if self.dirty_rooms is not None:
+            self.dirty_rooms.add(room_id)
+        # Items from the room's starting list come before any that were added
+        if item_id in self.world.index.room_items(room_id).find_all(name):
+            if removed is None:
+                removed = self.removed_items[room_id] = set()
+            if item_id not in removed:
+                removed.add(item_id)
+                return
+        self.added_items[room_id].remove(item_id)
+        self.added_index[room_id].remove(name, item_id)
+        matcher = self.added_matchers.get(room_id)
+        if matcher is not None:
+            remove_item_noun(matcher, item_id, name)
+
+    def locked_exit(self, room_id, direction):
+        """Return the lock info for an exit, or None if it isn't locked"""
+        lock_info = self.world.rooms[room_id].get("locked_exits", {}).get(direction)
+        if lock_info is None or (room_id, direction) in self.unlocked_exits:
+            return None
+        return lock_info
+
+    def unlock_exit(self, room_id, direction):
+        """Unlock an exit if it is locked"""
+        if self.locked_exit(room_id, direction) is not None:
+            self.unlocked_exits.add((room_id, direction))
+            self.versions[room_id] = self.versions.get(room_id, 0) + 1
+            if self.dirty_unlocks is not None:
+                self.dirty_unlocks.append((room_id, direction))
+
+    def export(self):
+        """Return every change as plain data: (removed items, added items, unlocked exits)"""
+        removed = {room_id: set(items) for room_id, items in self.removed_items.items() if items}
+        added = {room_id: list(items) for room_id, items in self.added_items.items() if items}
+        return removed, added, set(self.unlocked_exits)
+
+    def load(self, exported):
+        """Replace every change with data from export()"""
+        removed, added, unlocked = exported
+        self.removed_items = {}
+        self.added_items = {}
+        self.added_index = {}
+        self.added_matchers = {}
+        self.unlocked_exits = set(unlocked)
+        self.descriptions = {}
+        self.generation += 1
+        for room_id in set(removed) | set(added):
+            self._set_room(room_id, removed.get(room_id, ()), added.get(room_id, ()))
+
+    def track_changes(self):
+        """Start recording which rooms and exits change, for take_changes()"""
+        self.dirty_rooms = set()
+        self.dirty_unlocks = []
+
+    def take_changes(self):
+        """Return the changes since the last call as plain data, and start over
+
+        The result holds the full item changes of each room touched since
+        then and the exits unlocked since then.
+        """
+        rooms = {}
+        for room_id in self.dirty_rooms:
+            rooms[room_id] = (set(self.removed_items.get(room_id, ())),
+                              list(self.added_items.get(room_id, ())))
+        unlocks = self.dirty_unlocks
+        self.dirty_rooms = set()
+        self.dirty_unlocks = []
+        return rooms, unlocks
+
+    def apply_changes(self, changes):
+        """Apply data from take_changes() on top of the current changes"""
+        rooms, unlocks = changes
+        for room_id, (removed, added) in rooms.items():
+            self._set_room(room_id, removed, added)
+        self.unlocked_exits.update(unlocks)
+        self.generation += 1
+
+    def _set_room(self, room_id, removed, added):
+        """Replace one room's item changes"""
+        self.descriptions.pop(room_id, None)
+        self.added_matchers.pop(room_id, None)
+        self.removed_items[room_id] = set(removed)
+        self.added_items[room_id] = list(added)
+        index = self.added_index[room_id] = NameIndex()
+        for item_id in added:
+            index.add(self.world.items[item_id]["name"], item_id)